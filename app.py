@@ -1,5 +1,5 @@
 # ==== IMPORTS INICIAIS (SEM DUPLICATAS) ====
-import os, sys, time, math, io, hashlib
+import os, sys, time, math, io, hashlib, tempfile
 from pathlib import Path
 from datetime import date, datetime, timedelta
 from contextlib import contextmanager
@@ -57,6 +57,7 @@ def create_bucket(db, user, name, tipo, description, percent):
     )
     db.add(bucket)
     db.commit()
+    invalidate_user_cache("buckets", user_id=user.id)
     return bucket
 from babel.numbers import format_currency
 from babel.dates import format_date
@@ -87,13 +88,18 @@ from ui_utils import (
     show_action_buttons
 )
 from utils import money_br, date_br
-from giant_manager import render_plano_ataque, get_giant_payments, get_total_paid
+from giant_manager import render_plano_ataque
+from importers.background import enqueue_imports, ensure_worker, forget_finished, job_progress, user_jobs
+from importers.pdf_import import LAYOUTS
+from charts import MARKER_POINTS, balance_series, evolution_series
+from db import get_session
+from exports import HAS_EXCEL, HAS_PARQUET, account_archive, ledger_csv, write_excel
 from db_helpers import (
     tx, init_db_pragmas, delete_giant, distribuir_por_baldes,
     giant_forecast, check_giant_victory
 )
 from app_utils import (
-    safe_dataframe, dias_do_mes, ensure_daily_allocation,
+    safe_dataframe, dias_do_mes,
     daily_budget_for_giants, celebrate_victory
 )
 
@@ -124,6 +130,12 @@ def get_db():
     finally:
         db.close()
 
+def invalidate_user_cache(*entities, user_id=None):
+    """Invalida só as entidades do usuário (todas se nenhuma for informada), ver cache.py."""
+    if user_id is None:
+        user_id = st.session_state.auth["user_id"] if "auth" in st.session_state else st.session_state.user.id
+    invalidate(user_id, *entities)
+
 def show_giants_table(df: pd.DataFrame):
     # tipagem segura
     for col in ("ID", "total", "paid", "remaining"):
@@ -157,7 +169,7 @@ def load_user_data(db: Session, user_id: int) -> dict:
         # Carrega configurações e dados associados
         buckets = load_user_buckets(user_id) 
         giants = load_user_giants(user_id)
-        movements, total = load_user_movements(user_id)
+        movements, _, total = load_user_movements(user_id)
         bills = load_user_bills(user_id)
 
         return {
@@ -232,10 +244,10 @@ def show_login():
 
 # Importar funções otimizadas
 from utils import money_br, date_br
-from giant_manager import render_plano_ataque, get_giant_payments, get_total_paid
+from giant_manager import render_plano_ataque
 from db_helpers import (tx, init_db_pragmas, delete_giant, distribuir_por_baldes, 
                        giant_forecast, check_giant_victory)
-from app_utils import (safe_dataframe, dias_do_mes, ensure_daily_allocation, 
+from app_utils import (safe_dataframe, dias_do_mes,
                       daily_budget_for_giants, celebrate_victory)
 
 # Mobile first & UI improvements
@@ -265,17 +277,6 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-# Cache functions to improve performance
-@st.cache_data(ttl=300)
-def get_giant_payments(giant_id):
-    with get_db() as db:
-        return db.query(GiantPayment).filter_by(giant_id=giant_id).all()
-
-@st.cache_data(ttl=300)
-def get_total_paid(giant_id):
-    payments = get_giant_payments(giant_id)
-    return sum(p.amount for p in payments)
-
 # Função segura para operações no banco de dados
 def safe_operation(operation_func):
     try:
@@ -388,6 +389,7 @@ from database import (
     engine, get_db, safe_operation,
     batch_operation, retry_operation
 )
+from db_utils import get_db_session
 from models import Base
 from models import (
     User, Bucket, Giant, Movement, Bill,
@@ -671,57 +673,12 @@ def init_session_data():
         st.session_state.editing_total = False
 
 # ============ DB bootstrap ============
+# Migrações versionadas: rodam uma vez por processo, não a cada rerun
+from migrations import run_migrations
+
 def init_db():
     try:
-        db_exists = os.path.exists("./sql_app.db")
-        
-        # Create database if it doesn't exist
-        if not db_exists:
-            Base.metadata.create_all(bind=engine)
-            st.success("Banco de dados criado com sucesso!")
-            return
-        
-        # Check and add new columns using context manager
-        with get_db_session() as db:
-            try:
-                inspector = inspect(engine)
-                tables = inspector.get_table_names()
-                
-                # Verificar e adicionar colunas em giants
-                if 'giants' in tables:
-                    columns = {col['name'] for col in inspector.get_columns('giants')}
-                    needed_columns = {'weekly_goal', 'interest_rate', 'payoff_efficiency'}
-                    missing_columns = needed_columns - columns
-                    
-                    # Add missing columns in giants
-                    for col in missing_columns:
-                        try:
-                            db.execute(text(f"ALTER TABLE giants ADD COLUMN {col} FLOAT DEFAULT 0.0"))
-                            st.success(f"Coluna {col} adicionada à tabela giants")
-                        except Exception as col_error:
-                            st.warning(f"Erro ao adicionar coluna {col} em giants: {str(col_error)}")
-                
-                # Verificar e adicionar last_allocation_date em user_profiles
-                if 'user_profiles' in tables:
-                    columns = {col['name'] for col in inspector.get_columns('user_profiles')}
-                    if 'last_allocation_date' not in columns:
-                        try:
-                            db.execute(text("ALTER TABLE user_profiles ADD COLUMN last_allocation_date DATE"))
-                            st.success("Coluna last_allocation_date adicionada à tabela user_profiles")
-                        except Exception as col_error:
-                            st.warning(f"Erro ao adicionar last_allocation_date: {str(col_error)}")
-                    
-                    if missing_columns or 'last_allocation_date' not in columns:
-                        st.success("Banco de dados atualizado com sucesso!")
-                
-            except Exception as table_error:
-                st.error(f"Erro ao verificar tabelas: {str(table_error)}")
-                try:
-                    Base.metadata.create_all(bind=engine)
-                    st.success("Banco de dados recriado com sucesso!")
-                except Exception as recreate_error:
-                    st.error(f"Erro ao recriar banco de dados: {str(recreate_error)}")
-                    
+        run_migrations()
     except Exception as e:
         st.error(f"Erro crítico na inicialização do banco: {str(e)}")
         raise
@@ -738,30 +695,15 @@ def get_or_create_user(name: str) -> User:
         return u  # Session will be committed by context manager
 
 # ============ Data loaders ============
-def load_buckets(db: Session, user_id: int):
-    return db.execute(select(Bucket).where(Bucket.user_id == user_id)).scalars().all()
-
-def load_giants(db: Session, user_id: int):
-    return db.execute(select(Giant).where(Giant.user_id == user_id)).scalars().all()
-
-def load_movements(db: Session, user_id: int):
-    return db.execute(
-        select(Movement).where(Movement.user_id == user_id).order_by(Movement.date.desc())
-    ).scalars().all()
-
-def load_bills(db: Session, user_id: int):
-    return db.execute(
-        select(Bill).where(Bill.user_id == user_id).order_by(Bill.due_date.asc())
-    ).scalars().all()
-
-def get_profile(db: Session, user_id: int) -> UserProfile:
-    prof = db.execute(select(UserProfile).where(UserProfile.user_id == user_id)).scalar_one_or_none()
-    if not prof:
-        prof = UserProfile(user_id=user_id, monthly_income=0.0, monthly_expense=0.0)
-        db.add(prof)
-        db.commit()
-        db.refresh(prof)
-    return prof
+from db_helpers import (
+    load_buckets, load_giants, load_movements,
+    load_bills, get_profile, movement_totals
+)
+from read_models import (
+    read_profile, read_buckets, read_giants, read_bills, read_movements_page, read_payment_index
+)
+from money import from_cents
+from cache import cache, cached, invalidate
 
 def hash_password(plain: str) -> str:
     return hashlib.sha256(plain.encode("utf-8")).hexdigest()
@@ -790,50 +732,53 @@ def get_cached_engine():
     """Cache database engine to reuse connections"""
     return engine
 
-@st.cache_data(ttl=300)
+@cached("profile", ttl=300)
 def load_user_profile(user_id: int):
     """Cache user profile separately as it changes rarely"""
     with get_db() as db:
-        return get_profile(db, user_id)
+        profile = read_profile(db, user_id)
+        if profile is None:
+            get_profile(db, user_id)  # cria o perfil padrão
+            profile = read_profile(db, user_id)
+        return profile
 
-@st.cache_data(ttl=60)
+@cached("buckets", ttl=60)
 def load_user_buckets(user_id: int):
     """Cache buckets with shorter TTL as they change more often"""
     with get_db() as db:
-        return load_buckets(db, user_id)
+        return read_buckets(db, user_id)
 
-@st.cache_data(ttl=60)
+@cached("giants", ttl=60)
 def load_user_giants(user_id: int):
     """Cache giants separately"""
     with get_db() as db:
-        return load_giants(db, user_id)
+        return read_giants(db, user_id)
+
+@cached("payments", ttl=300)
+def load_user_payments(user_id: int):
+    """Giant totals (giant_stats) and last week's payments of the user, indexed by giant_id"""
+    with get_db() as db:
+        return read_payment_index(db, user_id)
 
-@st.cache_data(ttl=60)
+@cached("bills", ttl=60)
 def load_user_bills(user_id: int):
     """Cache bills separately"""
     with get_db() as db:
-        return load_bills(db, user_id)
+        return read_bills(db, user_id)
 
-@st.cache_data(ttl=30)
-def load_user_movements(user_id: int, page: int = 1, per_page: int = 50):
-    """Cache movements with pagination for better performance"""
+@cached("movements", ttl=30)
+def load_user_movements(user_id: int, cursor: tuple | None = None, per_page: int = 50):
+    """Cache movements with keyset pagination (cursor = (date, id) of the previous page's last row)"""
     with get_db() as db:
-        total = db.query(Movement).filter(Movement.user_id == user_id).count()
-        movements = db.query(Movement).filter(Movement.user_id == user_id)\
-            .order_by(Movement.date.desc())\
-            .offset((page-1) * per_page)\
-            .limit(per_page)\
-            .all()
-        return movements, total
-
-@st.cache_data(ttl=300)
+        return read_movements_page(db, user_id, cursor, per_page)
+
 def load_cached_data(user_id: int):
-    """Load data efficiently with separate caches"""
+    """Load data efficiently with separate caches (each loader is cached per user/entity)"""
     profile = load_user_profile(user_id)
     buckets = load_user_buckets(user_id)
     giants = load_user_giants(user_id)
     bills = load_user_bills(user_id)
-    movements, _ = load_user_movements(user_id, page=1)
+    movements, _, _ = load_user_movements(user_id)
     return profile, buckets, giants, movements, bills
 
 def render_dashboard_header():
@@ -848,11 +793,12 @@ def money_br(value):
     """Format a number as Brazilian currency"""
     return format_currency(value)
 
-def render_financial_metrics(movements):
-    # Calcular métricas com base nos movimentos
-    total_receitas = sum(m.amount for m in movements if m.kind == "Receita")
-    total_despesas = sum(m.amount for m in movements if m.kind == "Despesa")
-    saldo_atual = total_receitas - total_despesas
+def render_financial_metrics(db, user_id: int):
+    # Totais somados no SQL em centavos inteiros (exatos e sem carregar os movimentos)
+    totals = movement_totals(db, user_id)
+    total_receitas = from_cents(totals["Receita"])
+    total_despesas = from_cents(totals["Despesa"])
+    saldo_atual = from_cents(totals["Receita"] - totals["Despesa"])
     
     # Métricas principais com estilos personalizados
     st.markdown('<div class="metrics-grid">', unsafe_allow_html=True)
@@ -868,18 +814,25 @@ def render_financial_metrics(movements):
 def render_recent_movements(movements):
     if movements:
         st.subheader("📝 Movimentações Recentes")
+        recent = sorted(movements, key=lambda m: (m.date, m.id), reverse=True)[:10]
         df = pd.DataFrame([{
-            "Data": m.created_at.strftime("%d/%m/%Y"),
+            "Data": m.date.strftime("%d/%m/%Y"),
             "Tipo": m.kind,
             "Valor": money_br(m.amount),
             "Descrição": m.description
-        } for m in movements])
-        df = df.sort_values("Data", ascending=False)
-        st.dataframe(df.head(10), use_container_width=True)
+        } for m in recent])
+        st.dataframe(df, use_container_width=True)
+
+def export_ledger_button(db, user_id: int, key: str, **kwargs):
+    """Gera o CSV do Livro Caixa sob demanda (streaming, ver exports.py) e oferece o download."""
+    if st.button("📥 Exportar CSV", key=key, **kwargs):
+        data = b"".join(ledger_csv(db, user_id))
+        st.download_button("⬇️ Baixar livro_caixa.csv", data, "livro_caixa.csv", "text/csv",
+                           key=f"{key}-download", **kwargs)
 
 def handle_dashboard(db, user, profile, buckets, giants, movements, bills):
     render_dashboard_header()
-    total_receitas, total_despesas, saldo_atual = render_financial_metrics(movements)
+    total_receitas, total_despesas, saldo_atual = render_financial_metrics(db, user.id)
     render_recent_movements(movements)
 
 def handle_livro_caixa(db, user, profile, buckets, giants, movements, bills):
@@ -893,18 +846,10 @@ def handle_livro_caixa(db, user, profile, buckets, giants, movements, bills):
                 st.session_state["confirmar_limpar"] = True
     with col2:
         if movements:
-            csv = pd.DataFrame([{
-                "ID": m.id,
-                "Data": m.created_at.strftime("%d/%m/%Y"),
-                "Tipo": m.kind,
-                "Balde": next((b.name for b in buckets if b.id == m.bucket_id), ""),
-                "Valor": money_br(m.amount),
-                "Descrição": m.description
-            } for m in movements])
-            download_csv(csv, "livro_caixa.csv", "📥 Exportar CSV", use_container_width=True)
+            export_ledger_button(db, user.id, "livro-caixa-csv", use_container_width=True)
     with col3:
         if st.button("↻ Atualizar", type="primary"):
-            st.cache_data.clear()
+            invalidate_user_cache()
             st.rerun()
     with col4:
         st.markdown(custom_css.text_right, unsafe_allow_html=True)
@@ -919,7 +864,7 @@ def handle_livro_caixa(db, user, profile, buckets, giants, movements, bills):
                         db.query(Movement).filter_by(user_id=user.id).delete()
                     st.success("Livro caixa limpo com sucesso!")
                     st.session_state["confirmar_limpar"] = False
-                    st.cache_data.clear()
+                    invalidate_user_cache("movements")
                     st.rerun()
             with col2:
                 if st.button("✗ Não, cancelar"):
@@ -967,12 +912,13 @@ def handle_baldes(db, user):
                 )
                 db.add(bucket)
                 db.commit()
+                invalidate_user_cache("buckets", user_id=user.id)
                 st.success(f"Balde criado: {nome} - {tipo} - {perc}%")
                 st.rerun()
 
 def handle_plano_ataque(db, user, profile, buckets, giants, movements, bills):
     # Usar a nova versão otimizada do Plano de Ataque
-    render_plano_ataque(db, giants)
+    render_plano_ataque(db, giants, load_user_payments(user.id), daily_budget_for_giants(db, user, buckets))
     
     # Mobile-optimized styles
     st.markdown("""
@@ -1006,8 +952,9 @@ def handle_plano_ataque(db, user, profile, buckets, giants, movements, bills):
         
         # Previsões
         st.caption("⏱️ Previsões")
+        payments = load_user_payments(user.id)
         for g in giants:
-            restante, diaria, dias = giant_forecast(g, db)
+            restante, diaria, dias = giant_forecast(g, db, paid_cents=payments.paid_cents(g.id))
             txt = f"• **{g.name}** — Restante: {money_br(restante)} | Meta diária: {money_br(diaria)}"
             txt += f" | ~ **{math.ceil(dias)}** dias" if dias else " | defina a Meta semanal"
             st.markdown(txt)
@@ -1051,8 +998,9 @@ def handle_entrada_saida(db, user, profile, buckets, giants, movements, bills):
                             total_percent = sum(b.percent for b in buckets)
                             for bucket in buckets:
                                 perc_norm = (bucket.percent / total_percent) if total_percent > 0 else 0
-                                bucket.balance = novo_total * perc_norm
+                                db.get(Bucket, bucket.id).balance = novo_total * perc_norm
                             db.commit()
+                            invalidate_user_cache("buckets")
                             st.success("Saldo total ajustado e distribuído!")
                             st.session_state["editing_total"] = False
                             st.rerun()
@@ -1083,8 +1031,9 @@ def handle_entrada_saida(db, user, profile, buckets, giants, movements, bills):
                 with col1:
                     if st.form_submit_button("💾 Salvar"):
                         for bucket in buckets:
-                            bucket.balance = new_balances[bucket.id]
+                            db.get(Bucket, bucket.id).balance = new_balances[bucket.id]
                         db.commit()
+                        invalidate_user_cache("buckets")
                         st.session_state["editing_balances"] = False
                         st.success("Saldos atualizados!")
                         st.rerun()
@@ -1108,7 +1057,7 @@ def handle_calendario(db, user, profile):
         st.markdown(f"⏰ **{amanha.strftime('%d/%m/%Y')}** (amanhã)")
     
     # Exibir contas do dia
-    contas = load_user_bills(db, user.id)
+    contas = load_user_bills(user.id)
     if contas:
         contas_hoje = [b for b in contas if b.due_date == hoje]
         contas_amanha = [b for b in contas if b.due_date == amanha]
@@ -1128,7 +1077,7 @@ def handle_atrasos_riscos(db, user, profile):
     st.header("⚠️ Atrasos & Riscos")
     
     hoje = date.today()
-    contas = load_user_bills(db, user.id)
+    contas = load_user_bills(user.id)
     if contas:
         contas_atrasadas = [b for b in contas if b.due_date < hoje and not b.paid]
         contas_futuras = [b for b in contas if b.due_date > hoje]
@@ -1163,7 +1112,82 @@ def handle_atrasos_riscos(db, user, profile):
 def handle_importar_extrato(db, user):
     """Handle the Import Statement section"""
     st.header("📥 Importar Extrato")
-    st.info("Funcionalidade em desenvolvimento!")
+    st.caption("CSV separado por ';' com as colunas Data (DD/MM/AA), Descrição e Valor (1.234,56); "
+               "opcionais: Tipo (Receita/Despesa — sem ela vale o sinal do valor) e Balde (nome do balde). "
+               "OFX e QIF exportados pelo banco; PDF de extrato ou fatura. A importação roda em segundo plano.")
+
+    uploaded_files = st.file_uploader("Escolha os extratos (CSV, OFX, QIF ou PDF; vários de uma vez)",
+                                      type=["csv", "ofx", "qif", "pdf"], accept_multiple_files=True)
+    extensions = {f.name.lower().rsplit(".", 1)[-1] for f in uploaded_files}
+    options = {"pdf": {}, "qif": {}}
+    if "pdf" in extensions:
+        options["pdf"]["layout"] = st.selectbox("Layout do banco (PDF)", [None, *LAYOUTS],
+                                                format_func=lambda k: "Detectar automaticamente" if k is None else LAYOUTS[k].label)
+    if "qif" in extensions:
+        options["qif"]["day_first"] = st.radio("Datas dos arquivos QIF", [True, False], horizontal=True,
+                                               format_func=lambda d: "DD/MM (bancos brasileiros)" if d else "MM/DD (Quicken americano)")
+
+    # importa só no clique: os arquivos continuam no uploader a cada rerun
+    if uploaded_files and st.button("📥 Importar", type="primary"):
+        batch = []
+        for uploaded_file in uploaded_files:
+            extension = uploaded_file.name.lower().rsplit(".", 1)[-1]
+            uploaded_file.seek(0)
+            batch.append((uploaded_file.name, extension, uploaded_file, options.get(extension, {})))
+        enqueue_imports(db, user.id, batch)  # enviados juntos: o worker lê em paralelo e grava em ordem
+        ensure_worker()
+        st.toast(f"{len(uploaded_files)} extrato(s) na fila: pode continuar usando o app.")
+
+    jobs = user_jobs(db, user.id)
+    if any(job.status in ("queued", "running") for job in jobs):
+        ensure_worker()  # servidor reiniciado: retoma os jobs interrompidos
+        render_import_jobs_live(user.id)
+    else:
+        render_import_jobs(db, user.id, jobs)
+
+def show_import_result(progress):
+    st.success(f"{progress.imported:,} lançamentos importados em {progress.seconds:.1f}s.".replace(",", "."))
+    if progress.categorized:
+        st.caption(f"{progress.categorized:,} lançamentos sem balde foram classificados pelo histórico.".replace(",", "."))
+    if progress.duplicates:
+        st.info(f"{progress.duplicates:,} lançamentos já importados antes foram ignorados.".replace(",", "."))
+    if progress.rejected:
+        st.warning(f"{progress.rejected:,} linhas rejeitadas (as primeiras abaixo).".replace(",", "."))
+        safe_dataframe(pd.DataFrame(progress.errors, columns=["Linha", "Motivo"]))
+
+def render_import_jobs(db, user_id, jobs=None):
+    """Importações do usuário, lidas da fila (import_jobs)."""
+    jobs = user_jobs(db, user_id) if jobs is None else jobs
+    if not jobs:
+        return
+    st.subheader("Importações")
+    for job in jobs:
+        p = job_progress(job)
+        if job.status == "queued":
+            st.progress(0.0, text=f"{job.name}: na fila...")
+        elif job.status == "running":
+            st.progress(p.fraction or 0.0,
+                        text=f"{job.name}: {p.imported:,} lançamentos importados...".replace(",", "."))
+        elif job.status == "failed":
+            st.error(f"{job.name}: {job.error}")
+        else:
+            st.markdown(f"**{job.name}**")
+            if not p.chunks:
+                st.warning("Nenhum lançamento reconhecido no arquivo.")
+            else:
+                show_import_result(p)
+    if all(job.status in ("done", "failed") for job in jobs) and st.button("🧹 Limpar concluídas"):
+        forget_finished(db, user_id)
+        st.rerun()
+
+@st.experimental_fragment(run_every=2)
+def render_import_jobs_live(user_id):
+    """Reexecuta só este trecho a cada 2s enquanto houver importação na fila ou rodando."""
+    with SessionLocal() as db:
+        jobs = user_jobs(db, user_id)
+        render_import_jobs(db, user_id, jobs)
+    if all(job.status in ("done", "failed") for job in jobs):
+        st.rerun()  # terminou: volta para a página inteira (saldos e caches já invalidados)
 
 def handle_configuracoes(db, user, profile):
     """Handle the Settings section"""
@@ -1175,12 +1199,45 @@ def handle_configuracoes(db, user, profile):
         renda_mensal = st.number_input("Renda Mensal", value=profile.monthly_income, min_value=0.0, step=100.0)
         despesa_mensal = st.number_input("Despesa Mensal", value=profile.monthly_expense, min_value=0.0, step=100.0)
         if st.form_submit_button("💾 Salvar"):
-            profile.monthly_income = renda_mensal
-            profile.monthly_expense = despesa_mensal
+            row = db.get(UserProfile, profile.id)
+            row.monthly_income = renda_mensal
+            row.monthly_expense = despesa_mensal
             db.commit()
+            invalidate_user_cache("profile", user_id=user.id)
             st.success("Perfil atualizado!")
             st.rerun()
 
+    render_account_export(user.id)
+
+def render_account_export(user_id: int):
+    """Arquivo completo da conta (.zip) e planilha Excel, gerados sob demanda (ver exports.py).
+
+    Numa sessão só de leitura: a exportação leva segundos ou minutos e não pode segurar o escritor.
+    """
+    st.subheader("📦 Exportar dados")
+    formatos = "CSV e Parquet" if HAS_PARQUET else "CSV (Parquet requer pyarrow)"
+    st.caption(f"Livro Caixa, contas, gigantes e pagamentos em {formatos}.")
+    stamp = date.today().strftime("%Y%m%d")
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("Gerar arquivo completo (.zip)", use_container_width=True):
+            with st.spinner("Montando o arquivo..."), get_session(readonly=True) as export_db, \
+                    tempfile.TemporaryFile() as spool:
+                for part in account_archive(export_db, user_id):
+                    spool.write(part)
+                spool.seek(0)
+                st.download_button("⬇️ Baixar .zip", spool.read(), f"davi_conta_{stamp}.zip", "application/zip",
+                                   use_container_width=True)
+    with col2:
+        if HAS_EXCEL and st.button("Gerar planilha (.xlsx)", use_container_width=True):
+            with st.spinner("Montando a planilha..."), get_session(readonly=True) as export_db, \
+                    tempfile.TemporaryFile() as spool:
+                write_excel(export_db, user_id, spool)
+                spool.seek(0)
+                st.download_button("⬇️ Baixar .xlsx", spool.read(), f"davi_conta_{stamp}.xlsx",
+                                   "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                                   use_container_width=True)
+
 def get_menu_handler(menu):
     """Get the appropriate menu handler function based on menu name"""
     menu_mapping = {
@@ -1517,8 +1574,7 @@ def main():
                                 if manter_login:
                                     st.session_state.saved_user = user
                                 
-                                # Executar alocação automática após login
-                                ensure_daily_allocation(db, user)
+                                # receita diária é lançada fora do login: python manage.py allocate-daily
                                 st.rerun()
                             else:
                                 st.error("Usuário ou senha inválidos.")
@@ -1631,6 +1687,10 @@ def main():
                   "income" if menu == "Entrada e Saída" else "home")
         
         # Handle menu navigation
+            totals = movement_totals(db, user.id)
+            total_receitas = from_cents(totals["Receita"])
+            total_despesas = from_cents(totals["Despesa"])
+            saldo_atual = from_cents(totals["Receita"] - totals["Despesa"])
             col1, col2, col3 = st.columns(3)
             
             with col1:
@@ -1662,27 +1722,15 @@ def main():
             
             # Gráficos
             if movements:
-                df = pd.DataFrame([
-                    {
-                        "data": m.date,
-                        "valor": m.amount if m.kind == "Receita" else -m.amount,
-                        "tipo": m.kind,
-                        "descrição": m.description
-                    }
-                    for m in movements
-                ]).sort_values("data")
-                
-                # Gráfico de linha - Evolução diária
+                # Gráfico de linha - Evolução diária (totais por dia, no máximo MAX_POINTS pontos; ver charts.py)
                 st.subheader("📈 Evolução de Movimentações")
                 fig, ax = plt.subplots(figsize=(10, 4))
                 
-                df_receitas = df[df["tipo"] == "Receita"]
-                df_despesas = df[df["tipo"] == "Despesa"]
-                
-                ax.plot(df_receitas["data"], df_receitas["valor"], 
-                       color="green", label="Receitas", marker="o")
-                ax.plot(df_despesas["data"], -df_despesas["valor"], 
-                       color="red", label="Despesas", marker="o")
+                evolucao = evolution_series(db, user.id)
+                for tipo, color, label in (("Receita", "green", "Receitas"), ("Despesa", "red", "Despesas")):
+                    dias, valores = evolucao[tipo]
+                    ax.plot(dias, valores, color=color, label=label,
+                            marker="o" if len(dias) <= MARKER_POINTS else None)
                 
                 ax.set_xlabel("Data")
                 ax.set_ylabel("Valor (R$)")
@@ -1692,14 +1740,14 @@ def main():
                 plt.tight_layout()
                 st.pyplot(fig)
                 
-                # Gráfico de área - Saldo acumulado
+                # Gráfico de área - Saldo acumulado (fim de cada dia, no máximo MAX_POINTS pontos; ver charts.py)
                 st.subheader("📊 Saldo Acumulado")
                 fig2, ax2 = plt.subplots(figsize=(10, 4))
                 
-                df["saldo_acumulado"] = df["valor"].cumsum()
-                ax2.fill_between(df["data"], df["saldo_acumulado"], 
+                dias_saldo, saldo = balance_series(db, user.id)
+                ax2.fill_between(dias_saldo, saldo, 
                                alpha=0.3, color="blue")
-                ax2.plot(df["data"], df["saldo_acumulado"], 
+                ax2.plot(dias_saldo, saldo, 
                         color="blue", label="Saldo")
                 
                 ax2.set_xlabel("Data")
@@ -1711,11 +1759,19 @@ def main():
                 st.pyplot(fig2)
                 
                 st.subheader("📝 Movimentações Recentes")
-                safe_dataframe(df.tail(10).sort_values("data", ascending=False))
+                safe_dataframe(pd.DataFrame([
+                    {
+                        "data": m.date,
+                        "valor": m.amount if m.kind == "Receita" else -m.amount,
+                        "tipo": m.kind,
+                        "descrição": m.description
+                    }
+                    for m in sorted(movements, key=lambda m: m.date, reverse=True)[:10]
+                ]))
         
         elif menu == "Plano de Ataque":
             # Usar a nova versão otimizada do Plano de Ataque
-            render_plano_ataque(db, giants)
+            render_plano_ataque(db, giants, load_user_payments(user.id), daily_budget_for_giants(db, user, buckets))
             
             # Mobile-optimized styles
             st.markdown("""
@@ -1749,8 +1805,10 @@ def main():
                 
                 # Previsões
                 st.caption("⏱️ Previsões")
+                payments = load_user_payments(user.id)
+                overview = payments.overview([g.id for g in giants])
                 for g in giants:
-                    restante, diaria, dias = giant_forecast(g, db)
+                    restante, diaria, dias = giant_forecast(g, db, paid_cents=payments.paid_cents(g.id))
                     txt = f"• **{g.name}** — Restante: {money_br(restante)} | Meta diária: {money_br(diaria)}"
                     txt += f" | ~ **{math.ceil(dias)}** dias" if dias else " | defina a Meta semanal"
                     st.markdown(txt)
@@ -1767,13 +1825,12 @@ def main():
                 # Recalcula dados para tabela
                 rows = []
                 for g in giants:
-                    total_pago = sum(p.amount for p in db.query(GiantPayment).filter_by(giant_id=g.id).all())
+                    stats = overview.get(g.id, {"paid": 0, "week": 0})
+                    total_pago = from_cents(stats["paid"])
                     restante = max(0.0, (g.total_to_pay or 0.0) - total_pago)
                     progresso = (total_pago / g.total_to_pay) if (g.total_to_pay or 0) > 0 else 0.0
 
-                    ultima_semana = date.today() - timedelta(days=7)
-                    aportes = db.query(GiantPayment).filter_by(giant_id=g.id).all()
-                    depositos_semana = sum(p.amount for p in aportes if p.date and p.date >= ultima_semana)
+                    depositos_semana = from_cents(stats["week"])
                     meta_txt = "-" if not g.weekly_goal else f"{money_br(depositos_semana)} / {money_br(g.weekly_goal)}"
 
                     rows.append({
@@ -1831,7 +1888,7 @@ def main():
                                         ok = delete_giant(db, int(row["ID"]), uid)
                                         if ok:
                                             st.toast("🗑️ Excluído!")
-                                            st.cache_data.clear()
+                                            invalidate_user_cache("giants", "payments")
                                             st.rerun()
                                         else:
                                             st.toast("Não foi possível excluir")
@@ -1851,7 +1908,7 @@ def main():
                         if st.button("🗑️ Excluir", key=f"d{g['ID']}"):
                             with get_db() as new_db:  # Nova conexão para exclusão
                                 if delete_giant(new_db, user.id, g['ID']):
-                                    st.cache_data.clear()  # Limpa cache após exclusão
+                                    invalidate_user_cache("giants", "payments")  # Limpa cache após exclusão
                                     time.sleep(0.5)  # Pequena pausa para feedback visual
                                     st.rerun()
                     
@@ -1869,6 +1926,7 @@ def main():
                                         giant.total_to_pay = total
                                         giant.weekly_goal = meta
                                         giant.interest_rate = taxa
+                                invalidate_user_cache("giants", "payments")
                                 st.toast("Atualizado.")
                                 st.session_state[f"edit_g_{g['ID']}"]=False
                                 st.rerun()
@@ -1886,8 +1944,10 @@ def main():
 
                 # Previsões
                 st.subheader("⏱️ Previsões")
+                giants_by_id = {gg.id: gg for gg in giants}
+                payments = load_user_payments(user.id)
                 for g in rows:
-                    restante, diaria, dias = giant_forecast(Giant(**g), db)
+                    restante, diaria, dias = giant_forecast(giants_by_id[g["ID"]], db, paid_cents=payments.paid_cents(g["ID"]))
                     txt = f"• **{g['Nome']}** — Restante: {money_br(restante)} | Meta diária: {money_br(diaria)}"
                     txt += f" | ~ **{math.ceil(dias)}** dias" if dias else " | defina a Meta semanal"
                     st.markdown(txt)
@@ -1920,7 +1980,7 @@ def main():
                             if fail > 0:
                                 st.warning(f"{fail} registro(s) não puderam ser excluídos.")
                             
-                            st.cache_data.clear()
+                            invalidate_user_cache("giants", "payments")
                             time.sleep(1)  # Pequena pausa para feedback visual
                             st.rerun()
 
@@ -1992,7 +2052,7 @@ def main():
                                         result = False
                                     if result:
                                         st.success(f"Gigante {giant['Nome']} excluído com sucesso!")
-                                        st.cache_data.clear()
+                                        invalidate_user_cache("giants", "payments")
                                         time.sleep(0.5)  # Feedback visual
                                         del st.session_state.confirming_delete
                                         st.rerun()
@@ -2028,6 +2088,7 @@ def main():
                                         return False
                                     
                                     if safe_operation(update_giant, giant['ID'], new_total, new_goal):
+                                        invalidate_user_cache("giants", "payments")
                                         st.success("Gigante atualizado!")
                                         st.session_state[f"edit_{giant['ID']}"] = False
                                         st.rerun()
@@ -2047,7 +2108,7 @@ def main():
                                             db.query(GiantPayment).filter(GiantPayment.giant_id == g.id).delete(synchronize_session=False)
                                             db.delete(g)
                                             db.commit()
-                                            st.cache_data.clear()
+                                            invalidate_user_cache("giants", "payments")
                                             return True
                                         except Exception as e:
                                             db.rollback()
@@ -2057,7 +2118,7 @@ def main():
                                     with get_db() as db:
                                         if delete_giant(db, giant['ID']):
                                             st.success("Gigante excluído!")
-                                            st.cache_data.clear()
+                                            invalidate_user_cache("giants", "payments")
                                             st.rerun()
                                         else:
                                             st.error("Gigante não encontrado ou já removido.")
@@ -2082,6 +2143,8 @@ def main():
                                             g.total_to_pay = new_total
                                             g.weekly_goal = new_goal
                                             g.interest_rate = new_rate
+                                            db.commit()
+                                            invalidate_user_cache("giants", "payments")
                                         st.session_state.editing = None
                                         st.rerun()
                 
@@ -2093,6 +2156,8 @@ def main():
                                         g = db.query(Giant).get(giant['ID'])
                                         if g:
                                             db.delete(g)
+                                            db.commit()
+                                            invalidate_user_cache("giants", "payments")
                                         st.session_state.confirmar_exclusao.pop(giant['ID'])
                                         st.rerun()
                             with col2:
@@ -2125,6 +2190,7 @@ def main():
                                         db.query(GiantPayment).filter_by(giant_id=sel_id).delete()
                                         db.delete(giant_sel)
                                         db.commit()
+                                        invalidate_user_cache("giants", "payments")
                                         st.success("Gigante excluído com sucesso!")
                                         st.session_state.confirmar_exclusao.pop(sel_id, None)
                                         st.rerun()
@@ -2165,7 +2231,7 @@ def main():
                                         if giant_sel:
                                             check_giant_victory(new_db, giant_sel, valor_aporte)
                                             new_db.commit()
-                                            st.cache_data.clear()
+                                            invalidate_user_cache("giants", "payments")
                                             st.success("✅ Aporte registrado!")
                                             st.toast(f"💰 {money_br(valor_aporte)} aportado", icon="💪")
                                             time.sleep(0.5)
@@ -2317,6 +2383,7 @@ def create_bucket(db, user, name, tipo, description, percent):
     )
     db.add(bucket)
     db.commit()
+    invalidate_user_cache("buckets", user_id=user.id)
     return bucket
                         st.error("Preencha o nome e tipo do balde")
             
@@ -2353,10 +2420,10 @@ def create_bucket(db, user, name, tipo, description, percent):
                             try:
                                 # Delete with synchronize_session=False for better performance
                                 db.query(Movement).filter(Movement.bucket_id == bucket.id).delete(synchronize_session=False)
-                                db.delete(bucket)
+                                db.delete(db.get(Bucket, bucket.id))
                                 db.commit()
                                 st.success("Balde excluído com sucesso!")
-                                st.cache_data.clear()
+                                invalidate_user_cache("buckets", "movements")
                                 st.rerun()
                             except Exception as e:
                                 db.rollback()
@@ -2383,8 +2450,9 @@ def create_bucket(db, user, name, tipo, description, percent):
                                     total_percent = sum(b.percent for b in buckets)
                                     for bucket in buckets:
                                         perc_norm = (bucket.percent / total_percent) if total_percent > 0 else 0
-                                        bucket.balance = novo_total * perc_norm
+                                        db.get(Bucket, bucket.id).balance = novo_total * perc_norm
                                     db.commit()
+                                    invalidate_user_cache("buckets")
                                     st.success("Saldo total ajustado e distribuído!")
                                     st.session_state["editing_total"] = False
                                     st.rerun()
@@ -2415,8 +2483,9 @@ def create_bucket(db, user, name, tipo, description, percent):
                         with col1:
                             if st.form_submit_button("💾 Salvar"):
                                 for bucket in buckets:
-                                    bucket.balance = new_balances[bucket.id]
+                                    db.get(Bucket, bucket.id).balance = new_balances[bucket.id]
                                 db.commit()
+                                invalidate_user_cache("buckets")
                                 st.session_state["editing_balances"] = False
                                 st.success("Saldos atualizados!")
                                 st.rerun()
@@ -2453,12 +2522,12 @@ def create_bucket(db, user, name, tipo, description, percent):
                             db.commit()
                         st.success("✅ Registrado e dividido nos baldes.")
                         st.toast("💸 Registrado!", icon="💸")
-                        st.cache_data.clear()
+                        invalidate_user_cache("movements", "buckets")
                         st.rerun()
                     except Exception as e:
                         st.error(f"Falha ao registrar: {e}")
                         db.close()
-                    st.cache_data.clear()
+                    invalidate_user_cache("movements", "buckets")
                     st.rerun()
                     
                     if valor <= 0:
@@ -2469,7 +2538,7 @@ def create_bucket(db, user, name, tipo, description, percent):
                             if distribuir_por_baldes(new_db, user.id, valor, desc, date.today(), tipo):
                                 st.success(f"✅ {tipo} de {money_br(valor)} distribuída entre baldes.")
                                 st.toast("Transação registrada!", icon="💰")
-                                st.cache_data.clear()  # Limpa cache para atualizar valores
+                                invalidate_user_cache("movements", "buckets")  # Limpa cache para atualizar valores
                                 time.sleep(0.5)  # Pequena pausa para feedback
                                 st.rerun()
                             else:
@@ -2478,24 +2547,8 @@ def create_bucket(db, user, name, tipo, description, percent):
 
             with col2:
                 if movements:
-                    csv = pd.DataFrame([
-                        {
-                            "Data": m.date,
-                            "Descrição": m.description,
-                            "Tipo": m.kind,
-                            "Valor": m.amount if m.kind == "Receita" else -m.amount,
-                            "Balde": next((b.name for b in buckets if b.id == m.bucket_id), None)
-                        }
-                        for m in movements
-                    ]).to_csv(index=False, sep=';').encode('utf-8')
-                    
-                    st.download_button(
-                        "📥 Exportar CSV",
-                        csv,
-                        "extrato.csv",
-                        "text/csv",
-                        key="download-csv"
-                    )
+                    with get_db() as export_db:
+                        export_ledger_button(export_db, user.id, "download-csv")
             
             # Confirmação para limpar
             if st.session_state.get("confirmar_limpar", False):
@@ -2506,6 +2559,7 @@ def create_bucket(db, user, name, tipo, description, percent):
                         with get_db() as db:
                             db.query(Movement).filter_by(user_id=user.id).delete()
                             db.commit()
+                            invalidate_user_cache("movements")
                             st.success("Histórico limpo com sucesso!")
                             st.session_state["confirmar_limpar"] = False
                             time.sleep(1)
@@ -2517,9 +2571,10 @@ def create_bucket(db, user, name, tipo, description, percent):
             
             if movements:
                 # Mostrar totais
-                total_receitas = sum(m.amount for m in movements if m.kind == "Receita")
-                total_despesas = sum(m.amount for m in movements if m.kind == "Despesa")
-                saldo = total_receitas - total_despesas
+                totals = movement_totals(db, user.id)
+                total_receitas = from_cents(totals["Receita"])
+                total_despesas = from_cents(totals["Despesa"])
+                saldo = from_cents(totals["Receita"] - totals["Despesa"])
                 
                 col1, col2, col3 = st.columns(3)
                 with col1:
@@ -2554,17 +2609,23 @@ def create_bucket(db, user, name, tipo, description, percent):
                 # Mobile-friendly movements table with pagination
                 st.subheader("📝 Histórico de Movimentações")
 
-                # Pagination controls
+                # Pagination controls (keyset: pilha com o cursor de início de cada página visitada)
                 items_per_page = 50
-                if 'movement_page' not in st.session_state:
-                    st.session_state.movement_page = 1
+                if 'movement_cursors' not in st.session_state:
+                    st.session_state.movement_cursors = [None]
+                movement_page = len(st.session_state.movement_cursors)
 
-                movements_page, total_movements = load_user_movements(
+                movements_page, next_cursor, total_movements = load_user_movements(
                     user.id, 
-                    page=st.session_state.movement_page,
+                    cursor=st.session_state.movement_cursors[-1],
                     per_page=items_per_page
                 )
+                if not movements_page and movement_page > 1:
+                    # página esvaziada por exclusões: volta ao início
+                    st.session_state.movement_cursors = [None]
+                    st.rerun()
 
+                bucket_names = {b.id: b.name for b in buckets}
                 df_movements = pd.DataFrame([
                     {
                         "ID": m.id,
@@ -2572,7 +2633,7 @@ def create_bucket(db, user, name, tipo, description, percent):
                         "Descrição": m.description,
                         "Tipo": "➕ Receita" if m.kind == "Receita" else "➖ Despesa",
                         "Valor": money_br(m.amount if m.kind == "Receita" else -m.amount),
-                        "Balde": next((b.name for b in buckets if b.id == m.bucket_id), ""),
+                        "Balde": bucket_names.get(m.bucket_id, ""),
                         "Excluir": False
                     }
                     for m in movements_page
@@ -2585,24 +2646,24 @@ def create_bucket(db, user, name, tipo, description, percent):
                     num_rows="fixed",
                     hide_index=True,
                     disabled=["ID", "Data", "Descrição", "Tipo", "Valor", "Balde"],
-                    key=f"movements_editor_{st.session_state.movement_page}"
+                    key=f"movements_editor_{movement_page}"
                 )
 
                 # Pagination controls
-                total_pages = (total_movements + items_per_page - 1) // items_per_page
-                if total_pages > 1:
+                total_pages = max(1, (total_movements + items_per_page - 1) // items_per_page)
+                if movement_page > 1 or next_cursor is not None:
                     col1, col2, col3 = st.columns([1, 2, 1])
                     with col1:
-                        if st.session_state.movement_page > 1:
+                        if movement_page > 1:
                             if st.button("⬅️ Anterior"):
-                                st.session_state.movement_page -= 1
+                                st.session_state.movement_cursors.pop()
                                 st.rerun()
                     with col2:
-                        st.write(f"Página {st.session_state.movement_page} de {total_pages}")
+                        st.write(f"Página {movement_page} de {total_pages}")
                     with col3:
-                        if st.session_state.movement_page < total_pages:
+                        if next_cursor is not None:
                             if st.button("Próxima ➡️"):
-                                st.session_state.movement_page += 1
+                                st.session_state.movement_cursors.append(next_cursor)
                                 st.rerun()
 
                 # Process deletions
@@ -2623,7 +2684,7 @@ def create_bucket(db, user, name, tipo, description, percent):
                             st.success(f"{ok} movimento(s) excluído(s).")
                         if fail:
                             st.warning(f"{fail} não encontrado(s) ou já removido(s).")
-                        st.cache_data.clear()
+                        invalidate_user_cache("movements", "buckets")
                         st.rerun()
 
                 
@@ -2638,6 +2699,7 @@ def create_bucket(db, user, name, tipo, description, percent):
                             if mov:
                                 db.delete(mov)
                         db.commit()
+                        invalidate_user_cache("movements")
                         st.success("Movimentações selecionadas excluídas!")
                         time.sleep(0.5)
                         st.rerun()
@@ -2675,6 +2737,7 @@ def create_bucket(db, user, name, tipo, description, percent):
                             )
                             db.add(bill)
                             db.commit()
+                            invalidate_user_cache("bills")
                             st.success(f"Conta {descricao} adicionada para {date_br(data_venc)}")
                             st.rerun()
             
@@ -2734,7 +2797,7 @@ def create_bucket(db, user, name, tipo, description, percent):
                             bill.paid = True
                             db.commit()
                             st.success(f"✅ {bill.title} marcada como paga!")
-                            st.cache_data.clear()
+                            invalidate_user_cache("bills")
                             st.rerun()
 
                 # Process deletions
@@ -2755,7 +2818,7 @@ def create_bucket(db, user, name, tipo, description, percent):
                             st.success(f"{ok} conta(s) excluída(s).")
                         if fail:
                             st.warning(f"{fail} não encontrada(s) ou já removida(s).")
-                        st.cache_data.clear()
+                        invalidate_user_cache("bills")
                         st.rerun()
                 
                 # Sumário de valores
@@ -2812,32 +2875,7 @@ def create_bucket(db, user, name, tipo, description, percent):
         
         # Importar Extrato
         elif menu == "Importar Extrato":
-            st.header("📥 Importar Extrato")
-            
-            uploaded_file = st.file_uploader("Escolha um arquivo CSV", type="csv")
-            if uploaded_file is not None:
-                # Ler o arquivo CSV
-                df_import = pd.read_csv(uploaded_file, sep=';')
-                
-                # Validar colunas
-                required_columns = {"Data", "Descrição", "Tipo", "Valor", "Balde"}
-                if not required_columns.issubset(df_import.columns):
-                    st.error("O arquivo CSV deve conter as colunas: " + ", ".join(required_columns))
-                else:
-                    # Inserir dados no banco
-                    for _, row in df_import.iterrows():
-                        mov = Movement(
-                            user_id=user.id,
-                            date=row["Data"],
-                            description=row["Descrição"],
-                            kind=row["Tipo"],
-                            amount=row["Valor"],
-                            bucket_id=row["Balde"]
-                        )
-                        db.add(mov)
-                    db.commit()
-                    st.success("Extrato importado com sucesso!")
-                    st.rerun()
+            handle_importar_extrato(db, user)
         
         # Configurações
         elif menu == "Configurações":
@@ -2850,11 +2888,22 @@ def create_bucket(db, user, name, tipo, description, percent):
                 despesa_mensal = st.number_input("Despesa Mensal", value=profile.monthly_expense, min_value=0.0, step=100.0)
                 
                 if st.form_submit_button("Salvar"):
-                    profile.monthly_income = renda_mensal
-                    profile.monthly_expense = despesa_mensal
+                    row = db.get(UserProfile, profile.id)
+                    row.monthly_income = renda_mensal
+                    row.monthly_expense = despesa_mensal
                     db.commit()
+                    invalidate_user_cache("profile")
                     st.success("Perfil atualizado com sucesso!")
                     st.rerun()
+
+            with st.expander("📈 Cache do servidor"):
+                stats = cache.stats()
+                c1, c2, c3 = st.columns(3)
+                c1.metric("Acertos", stats["hits"])
+                c2.metric("Faltas", stats["misses"])
+                c3.metric("Taxa de acerto", f"{stats['hit_rate']:.0%}")
+                st.caption(f"{stats['entries']} entradas · {stats['evictions']} despejos · "
+                           f"{stats['invalidations']} invalidações")
         
         # Outras seções
         else:
@@ -1,8 +1,10 @@
 import streamlit as st
 import pandas as pd
-from datetime import date, timedelta
-from models import Movement
-from db_helpers import get_profile, load_buckets
+from datetime import date
+from db_helpers import get_profile
+from money import to_cents
+from cache import invalidate
+from services.allocation import KIND_BY_TIPO, allocate, post_movements
 
 def safe_dataframe(df, **kwargs):
     """st.dataframe sem column_config (evita JSON serializable error no Streamlit Cloud)."""
@@ -19,34 +21,20 @@ def distribute_by_buckets(
         return
 
     if auto or not bucket_id:
-        total_percent = sum(max(b.percent, 0) for b in buckets)
-        if total_percent <= 0:
-            st.error("Configure percentuais dos baldes em 'Baldes'.")
+        try:
+            allocate(db, user_id, buckets, [(valor, tipo, data_mov, desc)])
+        except ValueError as e:
+            st.error(str(e))
             return
-        for b in buckets:
-            part = round(valor * (b.percent / total_percent), 2)
-            db.add(Movement(
-                user_id=user_id, bucket_id=b.id,
-                kind=("Receita" if tipo == "Entrada" else "Despesa"),
-                amount=part, description=f"{desc} (auto {b.percent:.1f}%)",
-                date=data_mov
-            ))
-            if tipo == "Entrada": b.balance += part
-            else: b.balance -= part
     else:
         b = next((x for x in buckets if x.id == bucket_id), None)
         if not b:
             st.error("Balde inválido.")
             return
-        db.add(Movement(
-            user_id=user_id, bucket_id=b.id,
-            kind=("Receita" if tipo == "Entrada" else "Despesa"),
-            amount=valor, description=desc, date=data_mov
-        ))
-        b.balance += (valor if tipo == "Entrada" else -valor)
+        post_movements(db, user_id, [(b.id, KIND_BY_TIPO[tipo], to_cents(valor), desc, data_mov)], [b])
 
     db.commit()
-    st.cache_data.clear()
+    invalidate(user_id, "movements", "buckets")
     st.toast("Lançamento salvo!", icon="✅")
     st.rerun()
 
@@ -55,42 +43,6 @@ def dias_do_mes(d: date) -> int:
     from calendar import monthrange
     return monthrange(d.year, d.month)[1]
 
-def ensure_daily_allocation(db, user):
-    """Gera receitas diárias proporcionais aos percentuais desde a última execução."""
-    profile = get_profile(db, user.id)
-    if not profile.monthly_income:
-        return
-
-    today = date.today()
-    if not getattr(profile, "last_allocation_date", None):
-        # primeira execução: não retroagir demais; começa de ontem
-        profile.last_allocation_date = today - timedelta(days=1)
-
-    start = profile.last_allocation_date + timedelta(days=1)
-    if start > today:
-        return
-
-    buckets = load_buckets(db, user.id)
-    total_percent = sum(max(b.percent, 0) for b in buckets)
-    if not buckets or total_percent <= 0:
-        return
-
-    daily = round(profile.monthly_income / dias_do_mes(today), 2)
-    d = start
-    while d <= today:
-        for b in buckets:
-            part = round(daily * (b.percent / total_percent), 2)
-            db.add(Movement(
-                user_id=user.id, bucket_id=b.id, kind="Receita",
-                amount=part, description="Auto diária", date=d
-            ))
-            b.balance += part
-        d += timedelta(days=1)
-
-    profile.last_allocation_date = today
-    db.commit()
-    st.cache_data.clear()
-
 def daily_budget_for_giants(db, user, buckets):
     """Calcula o orçamento diário disponível para os gigantes."""
     # prioriza buckets com type "giant" (case-insensitive)
@@ -0,0 +1,1076 @@
+"""Benchmarks do APP DAVI.
+
+Rodam contra um banco SQLite temporário (nunca o sql_app.db do projeto):
+
+    python bench.py engines --threads 8 --seconds 5
+    python bench.py plans
+    python bench.py pages --movements 200000
+    python bench.py allocation --sizes 1 100 10000
+    python bench.py catchup --days 90 --buckets 8
+    python bench.py cache --users 50 --write-ratio 0.1
+    python bench.py dtos
+    python bench.py payoff --giants 100 --months 360
+    python bench.py optimizer --max-giants 5 --cases 50 --steps 10
+    python bench.py montecarlo --paths 10000 --giants 5 20 100
+    python bench.py import --rows 500000
+    python bench.py formats --rows 100000
+    python bench.py dedupe --rows 100000
+    python bench.py categorize --rows 100000 --history 20000
+    python bench.py parallel --files 12 --rows 50000 --workers 1 2 4
+    python bench.py export --movements 1000000
+    python bench.py archive --movements 1000000
+    python bench.py charts --movements 200000 --years 10
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+_TMP = Path(tempfile.mkdtemp(prefix="davi_bench_"))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_TMP / 'bench.db'}")
+
+from sqlalchemy import create_engine, event, insert, select, func, text  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from sqlalchemy.pool import QueuePool  # noqa: E402
+
+import db  # noqa: E402
+from models import Base, User, Bucket, Movement, Giant, GiantPayment, Bill  # noqa: E402
+from tests.corpus import synthetic_transactions, write_statement_csv, write_statement_ofx, write_statement_qif  # noqa: E402
+
+
+def _seed(engine, users=20, movements_per_user=2000):
+    """Cria usuários/baldes/movimentos sintéticos para os benchmarks."""
+    Base.metadata.create_all(engine)
+    rnd = random.Random(42)
+    start = date.today() - timedelta(days=365)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"id": u, "name": f"bench{u}", "password_hash": "x"} for u in range(1, users + 1)])
+        conn.execute(insert(Bucket), [
+            {"id": u * 10 + k, "user_id": u, "name": f"B{k}", "percent": 25.0, "balance": 0.0}
+            for u in range(1, users + 1) for k in range(4)
+        ])
+        if not movements_per_user:
+            return
+        conn.execute(insert(Movement), [
+            {
+                "user_id": u, "bucket_id": u * 10 + rnd.randrange(4),
+                "kind": rnd.choice(("Receita", "Despesa")), "amount": round(rnd.uniform(1, 500), 2),
+                "description": "seed", "date": start + timedelta(days=rnd.randrange(365)),
+            }
+            for u in range(1, users + 1) for _ in range(movements_per_user)
+        ])
+
+
+def _mixed_workload(read_factory, write_factory, threads, seconds, users, write_ratio=0.2):
+    """Threads fazendo leituras (soma do livro caixa) e escritas (um lançamento)."""
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    lock = threading.Lock()
+    stop = time.perf_counter() + seconds
+
+    def worker(seed):
+        rnd = random.Random(seed)
+        local = {"reads": 0, "writes": 0, "errors": 0}
+        while time.perf_counter() < stop:
+            uid = rnd.randrange(1, users + 1)
+            try:
+                if rnd.random() < write_ratio:
+                    with write_factory() as s:
+                        s.add(Movement(user_id=uid, bucket_id=uid * 10, kind="Receita", amount=1.0,
+                                       description="bench", date=date.today()))
+                        s.commit()
+                    local["writes"] += 1
+                else:
+                    with read_factory() as s:
+                        s.execute(select(func.sum(Movement.amount)).where(Movement.user_id == uid)).scalar()
+                    local["reads"] += 1
+            except OperationalError:
+                local["errors"] += 1
+        with lock:
+            for k, v in local.items():
+                counts[k] += v
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    t0 = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    return {k: v / elapsed for k, v in counts.items() if k != "errors"} | {"errors": counts["errors"]}
+
+
+def bench_engines(args):
+    """Compara os engines antigos (QueuePool 10+20, sem WAL) com o registro de db.py."""
+    results = {}
+
+    # antes: configuração de database.py/db_utils.py (journal padrão, timeout padrão de 5s)
+    before_path = _TMP / "before.db"
+    legacy = create_engine(
+        f"sqlite:///{before_path}", poolclass=QueuePool, pool_size=10, max_overflow=20,
+        pool_timeout=30, pool_recycle=1800, pool_pre_ping=True,
+        connect_args={"check_same_thread": False},
+    )
+    _seed(legacy, args.users, args.movements)
+    legacy_sessions = sessionmaker(bind=legacy, autoflush=False)
+    results["antes"] = _mixed_workload(legacy_sessions, legacy_sessions, args.threads, args.seconds, args.users)
+    legacy.dispose()
+
+    # depois: escritor único + pool de leitura com o perfil de pragmas
+    after_url = f"sqlite:///{_TMP / 'after.db'}"
+    writer, reader = db.create_engines(after_url)
+    _seed(writer, args.users, args.movements)
+    AfterSession = type("AfterSession", (db.RoutingSession,), {"writer": writer, "reader": reader})
+    write_sessions = sessionmaker(class_=AfterSession, autoflush=False)
+    read_sessions = sessionmaker(bind=reader, autoflush=False)
+    results["depois"] = _mixed_workload(read_sessions, write_sessions, args.threads, args.seconds, args.users)
+    writer.dispose()
+    reader.dispose()
+
+    print(f"{'config':<8} {'leituras/s':>12} {'escritas/s':>12} {'erros':>6}")
+    for name, r in results.items():
+        print(f"{name:<8} {r['reads']:>12.0f} {r['writes']:>12.0f} {r['errors']:>6}")
+
+
+def bench_plans(args):
+    """EXPLAIN QUERY PLAN das consultas emitidas pelos loaders: falha se algum não usar o índice."""
+    import db_helpers
+    import read_models
+    from migrations import run_migrations
+
+    run_migrations()
+    _seed(db.engine, users=3, movements_per_user=200)
+    with db.engine.begin() as conn:
+        conn.execute(insert(Giant), [{"id": g, "user_id": 1, "name": f"G{g}", "total_to_pay": 1000.0} for g in range(1, 21)])
+        conn.execute(insert(GiantPayment), [
+            {"user_id": 1, "giant_id": g, "amount": 10.0, "date": date.today() - timedelta(days=d)}
+            for g in range(1, 21) for d in range(50)
+        ])
+        conn.execute(insert(Bill), [
+            {"user_id": 1, "title": f"C{d}", "amount": 10.0, "due_date": date.today() + timedelta(days=d)} for d in range(50)
+        ])
+        conn.exec_driver_sql("ANALYZE")
+
+    expected = {
+        "load_movements": ("movements", "ix_movements_user_date", lambda s: db_helpers.load_movements(s, 1)),
+        "load_user_movements": ("movements", "ix_movements_user_date",
+                                lambda s: read_models.read_movements_page(s, 1, (date.today() - timedelta(days=180), 10**9), 50)),
+        "read_payment_index": ("giant_payments", "ix_giant_payments_user_giant_date",
+                               lambda s: read_models.read_payment_index(s, 1)),
+        "load_bills": ("bills", "ix_bills_user_due", lambda s: db_helpers.load_bills(s, 1)),
+        "load_buckets": ("buckets", "ix_buckets_user", lambda s: db_helpers.load_buckets(s, 1)),
+    }
+    failures = 0
+    for name, (table, index, call) in expected.items():
+        captured = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if f"FROM {table}" in statement:
+                captured.append((statement, parameters))
+
+        for eng in {db.engine, db.read_engine}:
+            event.listen(eng, "before_cursor_execute", capture)
+        with db.SessionLocal() as s:
+            call(s)
+        for eng in {db.engine, db.read_engine}:
+            event.remove(eng, "before_cursor_execute", capture)
+
+        for statement, parameters in captured:
+            with db.engine.connect() as conn:
+                plan = " | ".join(r[-1] for r in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters))
+            ok = index in plan
+            failures += not ok
+            print(f"[{'ok' if ok else 'FALHOU'}] {name}: {plan}")
+    raise SystemExit(1 if failures else 0)
+
+
+def bench_catchup(args):
+    """Receita diária atrasada: laço dia x balde com ORM (antigo) x catch_up_daily_allocation."""
+    from migrations import run_migrations
+    from money import split_cents, to_cents
+    from models import UserProfile
+    from services.allocation import catch_up_daily_allocation
+
+    run_migrations()
+    users = 3
+    with db.engine.begin() as conn:
+        conn.execute(insert(User), [{"id": u, "name": f"bench{u}", "password_hash": "x"} for u in range(1, users + 1)])
+        conn.execute(insert(Bucket), [
+            {"id": u * 100 + k, "user_id": u, "name": f"B{k}", "percent": 100.0 / args.buckets, "balance": 0.0}
+            for u in range(1, users + 1) for k in range(args.buckets)
+        ])
+        conn.execute(insert(UserProfile), [
+            {"user_id": u, "monthly_income": 3000.0, "monthly_expense": 0.0,
+             "last_allocation_date": date.today() - timedelta(days=args.days)}
+            for u in range(1, users + 1)
+        ])
+
+    def orm_loop(s, uid):
+        prof = s.query(UserProfile).filter_by(user_id=uid).one()
+        buckets = s.query(Bucket).filter_by(user_id=uid).all()
+        d = prof.last_allocation_date + timedelta(days=1)
+        while d <= date.today():
+            parts = split_cents(to_cents(3000.0 / 30), [b.percent for b in buckets])
+            for b, cents in zip(buckets, parts):
+                s.add(Movement(user_id=uid, bucket_id=b.id, kind="Receita", amount=cents / 100.0,
+                               description="Auto diária", date=d))
+                b.balance += cents / 100.0
+            d += timedelta(days=1)
+        prof.last_allocation_date = date.today()
+
+    print(f"{args.days} dias x {args.buckets} baldes")
+    for uid, name, fn in ((1, "ORM dia a dia", orm_loop),
+                          (2, "lote", lambda s, u: catch_up_daily_allocation(s, u)),
+                          (3, "lote agregado", lambda s, u: catch_up_daily_allocation(s, u, aggregate=True))):
+        with db.SessionLocal() as s:
+            t0 = time.perf_counter()
+            fn(s, uid)
+            s.commit()
+            print(f"{name:<14} {(time.perf_counter() - t0) * 1000:>8.1f} ms")
+
+
+def bench_cache(args):
+    """Taxa de acerto com vários usuários: clear() global (antigo) x gerações por usuário/entidade."""
+    from cache import ENTITIES, VersionedCache
+
+    def simulate(global_clear):
+        c = VersionedCache(max_entries=100_000, ttl=3600)
+        rnd = random.Random(1)
+        for _ in range(args.requests):
+            uid = rnd.randrange(args.users)
+            for entity in ENTITIES:  # cada rerun lê todas as entidades do usuário
+                c.get_or_load(uid, entity, (), lambda: object())
+            if rnd.random() < args.write_ratio:
+                if global_clear:
+                    c.clear()
+                else:
+                    c.invalidate(uid, rnd.choice(ENTITIES))
+        return c.stats()
+
+    print(f"{args.users} usuários, {args.requests} reruns, {args.write_ratio:.0%} com escrita")
+    for name, global_clear in (("clear global", True), ("por geração", False)):
+        stats = simulate(global_clear)
+        print(f"{name:<13} acertos {stats['hits']:>7}  faltas {stats['misses']:>7}  taxa {stats['hit_rate']:.1%}")
+
+
+def bench_dtos(args):
+    """Loaders do cache: instâncias ORM destacadas (antigo) x DTOs de read_models (pickle e memória)."""
+    import pickle
+    import tracemalloc
+
+    import db_helpers
+    import read_models
+    from migrations import run_migrations
+
+    run_migrations()
+    _seed(db.engine, users=1, movements_per_user=args.movements)
+    with db.engine.begin() as conn:
+        conn.execute(insert(Giant), [{"user_id": 1, "name": f"G{g}", "total_to_pay": 1000.0} for g in range(20)])
+        conn.execute(insert(Bill), [
+            {"user_id": 1, "title": f"C{d}", "amount": 10.0, "due_date": date.today() + timedelta(days=d)} for d in range(30)
+        ])
+
+    def orm(s):
+        return (db_helpers.get_profile(s, 1), db_helpers.load_buckets(s, 1), db_helpers.load_giants(s, 1),
+                db_helpers.load_bills(s, 1),
+                s.execute(select(Movement).where(Movement.user_id == 1).order_by(Movement.date.desc()).limit(50)).scalars().all())
+
+    def dtos(s):
+        return (read_models.read_profile(s, 1), read_models.read_buckets(s, 1), read_models.read_giants(s, 1),
+                read_models.read_bills(s, 1), read_models.read_movements_page(s, 1)[0])
+
+    for load in (orm, dtos):  # aquece mappers e cache de compilação antes de medir memória
+        with db.SessionLocal() as s:
+            load(s)
+
+    print(f"{'loader':<6} {'pickle KB':>10} {'loads µs':>10} {'memória KB':>11}")
+    for name, load in (("ORM", orm), ("DTO", dtos)):
+        with db.SessionLocal() as s:
+            tracemalloc.start()
+            data = load(s)
+            mem = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+        blob = pickle.dumps(data)
+        t0 = time.perf_counter()
+        for _ in range(args.repeat):
+            pickle.loads(blob)
+        per_hit = (time.perf_counter() - t0) / args.repeat * 1e6
+        print(f"{name:<6} {len(blob) / 1024:>10.1f} {per_hit:>10.0f} {mem / 1024:>11.1f}")
+
+
+def bench_pages(args):
+    """Livro caixa: OFFSET + count() (antigo) x keyset + total do rollup, na 1ª página e em páginas fundas."""
+    from migrations import run_migrations
+    from read_models import read_movements_page as load_movements_page
+
+    run_migrations()
+    _seed(db.engine, users=1, movements_per_user=args.movements)
+    per_page = 50
+
+    def offset_page(s, page):
+        total = s.query(Movement).filter(Movement.user_id == 1).count()
+        rows = s.query(Movement).filter(Movement.user_id == 1).order_by(Movement.date.desc()) \
+            .offset((page - 1) * per_page).limit(per_page).all()
+        return rows, total
+
+    last = args.movements // per_page
+    print(f"{'página':>8} {'offset ms':>10} {'keyset ms':>10}")
+    with db.SessionLocal() as s:
+        cursors = {1: None}
+        cursor, page = None, 1
+        while cursor is not None or page == 1:  # percorre uma vez para obter os cursores
+            _, cursor, _ = load_movements_page(s, 1, cursor, per_page)
+            page += 1
+            cursors[page] = cursor
+        for page in sorted({1, last // 2, last}):
+            t0 = time.perf_counter()
+            for _ in range(args.repeat):
+                offset_page(s, page)
+            t1 = time.perf_counter()
+            for _ in range(args.repeat):
+                load_movements_page(s, 1, cursors[page], per_page)
+            t2 = time.perf_counter()
+            print(f"{page:>8} {(t1 - t0) / args.repeat * 1000:>10.2f} {(t2 - t1) / args.repeat * 1000:>10.2f}")
+
+
+def bench_allocation(args):
+    """Rateio nos baldes: Movement ORM + saldo por atributo (antigo) x services.allocation em lote."""
+    from migrations import run_migrations
+    from money import split_cents, to_cents
+    from services.allocation import allocate
+
+    run_migrations()
+    _seed(db.engine, users=2, movements_per_user=0)
+
+    def orm_loop(s, buckets, entries):
+        for valor, tipo, day, desc in entries:
+            for b, cents in zip(buckets, split_cents(to_cents(valor), [b.percent for b in buckets])):
+                part = cents / 100.0
+                s.add(Movement(user_id=b.user_id, bucket_id=b.id, kind="Receita", amount=part,
+                               description=f"{desc} (auto {b.percent:.1f}%)", date=day))
+                b.balance += part
+
+    def bulk(s, buckets, entries):
+        allocate(s, buckets[0].user_id, buckets, entries)
+
+    rnd = random.Random(7)
+    print(f"{'rateios':>8} {'ORM ms':>10} {'lote ms':>10} {'ganho':>7}")
+    for n in args.sizes:
+        entries = [(round(rnd.uniform(1, 1000), 2), "Entrada", date.today(), "bench") for _ in range(n)]
+        timings = []
+        for uid, fn in ((1, orm_loop), (2, bulk)):
+            with db.SessionLocal() as s:
+                buckets = s.query(Bucket).filter_by(user_id=uid).order_by(Bucket.id).all()
+                t0 = time.perf_counter()
+                fn(s, buckets, entries)
+                s.commit()
+                timings.append((time.perf_counter() - t0) * 1000)
+        with db.engine.connect() as conn:
+            saldos = [conn.execute(text("SELECT SUM(balance) FROM buckets WHERE user_id = :u"), {"u": u}).scalar()
+                      for u in (1, 2)]
+        assert saldos[0] == saldos[1], f"saldos divergentes: {saldos}"
+        print(f"{n:>8} {timings[0]:>10.1f} {timings[1]:>10.1f} {timings[0] / timings[1]:>6.1f}x")
+
+
+def bench_payoff(args):
+    """Projeção de quitação: laço Python gigante a gigante x payoff.simulate vetorizado."""
+    import numpy as np
+    from payoff import STRATEGIES, Portfolio, simulate, strategy_order
+
+    rng = np.random.default_rng(42)
+    n = args.giants
+    portfolio = Portfolio(
+        ids=np.arange(n), names=tuple(f"G{i}" for i in range(n)),
+        balances=rng.uniform(500, 20_000, n).round(2), rates=rng.uniform(0, 0.06, n),
+        minimums=rng.uniform(10, 150, n).round(2), priorities=rng.integers(1, 6, n).astype(float),
+    )
+
+    def python_loop(strategy, budget):
+        order = list(strategy_order(portfolio, strategy))
+        bal = [float(b) for b in portfolio.balances]
+        months, interest = [-1] * n, [0.0] * n
+        for month in range(1, args.months + 1):
+            active = [i for i in range(n) if bal[i] > 0.005]
+            if not active:
+                break
+            pay = [0.0] * n
+            for i in active:
+                charge = bal[i] * portfolio.rates[i]
+                interest[i] += charge
+                bal[i] += charge
+                pay[i] = min(portfolio.minimums[i], bal[i])
+            due = sum(pay)
+            if due > budget:
+                pay = [p * budget / due for p in pay]
+            extra = max(budget - sum(pay), 0.0)
+            for i in order:
+                take = min(extra, bal[i] - pay[i])
+                pay[i] += take
+                extra -= take
+            for i in active:
+                bal[i] -= pay[i]
+                if bal[i] <= 0.005:
+                    months[i], bal[i] = month, 0.0
+        return np.array(months), np.array(interest)
+
+    monthly_interest = float((portfolio.balances * portfolio.rates).sum())
+    print(f"{n} gigantes x {args.months} meses x {len(STRATEGIES)} estratégias")
+    # justo: mínimas + juros do primeiro mês; folgado: três vezes os juros
+    for label, budget in (("justo", portfolio.minimums.sum() + monthly_interest),
+                          ("folgado", portfolio.minimums.sum() + monthly_interest * 3)):
+        budget = float(budget)
+        t0 = time.perf_counter()
+        expected = [python_loop(s, budget) for s in STRATEGIES]
+        loop_ms = (time.perf_counter() - t0) * 1000
+        simulate(portfolio, budget, horizon=args.months)  # aquece
+        t0 = time.perf_counter()
+        for _ in range(args.repeat):
+            result = simulate(portfolio, budget, horizon=args.months)
+        vec_ms = (time.perf_counter() - t0) * 1000 / args.repeat
+
+        print(f"\norçamento {label} {budget:,.2f}/mês: laço Python {loop_ms:.1f} ms | vetorizado {vec_ms:.1f} ms")
+        for row, (s, (months, interest)) in enumerate(zip(STRATEGIES, expected)):
+            ok = np.array_equal(months, result.months[row]) and np.allclose(interest, result.interest[row])
+            meses = result.months_to_freedom(s)
+            print(f"  {s:<10} quita em {meses if meses >= 0 else '>' + str(args.months):>5} meses, "
+                  f"juros {result.total_interest(s):>16,.2f}  {'confere' if ok else 'DIVERGE'}")
+
+
+def _split_interest(p, budget: float, shares, horizon: int = 360):
+    """Juros totais de cada linha de shares: fração fixa da sobra mensal para cada gigante.
+
+    Mesmo mês de payoff._month (juros, mínimas, sobra), mas a sobra primeiro é dividida
+    pelas frações, renormalizadas entre os gigantes ainda em aberto; o que passa do saldo
+    de um gigante desce em cascata pela optimal_order. shares = (1, 0, ...) no primeiro
+    da optimal_order é a própria cascata do AllocationPlan.
+    """
+    import numpy as np
+    from payoff import _EPS, optimal_order
+
+    order = optimal_order(p)
+    bal = np.tile(p.balances[order], (len(shares), 1))
+    rates, minimums, weights = p.rates[order], p.minimums[order], shares[:, order]
+    interest = np.zeros(len(shares))
+    bal[bal <= _EPS] = 0.0
+    for _ in range(horizon):
+        if not (bal > 0.0).any():
+            break
+        charge = bal * rates
+        interest += charge.sum(axis=1)
+        bal += charge
+        pay = np.minimum(minimums, bal)
+        pay *= np.minimum(budget / np.maximum(pay.sum(axis=1, keepdims=True), _EPS), 1.0)
+        extra = budget - pay.sum(axis=1, keepdims=True)
+        remaining = bal - pay
+        open_w = np.where(remaining > _EPS, weights, 0.0)
+        total_w = open_w.sum(axis=1, keepdims=True)
+        give = np.minimum(extra * np.divide(open_w, total_w, out=np.zeros_like(open_w), where=total_w > 0),
+                          remaining)
+        pay += give
+        remaining -= give
+        extra -= give.sum(axis=1, keepdims=True)
+        before = np.cumsum(remaining, axis=1) - remaining
+        pay += np.minimum(np.maximum(extra - before, 0.0), remaining)
+        bal -= pay
+        bal *= bal > _EPS
+    return interest
+
+
+def bench_optimizer(args):
+    """Divisão do orçamento: guloso (optimal_order) x força bruta nas divisões discretizadas; update x rebuild."""
+    from itertools import combinations_with_replacement
+
+    import numpy as np
+    from payoff import AllocationPlan, Portfolio, optimal_order, simulate
+
+    rng = np.random.default_rng(7)
+
+    def random_portfolio(n):
+        return Portfolio(
+            ids=np.arange(n), names=tuple(f"G{i}" for i in range(n)),
+            balances=rng.uniform(500, 20_000, n).round(2), rates=rng.choice([0.0, 0.01, 0.02, 0.04, 0.08], n),
+            minimums=rng.uniform(10, 300, n).round(2), priorities=rng.integers(1, 4, n).astype(float),
+        )
+
+    def split_grid(n):
+        """Todas as divisões da sobra em n frações múltiplas de 1/steps."""
+        grid = np.zeros((0, n))
+        for combo in combinations_with_replacement(range(n), args.steps):
+            grid = np.vstack([grid, np.bincount(combo, minlength=n) / args.steps])
+        return grid
+
+    print(f"força bruta: sobra mensal dividida em frações fixas de 1/{args.steps} por gigante, "
+          "todas as divisões numa chamada; ótimo só dentro dessa família")
+    for n in range(2, args.max_giants + 1):
+        grid = split_grid(n)
+        worst_gap, brute_ms, greedy_ms = 0.0, 0.0, 0.0
+        for _ in range(args.cases):
+            p = random_portfolio(n)
+            budget = float(p.minimums.sum() + (p.balances * p.rates).sum() * rng.uniform(1.1, 3.0))
+            t0 = time.perf_counter()
+            best = float(_split_interest(p, budget, grid).min())
+            brute_ms += time.perf_counter() - t0
+            t0 = time.perf_counter()
+            greedy = simulate(p, budget, orders=optimal_order(p)[None, :], strategies=("otimo",))
+            greedy_ms += time.perf_counter() - t0
+            worst_gap = max(worst_gap, greedy.total_interest("otimo") - best)
+        print(f"n={n}: {args.cases} casos x {len(grid)} divisões, maior diferença guloso - melhor divisão "
+              f"{worst_gap:10.4f} reais | força bruta {brute_ms * 1000 / args.cases:7.2f} ms | "
+              f"guloso {greedy_ms * 1000 / args.cases:5.2f} ms")
+
+    p = random_portfolio(args.plan_giants)
+    budget = float(p.minimums.sum() / 4)
+    t0 = time.perf_counter()
+    for _ in range(args.repeat):
+        plan = AllocationPlan(p, budget)
+    rebuild_us = (time.perf_counter() - t0) * 1e6 / args.repeat
+    ids = rng.integers(0, args.plan_giants, args.repeat)
+    t0 = time.perf_counter()
+    for gid in ids:
+        plan.update(int(gid), balance=float(rng.uniform(500, 20_000)))
+    update_us = (time.perf_counter() - t0) * 1e6 / args.repeat
+    t0 = time.perf_counter()
+    for _ in range(args.repeat):
+        plan.allocation()
+    allocation_us = (time.perf_counter() - t0) * 1e6 / args.repeat
+    rebuilt = AllocationPlan(Portfolio(p.ids, p.names, np.array([plan._giants[g][0] for g in p.ids.tolist()]),
+                                       p.rates, p.minimums, p.priorities), budget)
+    same = np.allclose(list(rebuilt.allocation().values()), [plan.allocation()[g] for g in rebuilt.order()])
+    print(f"\n{args.plan_giants} gigantes: rebuild {rebuild_us:8.1f} µs | update de um gigante {update_us:6.1f} µs | "
+          f"allocation {allocation_us:6.1f} µs | {'confere' if same else 'DIVERGE'} com o rebuild")
+
+
+def bench_montecarlo(args):
+    """Monte Carlo das datas de vitória: tempo por tamanho de carteira, um processo x pool.
+
+    Dois cenários: receita que quita a carteira em ~2 anos e sobra abaixo dos juros, em
+    que a carteira quita devagar ou nunca (o pior caso: sem os cortes de payoff, os 360
+    meses inteiros em todos os caminhos).
+    """
+    import numpy as np
+    import payoff
+    from payoff import Portfolio, monte_carlo
+
+    rng = np.random.default_rng(3)
+    default_min_cells = payoff.PROCESS_POOL_MIN_CELLS
+    print(f"{args.paths:,} caminhos, horizonte 360 meses, {args.workers} workers no pool")
+    for n in args.giants:
+        p = Portfolio(
+            ids=np.arange(n), names=tuple(f"G{i}" for i in range(n)),
+            balances=rng.uniform(500, 20_000, n).round(2), rates=rng.uniform(0, 0.05, n),
+            minimums=rng.uniform(10, 150, n).round(2), priorities=rng.integers(1, 6, n).astype(float),
+        )
+        scenarios = {
+            # receita que quita a carteira em ~2 anos na média, com 15%/20% de variação
+            "quita em ~2 anos": float(p.balances.sum() / 24 + p.minimums.sum()) * 2,
+            # a sobra depois das mínimas cobre só metade dos juros do primeiro mês
+            "sobra < juros": float(p.minimums.sum() + (p.balances * p.rates).sum() / 2) * 2,
+        }
+        for scenario, income in scenarios.items():
+            timings = {}
+            monte_carlo(p, income, income / 2, 0.15, 0.20, paths=args.paths, seed=0)  # aquece
+            for label, min_cells in (("um processo", float("inf")), ("pool", 0)):
+                payoff.PROCESS_POOL_MIN_CELLS = min_cells
+                t0 = time.perf_counter()
+                result = monte_carlo(p, income, income / 2, 0.15, 0.20, paths=args.paths, seed=1,
+                                     workers=args.workers)
+                timings[label] = time.perf_counter() - t0
+            payoff.PROCESS_POOL_MIN_CELLS = default_min_cells
+            print(f"{n:>4} gigantes, {scenario:<16}: um processo {timings['um processo'] * 1000:8.1f} ms | "
+                  f"pool {timings['pool'] * 1000:8.1f} ms | vitória P50 {result.all_p50} meses, "
+                  f"P90 {result.all_p90} meses, {result.win_rate.mean():.0%} dos gigantes quitados")
+
+
+def bench_import(args):
+    """Importação de extrato CSV: iterrows + ORM (antigo) x blocos vetorizados."""
+    import resource
+
+    import pandas as pd
+    from importers.csv_import import import_csv
+    from migrations import run_migrations
+
+    run_migrations()
+    path = _TMP / "extrato.csv"
+    write_statement_csv(path, args.rows)
+    with db.engine.begin() as conn:
+        conn.execute(insert(User), [{"id": u, "name": f"bench{u}", "password_hash": "x"} for u in (1, 2)])
+        conn.execute(insert(Bucket), [{"id": u * 10 + k, "user_id": u, "name": name, "percent": 50.0, "balance": 0.0}
+                                      for u in (1, 2) for k, name in enumerate(("Moradia", "Lazer"))])
+    print(f"{args.rows:,} linhas, {path.stat().st_size / 1e6:.1f} MB")
+
+    legacy_rows = min(args.rows, args.legacy_rows)
+    with db.SessionLocal() as s:
+        t0 = time.perf_counter()
+        df = pd.read_csv(path, sep=";", nrows=legacy_rows)
+        names = {"Moradia": 10, "Lazer": 11}
+        for _, row in df.iterrows():
+            day, month, year = row["Data"].split("/")
+            s.add(Movement(user_id=1, date=date(2000 + int(year), int(month), int(day)), description=row["Descrição"],
+                           kind=row["Tipo"], amount=float(row["Valor"].replace(".", "").replace(",", ".")),
+                           bucket_id=names.get(row["Balde"])))
+        s.commit()
+        legacy = time.perf_counter() - t0
+    print(f"iterrows + ORM ({legacy_rows:,} linhas): {legacy:6.2f}s  {legacy_rows / legacy:>9,.0f} linhas/s")
+
+    with db.SessionLocal() as s:
+        for progress in import_csv(s, 2, path, chunk_rows=args.chunk_rows):
+            pass
+    print(f"blocos vetorizados ({progress.read:,} linhas): {progress.seconds:6.2f}s  {progress.rows_per_sec:>9,.0f} linhas/s"
+          f" | {progress.chunks} blocos, {progress.rejected} rejeitadas"
+          f" | pico de memória do processo {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
+
+def bench_dedupe(args):
+    """Reimportação de extrato: leitura + validação x importação nova x reimportação (tudo duplicado)."""
+    from importers.csv_import import import_csv, read_csv_chunks
+    from importers.pipeline import bucket_lookup, normalize_chunk
+    from migrations import run_migrations
+
+    run_migrations()
+    path = _TMP / "extrato.csv"
+    write_statement_csv(path, args.rows)
+    with db.engine.begin() as conn:
+        conn.execute(insert(User), [{"id": 1, "name": "bench1", "password_hash": "x"}])
+        conn.execute(insert(Bucket), [{"id": 10 + k, "user_id": 1, "name": name, "percent": 50.0, "balance": 0.0}
+                                      for k, name in enumerate(("Moradia", "Lazer"))])
+    with db.SessionLocal() as s:
+        lookup = bucket_lookup(s.scalars(select(Bucket).where(Bucket.user_id == 1)).all())
+    t0 = time.perf_counter()
+    read = sum(len(normalize_chunk(df, lookup)[0]) for df in read_csv_chunks(path, args.chunk_rows))
+    reading = time.perf_counter() - t0
+    print(f"{args.rows:,} linhas | leitura + validação: {reading:5.2f}s ({read:,} válidas)")
+
+    for label in ("importação nova", "reimportação", "reimportação"):
+        with db.SessionLocal() as s:
+            for progress in import_csv(s, 1, path, chunk_rows=args.chunk_rows):
+                pass
+            stored = s.scalar(select(func.count()).select_from(Movement).where(Movement.user_id == 1))
+        print(f"{label:16}: {progress.seconds:5.2f}s ({progress.seconds / reading:4.2f}x a leitura) | "
+              f"{progress.imported:,} gravadas, {progress.duplicates:,} duplicadas | {stored:,} no banco")
+
+
+_MERCHANTS = {
+    "Moradia": ["Aluguel Apto", "Condominio Residencial", "Enel Energia", "Sabesp Agua", "Vivo Fibra"],
+    "Mercado": ["Supermercado Extra", "Carrefour Hiper", "Atacadao", "Padaria Pao Quente", "Hortifruti"],
+    "Transporte": ["Posto Shell", "Posto Ipiranga", "Uber Trip", "99 Pop", "Estacionamento Centro"],
+    "Lazer": ["Netflix", "Spotify", "Cinemark", "Ifood Restaurante", "Steam Games"],
+    "Saúde": ["Drogasil", "Droga Raia", "Unimed Mensalidade", "Laboratorio Fleury", "Smart Fit"],
+}
+
+
+def _merchant_description(rnd, merchant):
+    """Descrição com o ruído dos extratos: prefixo do meio de pagamento, caixa e códigos variáveis."""
+    prefix = rnd.choice(["", "COMPRA CARTAO ", "PIX ", "PAG* ", "Compra "])
+    name = merchant.upper() if rnd.random() < 0.5 else merchant
+    return f"{prefix}{name} {rnd.randrange(1, 9999):04d}"
+
+
+def bench_categorize(args):
+    """Classificação nos baldes: aprender regras do histórico e classificar um extrato sem balde."""
+    import pandas as pd
+    from importers.categorize import read_bucket_rules
+    from migrations import run_migrations
+
+    run_migrations()
+    rnd = random.Random(7)
+    names = list(_MERCHANTS)
+    with db.engine.begin() as conn:
+        conn.execute(insert(User), [{"id": 1, "name": "bench1", "password_hash": "x"}])
+        conn.execute(insert(Bucket), [{"id": k + 1, "user_id": 1, "name": name, "percent": 20.0, "balance": 0.0}
+                                      for k, name in enumerate(names)])
+        start = date.today() - timedelta(days=365)
+        conn.execute(insert(Movement), [
+            {"user_id": 1, "bucket_id": k + 1, "kind": "Despesa", "amount": 10.0, "date": start + timedelta(days=i % 365),
+             "description": _merchant_description(rnd, rnd.choice(_MERCHANTS[names[k]]))}
+            for i, k in ((i, rnd.randrange(len(names))) for i in range(args.history))
+        ])
+
+    with db.SessionLocal() as s:
+        t0 = time.perf_counter()
+        rules = read_bucket_rules(s, 1)
+        learn = time.perf_counter() - t0
+    print(f"histórico {args.history:,} movimentos -> {len(rules):,} regras em {learn:5.2f}s")
+
+    expected = [rnd.randrange(len(names)) for _ in range(args.rows)]
+    descriptions = pd.Series([_merchant_description(rnd, rnd.choice(_MERCHANTS[names[k]])) for k in expected])
+    t0 = time.perf_counter()
+    guessed = rules.classify_many(descriptions)
+    elapsed = time.perf_counter() - t0
+    hits = sum(g == k + 1 for g, k in zip(guessed, expected))
+    misses = sum(g is not None and g != k + 1 for g, k in zip(guessed, expected))
+    print(f"{args.rows:,} lançamentos ({descriptions.nunique():,} descrições distintas): {elapsed:5.2f}s "
+          f"({args.rows / elapsed:>9,.0f}/s) | acertos {hits / args.rows:.1%}, erros {misses / args.rows:.1%}, "
+          f"sem balde {1 - (hits + misses) / args.rows:.1%}")
+    unique = descriptions.str.cat(pd.Series(range(args.rows)).astype(str), sep=" x")  # pior caso: tudo distinto
+    t0 = time.perf_counter()
+    rules.classify_many(unique)
+    elapsed = time.perf_counter() - t0
+    print(f"pior caso, {args.rows:,} descrições distintas: {elapsed:5.2f}s ({args.rows / elapsed:>9,.0f}/s)")
+
+
+def bench_parallel(args):
+    """Vários extratos: leitura sequencial x ProcessPoolExecutor, e importação completa (um gravador)."""
+    from importers.parallel import import_files, parse_file, parse_files
+    from importers.pipeline import bucket_lookup
+    from migrations import run_migrations
+
+    run_migrations()
+    with db.engine.begin() as conn:
+        conn.execute(insert(User), [{"id": 1, "name": "bench1", "password_hash": "x"}])
+        conn.execute(insert(Bucket), [{"id": 10 + k, "user_id": 1, "name": name, "percent": 50.0, "balance": 0.0}
+                                      for k, name in enumerate(("Moradia", "Lazer"))])
+    files = []
+    for month in range(args.files):  # um ano de extratos mensais, metade CSV e metade OFX
+        fmt = "ofx" if month % 2 else "csv"
+        path = _TMP / f"extrato_{month + 1:02d}.{fmt}"
+        if fmt == "csv":
+            write_statement_csv(path, args.rows, seed=month)
+        else:
+            write_statement_ofx(path, args.rows, seed=month)
+        files.append((fmt, str(path), {}))
+    size = sum(Path(p).stat().st_size for _, p, _ in files) / 1e6
+    print(f"{args.files} arquivos x {args.rows:,} lançamentos ({size:.0f} MB), {os.cpu_count()} CPUs")
+
+    with db.SessionLocal() as s:
+        lookup = bucket_lookup(s.scalars(select(Bucket).where(Bucket.user_id == 1)).all())
+    t0 = time.perf_counter()
+    for fmt, path, options in files:
+        parse_file(fmt, path, options, 0, lookup)
+    sequential = time.perf_counter() - t0
+    print(f"leitura sequencial:      {sequential:6.2f}s")
+    for workers in args.workers:
+        t0 = time.perf_counter()
+        for future in parse_files([(fmt, path, options, 0) for fmt, path, options in files], lookup, workers):
+            future.result()
+        elapsed = time.perf_counter() - t0
+        print(f"leitura com {workers:2d} processos: {elapsed:6.2f}s  ({sequential / elapsed:4.2f}x)")
+
+    with db.SessionLocal() as s:
+        t0 = time.perf_counter()
+        last = [p for _, p in _last_per_file(import_files(s, 1, files, workers=max(args.workers)))]
+        elapsed = time.perf_counter() - t0
+    read, written = sum(p.read for p in last), sum(p.imported for p in last)
+    print(f"importação completa ({max(args.workers)} processos + 1 gravador): {elapsed:6.2f}s, {read:,} lidos, "
+          f"{written:,} gravados ({read / elapsed:,.0f}/s), {sum(p.duplicates for p in last):,} duplicados, "
+          f"{sum(p.rejected for p in last):,} rejeitados")
+
+
+def _last_per_file(progresses):
+    """Último ImportProgress de cada arquivo de import_files."""
+    last = {}
+    for index, progress in progresses:
+        last[index] = progress
+    return last.items()
+
+
+def _traced_peak(fn) -> int:
+    """Pico de memória alocada (bytes) durante fn()."""
+    import tracemalloc
+
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_formats(args):
+    """Leitores OFX (SGML/XML) e QIF: vazão só do parser, memória e importação completa."""
+    import xml.etree.ElementTree as ET
+
+    from importers.ofx_import import import_ofx, read_ofx_transactions
+    from importers.qif_import import import_qif, read_qif_transactions
+    from migrations import run_migrations
+
+    run_migrations()
+    expected = sum(cents for *_, cents, _ in synthetic_transactions(args.rows))
+    corpus = {
+        "OFX SGML": (_TMP / "extrato.ofx", lambda p: write_statement_ofx(p, args.rows), read_ofx_transactions, import_ofx),
+        "OFX XML": (_TMP / "extrato.xml.ofx", lambda p: write_statement_ofx(p, args.rows, xml=True),
+                    read_ofx_transactions, import_ofx),
+        "QIF": (_TMP / "extrato.qif", lambda p: write_statement_qif(p, args.rows), read_qif_transactions, import_qif),
+    }
+    with db.engine.begin() as conn:
+        conn.execute(insert(User), [{"id": u, "name": f"bench{u}", "password_hash": "x"} for u in range(1, len(corpus) + 1)])
+    print(f"{args.rows:,} transações por arquivo (soma esperada {expected / 100:,.2f})")
+    for user_id, (name, (path, write, read, importer)) in enumerate(corpus.items(), 1):
+        write(path)
+        t0 = time.perf_counter()
+        count = sum(1 for _ in read(path))
+        parse = time.perf_counter() - t0
+        peak = _traced_peak(lambda: sum(1 for _ in read(path)))  # passada à parte: tracemalloc atrasa tudo
+        with db.SessionLocal() as s:
+            for progress in importer(s, user_id, path, chunk_rows=args.chunk_rows):
+                pass
+            total = s.execute(select(func.sum(text("CASE WHEN kind = 'Despesa' THEN -amount ELSE amount END")))
+                              .select_from(Movement).where(Movement.user_id == user_id)).scalar()
+        print(f"{name:8} {path.stat().st_size / 1e6:5.1f} MB | parser {count:,} em {parse:5.2f}s "
+              f"({count / parse:>9,.0f}/s, pico {peak / 1e6:5.1f} MB) | importação {progress.seconds:5.2f}s "
+              f"({progress.rows_per_sec:>9,.0f}/s), {progress.rejected} rejeitadas, soma confere: {total == expected}")
+
+    parse_tree = lambda: len(ET.parse(corpus["OFX XML"][0]).getroot().findall(".//STMTTRN"))  # noqa: E731
+    t0 = time.perf_counter()
+    count = parse_tree()
+    tree = time.perf_counter() - t0
+    peak = _traced_peak(parse_tree)
+    print(f"ElementTree (árvore inteira, só XML): {count:,} em {tree:5.2f}s, pico {peak / 1e6:5.1f} MB")
+
+
+def bench_export(args):
+    """CSV do Livro Caixa: DataFrame de objetos ORM + busca do balde por linha x consulta com JOIN em streaming."""
+    import pandas as pd
+
+    from exports import ledger_csv
+    from migrations import run_migrations
+
+    run_migrations()
+    _seed(db.engine, users=1, movements_per_user=args.movements)
+
+    def dataframe_csv(limit):
+        with db.SessionLocal() as s:
+            buckets = s.scalars(select(Bucket).where(Bucket.user_id == 1)).all()
+            movements = s.scalars(select(Movement).where(Movement.user_id == 1).limit(limit)).all()
+            return pd.DataFrame([{
+                "ID": m.id, "Data": m.date.strftime("%d/%m/%Y"), "Tipo": m.kind,
+                "Balde": next((b.name for b in buckets if b.id == m.bucket_id), ""),
+                "Valor": m.amount, "Descrição": m.description,
+            } for m in movements]).to_csv(index=False, sep=";").encode()
+
+    def streaming_csv(out):
+        with db.SessionLocal() as s:
+            for part in ledger_csv(s, 1):
+                out.write(part)
+
+    legacy = min(args.legacy_movements, args.movements)
+    t0 = time.perf_counter()
+    dataframe_csv(legacy)
+    old = time.perf_counter() - t0
+    old_peak = _traced_peak(lambda: dataframe_csv(legacy))
+
+    path = _TMP / "livro_caixa.csv"
+    with open(path, "wb") as out:
+        t0 = time.perf_counter()
+        streaming_csv(out)
+        new = time.perf_counter() - t0
+    with open(os.devnull, "wb") as out:
+        new_peak = _traced_peak(lambda: streaming_csv(out))
+    print(f"DataFrame ORM  {legacy:>9,} movimentos: {old:6.2f}s ({legacy / old:>9,.0f}/s), pico {old_peak / 1e6:7.1f} MB")
+    print(f"streaming JOIN {args.movements:>9,} movimentos: {new:6.2f}s ({args.movements / new:>9,.0f}/s), "
+          f"pico {new_peak / 1e6:7.1f} MB, arquivo {path.stat().st_size / 1e6:.0f} MB")
+
+
+def bench_archive(args):
+    """Exportação da conta: CSV x Parquet (pyarrow) x Excel (openpyxl) do Livro Caixa e o .zip completo."""
+    from exports import HAS_EXCEL, HAS_PARQUET, TABLES, account_archive, table_csv, write_excel, write_parquet
+    from migrations import run_migrations
+
+    run_migrations()
+    _seed(db.engine, users=1, movements_per_user=args.movements)
+    ledger = TABLES["livro_caixa"]
+
+    def timed(label, fn, path):
+        t0 = time.perf_counter()
+        with db.SessionLocal() as s:
+            fn(s, path)
+        elapsed = time.perf_counter() - t0
+        with db.SessionLocal() as s:
+            peak = _traced_peak(lambda: fn(s, path))
+        print(f"{label:<22} {elapsed:6.2f}s ({args.movements / elapsed:>9,.0f}/s), pico {peak / 1e6:6.1f} MB, "
+              f"arquivo {path.stat().st_size / 1e6:6.1f} MB")
+
+    def csv_file(s, path):
+        with open(path, "wb") as out:
+            for part in table_csv(s, 1, ledger):
+                out.write(part)
+
+    def zip_file(s, path):
+        with open(path, "wb") as out:
+            for part in account_archive(s, 1):
+                out.write(part)
+
+    print(f"{args.movements:,} movimentos")
+    timed("CSV", csv_file, _TMP / "livro_caixa.csv")
+    if HAS_PARQUET:
+        import pyarrow.parquet as pq
+
+        path = _TMP / "livro_caixa.parquet"
+        timed("Parquet (zstd)", lambda s, p: write_parquet(s, 1, ledger, p), path)
+        print(f"{'':<22} {pq.ParquetFile(path).num_row_groups} row groups (um por mês)")
+    else:
+        print("Parquet: pyarrow indisponível")
+    if HAS_EXCEL:
+        timed("Excel (write-only)", lambda s, p: write_excel(s, 1, p, tables=[ledger]), _TMP / "livro_caixa.xlsx")
+    else:
+        print("Excel: openpyxl indisponível")
+    timed(".zip completo", zip_file, _TMP / "conta.zip")
+
+
+def bench_charts(args):
+    """Evolução de Movimentações: um ponto por movimento com marcadores x totais diários + LTTB (cache frio e quente)."""
+    import io
+
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import pandas as pd
+
+    from cache import cache
+    from charts import MARKER_POINTS, MAX_POINTS, evolution_series
+    from migrations import run_migrations
+
+    run_migrations()
+    _seed(db.engine, users=1, movements_per_user=args.movements)
+    with db.engine.begin() as conn:  # espalha os movimentos pelos anos pedidos
+        conn.execute(text("UPDATE movements SET date = date(:start, '+' || (id % :days) || ' days')"),
+                      {"start": (date.today() - timedelta(days=365 * args.years)).isoformat(),
+                       "days": 365 * args.years})
+
+    def render(series):
+        fig, ax = plt.subplots(figsize=(10, 4))
+        for (x, y, marker), color in zip(series, ("green", "red")):
+            ax.plot(x, y, color=color, marker=marker)
+        fig.savefig(io.BytesIO(), format="png")  # o que st.pyplot faz
+        plt.close(fig)
+
+    def per_movement():
+        with db.SessionLocal() as s:
+            movements = s.scalars(select(Movement).where(Movement.user_id == 1)).all()
+            df = pd.DataFrame([{"data": m.date, "valor": m.amount, "tipo": m.kind} for m in movements])
+            df = df.sort_values("data")
+        return [(df[df["tipo"] == k]["data"], df[df["tipo"] == k]["valor"], "o") for k in ("Receita", "Despesa")]
+
+    def downsampled():
+        with db.SessionLocal() as s:
+            series = evolution_series(s, 1)
+        return [(*series[k], "o" if len(series[k][0]) <= MARKER_POINTS else None) for k in ("Receita", "Despesa")]
+
+    t0 = time.perf_counter()
+    render(per_movement())
+    old = time.perf_counter() - t0
+    cache.clear()
+    t0 = time.perf_counter()
+    series = downsampled()
+    load = time.perf_counter() - t0
+    render(series)
+    cold = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    render(downsampled())
+    warm = time.perf_counter() - t0
+    points = sum(len(x) for x, _, _ in series)
+    print(f"{args.movements:,} movimentos em {args.years} anos, teto de {MAX_POINTS} pontos por série")
+    print(f"um ponto por movimento:        {old:6.2f}s ({args.movements:,} pontos)")
+    print(f"totais diários + LTTB (frio):  {cold:6.2f}s (consulta {load:.2f}s, {points:,} pontos)")
+    print(f"totais diários + LTTB (cache): {warm:6.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("engines", help="vazão de leitura/escrita antes e depois do registro de engines")
+    p.add_argument("--threads", type=int, default=8)
+    p.add_argument("--seconds", type=float, default=5.0)
+    p.add_argument("--users", type=int, default=20)
+    p.add_argument("--movements", type=int, default=2000, help="movimentos por usuário")
+    p.set_defaults(func=bench_engines)
+
+    p = sub.add_parser("plans", help="confere via EXPLAIN QUERY PLAN que os loaders usam os índices compostos")
+    p.set_defaults(func=bench_plans)
+
+    p = sub.add_parser("allocation", help="rateio nos baldes: ORM x INSERT multi-linha + UPDATE CASE")
+    p.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 10_000])
+    p.set_defaults(func=bench_allocation)
+
+    p = sub.add_parser("catchup", help="receita diária atrasada: laço ORM x lote vetorizado")
+    p.add_argument("--days", type=int, default=90)
+    p.add_argument("--buckets", type=int, default=8)
+    p.set_defaults(func=bench_catchup)
+
+    p = sub.add_parser("cache", help="taxa de acerto do cache com vários usuários escrevendo")
+    p.add_argument("--users", type=int, default=50)
+    p.add_argument("--requests", type=int, default=20_000)
+    p.add_argument("--write-ratio", type=float, default=0.1)
+    p.set_defaults(func=bench_cache)
+
+    p = sub.add_parser("dtos", help="loaders cacheados: ORM destacado x DTOs (pickle/memória)")
+    p.add_argument("--movements", type=int, default=500)
+    p.add_argument("--repeat", type=int, default=200)
+    p.set_defaults(func=bench_dtos)
+
+    p = sub.add_parser("pages", help="paginação do livro caixa: OFFSET x keyset")
+    p.add_argument("--movements", type=int, default=200_000)
+    p.add_argument("--repeat", type=int, default=20)
+    p.set_defaults(func=bench_pages)
+
+    p = sub.add_parser("payoff", help="projeção de quitação: laço Python x NumPy vetorizado")
+    p.add_argument("--giants", type=int, default=100)
+    p.add_argument("--months", type=int, default=360)
+    p.add_argument("--repeat", type=int, default=20)
+    p.set_defaults(func=bench_payoff)
+
+    p = sub.add_parser("optimizer", help="divisão do orçamento dos gigantes: guloso x força bruta, update x rebuild")
+    p.add_argument("--max-giants", type=int, default=5)
+    p.add_argument("--cases", type=int, default=50)
+    p.add_argument("--steps", type=int, default=10, help="frações da sobra: múltiplos de 1/steps")
+    p.add_argument("--plan-giants", type=int, default=1000)
+    p.add_argument("--repeat", type=int, default=200)
+    p.set_defaults(func=bench_optimizer)
+
+    p = sub.add_parser("montecarlo", help="Monte Carlo das datas de vitória: um processo x ProcessPoolExecutor")
+    p.add_argument("--paths", type=int, default=10_000)
+    p.add_argument("--giants", type=int, nargs="+", default=[5, 20, 100])
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    p.set_defaults(func=bench_montecarlo)
+
+    p = sub.add_parser("import", help="importação de extrato CSV: iterrows + ORM x blocos vetorizados")
+    p.add_argument("--rows", type=int, default=500_000)
+    p.add_argument("--legacy-rows", type=int, default=50_000, help="linhas para o caminho antigo (lento)")
+    p.add_argument("--chunk-rows", type=int, default=50_000)
+    p.set_defaults(func=bench_import)
+
+    p = sub.add_parser("formats", help="leitores OFX (SGML/XML) e QIF em streaming, corpus sintético")
+    p.add_argument("--rows", type=int, default=100_000)
+    p.add_argument("--chunk-rows", type=int, default=50_000)
+    p.set_defaults(func=bench_formats)
+
+    p = sub.add_parser("dedupe", help="reimportação de extrato já gravado (fingerprints)")
+    p.add_argument("--rows", type=int, default=100_000)
+    p.add_argument("--chunk-rows", type=int, default=50_000)
+    p.set_defaults(func=bench_dedupe)
+
+    p = sub.add_parser("categorize", help="classificação automática nos baldes pelo histórico")
+    p.add_argument("--rows", type=int, default=100_000)
+    p.add_argument("--history", type=int, default=20_000)
+    p.set_defaults(func=bench_categorize)
+
+    p = sub.add_parser("parallel", help="vários extratos: leitura em processos paralelos, um gravador")
+    p.add_argument("--files", type=int, default=12)
+    p.add_argument("--rows", type=int, default=50_000, help="lançamentos por arquivo")
+    p.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    p.set_defaults(func=bench_parallel)
+
+    p = sub.add_parser("export", help="CSV do Livro Caixa: DataFrame ORM x streaming com JOIN")
+    p.add_argument("--movements", type=int, default=1_000_000)
+    p.add_argument("--legacy-movements", type=int, default=100_000, help="movimentos para o caminho antigo")
+    p.set_defaults(func=bench_export)
+
+    p = sub.add_parser("archive", help="exportação da conta: CSV x Parquet x Excel e o .zip completo")
+    p.add_argument("--movements", type=int, default=1_000_000)
+    p.set_defaults(func=bench_archive)
+
+    p = sub.add_parser("charts", help="gráficos do dashboard: um ponto por movimento x totais diários + LTTB")
+    p.add_argument("--movements", type=int, default=200_000)
+    p.add_argument("--years", type=int, default=10)
+    p.set_defaults(func=bench_charts)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
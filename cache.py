@@ -0,0 +1,90 @@
+"""Cache em processo versionado por usuário e entidade.
+
+Substitui o st.cache_data.clear() global: cada entrada é guardada sob
+(user_id, entidade, geração, argumentos) e uma escrita só incrementa a geração da
+entidade daquele usuário. As entradas antigas deixam de ser encontradas e saem pelo
+LRU/TTL; os outros usuários e entidades continuam em cache.
+"""
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+ENTITIES = ("profile", "buckets", "giants", "payments", "bills", "movements")
+
+
+class VersionedCache:
+    """LRU com TTL e gerações por (user_id, entidade), seguro entre threads."""
+
+    def __init__(self, max_entries: int = 4096, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()  # chave -> (expira_em, valor)
+        self._generations = {}
+        self._lock = threading.RLock()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def generation(self, user_id, entity: str) -> int:
+        return self._generations.get((user_id, entity), 0)
+
+    def get_or_load(self, user_id, entity: str, args: tuple, loader, ttl: float | None = None):
+        """Valor em cache para (user_id, entidade, args) ou o resultado de loader()."""
+        key = (user_id, entity, self.generation(user_id, entity), args)
+        now = time.monotonic()
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is not None and hit[0] > now:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return hit[1]
+            self.misses += 1
+        value = loader()  # fora do lock: consultas ao banco não serializam os usuários
+        with self._lock:
+            if key[2] == self.generation(user_id, entity):  # não guarda se houve escrita no meio
+                self._data[key] = (now + (self.ttl if ttl is None else ttl), value)
+                self._data.move_to_end(key)
+                while len(self._data) > self.max_entries:
+                    self._data.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def invalidate(self, user_id, *entities: str) -> None:
+        """Incrementa a geração das entidades do usuário (todas, se nenhuma for informada)."""
+        with self._lock:
+            for entity in entities or ENTITIES:
+                self._generations[(user_id, entity)] = self.generation(user_id, entity) + 1
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._generations.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._data), "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+cache = VersionedCache()
+
+
+def cached(entity: str, ttl: float | None = None):
+    """Decorator para loaders f(user_id, *args) cacheados por usuário/entidade."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(user_id, *args, **kwargs):
+            key_args = (func.__qualname__, args, tuple(sorted(kwargs.items())))
+            return cache.get_or_load(user_id, entity, key_args, lambda: func(user_id, *args, **kwargs), ttl)
+        return wrapper
+    return decorator
+
+
+def invalidate(user_id, *entities: str) -> None:
+    """Atalho para cache.invalidate."""
+    cache.invalidate(user_id, *entities)
@@ -0,0 +1,98 @@
+"""Séries dos gráficos do dashboard, com no máximo MAX_POINTS pontos cada.
+
+A Evolução de Movimentações soma os movimentos por dia e tipo no SQL (a receita diária
+automática gera vários movimentos por dia, um por balde) e, se ainda sobrarem mais dias
+que MAX_POINTS, reduz a série com LTTB (Largest-Triangle-Three-Buckets, Steinarsson
+2013): cada ponto escolhido é o que forma o maior triângulo com o escolhido antes e a
+média do trecho seguinte, o que preserva picos e vales que uma média apagaria. O Saldo
+Acumulado sai dos mesmos totais por dia (np.cumsum do líquido diário) e passa pelo
+mesmo LTTB. As séries ficam em cache até a próxima escrita em movements do usuário.
+"""
+import numpy as np
+from sqlalchemy import BigInteger, func, select, type_coerce
+from sqlalchemy.orm import Session
+
+from cache import cache
+from models import Movement
+
+MAX_POINTS = 1_500
+MARKER_POINTS = 60  # acima disso os marcadores só escondem a linha e custam render
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Índices (crescentes) dos threshold pontos escolhidos pelo LTTB; x crescente.
+
+    O primeiro e o último ponto ficam sempre; os do meio são divididos em threshold - 2
+    trechos e cada trecho contribui com um ponto.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    chosen = np.empty(threshold, dtype=np.int64)
+    chosen[0], chosen[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            cx, cy = x[hi:edges[i + 2]].mean(), y[hi:edges[i + 2]].mean()
+        else:
+            cx, cy = x[-1], y[-1]
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(area.argmax())
+        chosen[i + 1] = a
+    return chosen
+
+
+def downsample(days: np.ndarray, values: np.ndarray, max_points: int = MAX_POINTS):
+    """(days, values) com no máximo max_points pontos (days em datetime64[D], crescente)."""
+    keep = lttb(days.astype(np.int64), values, max_points)
+    return days[keep], values[keep]
+
+
+def daily_totals(db: Session, user_id: int) -> list:
+    """(dia, tipo, centavos) somados por dia e tipo no SQL, em ordem de dia."""
+    def load():
+        return db.execute(
+            select(Movement.date, Movement.kind, func.sum(type_coerce(Movement.amount, BigInteger)))
+            .where(Movement.user_id == user_id)
+            .group_by(Movement.date, Movement.kind)
+            .order_by(Movement.date)
+        ).all()
+
+    return cache.get_or_load(user_id, "movements", ("daily_totals",), load)
+
+
+def evolution_series(db: Session, user_id: int, max_points: int = MAX_POINTS) -> dict:
+    """{"Receita": (dias, reais), "Despesa": (dias, reais)} por dia, valores positivos."""
+    def load():
+        rows = daily_totals(db, user_id)
+        series = {}
+        for kind in ("Receita", "Despesa"):
+            days = np.array([d for d, k, _ in rows if k == kind], dtype="datetime64[D]")
+            values = np.array([c for _, k, c in rows if k == kind], dtype=np.int64) / 100.0
+            series[kind] = downsample(days, values, max_points)
+        return series
+
+    return cache.get_or_load(user_id, "movements", ("evolution_series", max_points), load)
+
+
+def balance_series(db: Session, user_id: int, max_points: int = MAX_POINTS):
+    """(dias, saldo acumulado em reais) no fim de cada dia com movimento.
+
+    Começa em zero na véspera do primeiro movimento, então sempre há ao menos dois
+    pontos (um só dia de movimentos ainda desenha a área).
+    """
+    def load():
+        rows = daily_totals(db, user_id)
+        if not rows:
+            return np.array([], dtype="datetime64[D]"), np.array([], dtype=np.float64)
+        days, day_index = np.unique(np.array([d for d, _, _ in rows], dtype="datetime64[D]"), return_inverse=True)
+        net = np.zeros(len(days) + 1, dtype=np.int64)
+        np.add.at(net, day_index + 1, [int(c or 0) if k == "Receita" else -int(c or 0) for _, k, c in rows])
+        days = np.concatenate([days[:1] - np.timedelta64(1, "D"), days])
+        return downsample(days, np.cumsum(net) / 100.0, max_points)
+
+    return cache.get_or_load(user_id, "movements", ("balance_series", max_points), load)
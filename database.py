@@ -1,24 +1,10 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import QueuePool
+from sqlalchemy.orm import Session
 import streamlit as st
 from contextlib import contextmanager
 from typing import Optional, Callable
 
-# Configure the database engine with connection pooling
-engine = create_engine(
-    'sqlite:///sql_app.db',
-    poolclass=QueuePool,
-    pool_size=10,
-    max_overflow=20,
-    connect_args={'check_same_thread': False},  # Required for SQLite
-    pool_timeout=30,
-    pool_recycle=1800,  # Recycle connections every 30 minutes
-    pool_pre_ping=True  # Verify connection before use
-)
-
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Engine and session factory come from the shared registry in db.py
+from db import engine, SessionLocal
 
 @contextmanager
 def get_db() -> Session:
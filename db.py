@@ -1,33 +1,180 @@
 # Caminho do arquivo: /Users/gustavomontalvao/Downloads/APP_DAVI_streamlit_v8_1_charts-2/db.py
 # --- DB bootstrap seguro (funciona local e no Streamlit Cloud) ---
+# Registro único de engines/sessões: app.py, database.py, db_utils.py e services/*
+# importam daqui, para que só exista um pool por processo apontando para o banco.
 import os
-from sqlalchemy import create_engine, event
-from sqlalchemy.orm import sessionmaker, declarative_base
-
-try:
-    # usa o módulo db.py se existir
-    from db import engine, SessionLocal, Base  # type: ignore
-except Exception:
-    # fallback integrado
-    DB_URL = os.getenv("DATABASE_URL", "sqlite:///./sql_app.db")
-    engine = create_engine(
-        DB_URL,
-        connect_args={"check_same_thread": False, "timeout": 30},
-        pool_pre_ping=True,
-    )
-
-    @event.listens_for(engine, "connect")
-    def _set_sqlite_pragma(dbapi_connection, _):
-        cur = dbapi_connection.cursor()
-        cur.execute("PRAGMA journal_mode=WAL;")
-        cur.execute("PRAGMA synchronous=NORMAL;")
-        cur.execute("PRAGMA foreign_keys=ON;")
-        cur.close()
-
-    SessionLocal = sessionmaker(
-        bind=engine,
-        autocommit=False,
-        autoflush=False,
-        expire_on_commit=False,
-    )
-    Base = declarative_base()
\ No newline at end of file
+import re
+from contextlib import contextmanager
+
+from sqlalchemy import TextClause, create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+
+DB_URL = os.getenv("DATABASE_URL", "sqlite:///./sql_app.db")
+
+# Perfil de pragmas do SQLite (ajustável por variável de ambiente)
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("DAVI_SQLITE_JOURNAL_MODE", "WAL"),           # leitores não bloqueiam o escritor
+    "synchronous": os.getenv("DAVI_SQLITE_SYNCHRONOUS", "NORMAL"),         # seguro com WAL, fsync só no checkpoint
+    "foreign_keys": "ON",                                                  # integridade referencial (cascatas)
+    "busy_timeout": int(os.getenv("DAVI_SQLITE_BUSY_TIMEOUT", "30000")),   # ms esperando o lock antes de "database is locked"
+    "mmap_size": int(os.getenv("DAVI_SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),  # leituras via mmap
+    "cache_size": int(os.getenv("DAVI_SQLITE_CACHE_SIZE", "-65536")),      # negativo = KiB (64 MiB por conexão)
+    "temp_store": os.getenv("DAVI_SQLITE_TEMP_STORE", "MEMORY"),           # ORDER BY/GROUP BY temporários em RAM
+}
+
+# Pools por backend. No SQLite só existe um escritor por vez: um pool de 1 conexão
+# enfileira as escritas no Python em vez de disputar o lock do arquivo; as leituras
+# (WAL) usam um pool próprio que nunca bloqueia o escritor.
+POOL_SETTINGS = {
+    "sqlite": {
+        "writer": {"pool_size": 1, "max_overflow": 0},
+        "reader": {"pool_size": int(os.getenv("DAVI_SQLITE_READERS", "8")), "max_overflow": 0},
+    },
+    "default": {
+        "writer": {"pool_size": 5, "max_overflow": 10, "pool_recycle": 1800},
+        "reader": None,  # mesmo engine do escritor
+    },
+}
+
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas=None, query_only=False):
+    """Aplica o perfil de pragmas numa conexão DBAPI do SQLite."""
+    pragmas = SQLITE_PRAGMAS if pragmas is None else pragmas
+    cur = dbapi_connection.cursor()
+    for name, value in pragmas.items():
+        cur.execute(f"PRAGMA {name}={value};")
+    if query_only:
+        cur.execute("PRAGMA query_only=ON;")
+    cur.close()
+
+
+def create_engines(url: str = DB_URL, pragmas=None):
+    """Cria o par (escritor, leitor) para a URL com as configurações do backend."""
+    backend = make_url(url).get_backend_name()
+    settings = POOL_SETTINGS.get(backend, POOL_SETTINGS["default"])
+
+    if backend != "sqlite":
+        writer = create_engine(url, pool_pre_ping=True, **settings["writer"])
+        return writer, writer
+    in_memory = make_url(url).database in (None, "", ":memory:")
+
+    busy_s = (SQLITE_PRAGMAS if pragmas is None else pragmas).get("busy_timeout", 30000) / 1000.0
+    connect_args = {"check_same_thread": False, "timeout": busy_s}
+
+    if in_memory:
+        writer = create_engine(url, connect_args=connect_args)
+    else:
+        writer = create_engine(url, connect_args=connect_args, pool_timeout=busy_s, **settings["writer"])
+
+    @event.listens_for(writer, "connect")
+    def _writer_pragmas(dbapi_connection, _):
+        apply_sqlite_pragmas(dbapi_connection, pragmas)
+
+    if in_memory:
+        # banco em memória só existe dentro da própria conexão
+        return writer, writer
+    reader = create_engine(url, connect_args=connect_args, pool_timeout=busy_s, **settings["reader"])
+
+    @event.listens_for(reader, "connect")
+    def _reader_pragmas(dbapi_connection, _):
+        apply_sqlite_pragmas(dbapi_connection, pragmas, query_only=True)
+
+    return writer, reader
+
+
+_READ_SQL = re.compile(r"\s*(select|with)\b", re.IGNORECASE)
+_WRITE_SQL = re.compile(r"\b(insert|update|delete|replace|upsert|create|drop|alter|pragma|vacuum|attach)\b",
+                        re.IGNORECASE)
+
+
+def is_read(clause) -> bool:
+    """Se a instrução só lê: SELECTs do Core/ORM e text() que começa com SELECT/WITH sem DML."""
+    if getattr(clause, "is_select", False):
+        return True
+    if isinstance(clause, TextClause):
+        return bool(_READ_SQL.match(clause.text)) and not _WRITE_SQL.search(clause.text)
+    return False
+
+
+class RoutingSession(Session):
+    """Sessão que lê pelo pool de leitura e escreve pelo escritor único.
+
+    Leituras (is_read: SELECTs e text() de SELECT) vão para o leitor até a sessão
+    escrever algo; a partir daí tudo vai para o escritor até o commit/rollback, para que
+    a transação enxergue as próprias escritas. DML e text() que não é SELECT vão para o
+    escritor.
+
+    Atenção: session.connection() não tem instrução para rotear e prende a sessão ao
+    escritor (um pool de 1 conexão no SQLite) até o commit/rollback. Leituras longas
+    (exportações, relatórios) usam read_connection().
+    """
+
+    writer = None
+    reader = None
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self.reader is None or self.reader is self.writer:
+            return self.writer
+        if self._flushing or self.info.get("wrote") or not is_read(clause):
+            self.info["wrote"] = True
+            return self.writer
+        return self.reader
+
+    def read_connection(self):
+        """Conexão do pool de leitura nesta sessão, sem prender a sessão ao escritor.
+
+        Depois de uma escrita ainda não commitada devolve a conexão do escritor, para
+        enxergar as próprias escritas.
+        """
+        if self.reader is None or self.info.get("wrote"):
+            return self.connection()
+        return self.connection(bind_arguments={"bind": self.reader})
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _reset_routing(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("wrote", None)
+
+
+engine, read_engine = create_engines(DB_URL)
+
+
+class AppSession(RoutingSession):
+    writer = engine
+    reader = read_engine
+
+
+SessionLocal = sessionmaker(
+    class_=AppSession,
+    autocommit=False,
+    autoflush=False,
+    expire_on_commit=False,
+)
+ReadSessionLocal = sessionmaker(bind=read_engine, autoflush=False, expire_on_commit=False)
+
+Base = declarative_base()
+
+
+def read_connection(session: Session):
+    """Conexão de leitura da sessão: read_connection() numa RoutingSession, connection() nas outras
+    (ReadSessionLocal já está no pool de leitura)."""
+    if isinstance(session, RoutingSession):
+        return session.read_connection()
+    return session.connection()
+
+
+@contextmanager
+def get_session(readonly: bool = False):
+    """Sessão do registro com commit/rollback automáticos."""
+    session = (ReadSessionLocal if readonly else SessionLocal)()
+    try:
+        yield session
+        if not readonly:
+            session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
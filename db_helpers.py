@@ -1,8 +1,12 @@
 from contextlib import contextmanager
 import math
 import streamlit as st
-from sqlalchemy import delete
-from models import Giant, GiantPayment, Movement, Bucket
+from sqlalchemy import BigInteger, delete, func, select, type_coerce
+from sqlalchemy.orm import Session
+from models import Giant, GiantPayment, GiantStats, Movement, MovementMonthly, Bucket, Bill, UserProfile
+from db import apply_sqlite_pragmas
+from money import from_cents, to_cents
+from services.allocation import allocate
 
 @contextmanager
 def tx(db):
@@ -15,11 +19,63 @@ def tx(db):
         raise
 
 def init_db_pragmas(engine):
-    """Configura pragmas do SQLite para melhor performance."""
+    """Configura pragmas do SQLite para melhor performance.
+
+    As conexões do registro em db.py já recebem o perfil completo ao conectar;
+    isto só reaplica o perfil numa conexão do engine informado.
+    """
+    if engine.dialect.name != "sqlite":
+        return
     with engine.connect() as conn:
-        conn.exec_driver_sql("PRAGMA journal_mode=WAL;")       # escrita concorrente rápida
-        conn.exec_driver_sql("PRAGMA synchronous=NORMAL;")     # latência menor
-        conn.exec_driver_sql("PRAGMA foreign_keys=ON;")        # integridade referencial
+        apply_sqlite_pragmas(conn.connection.dbapi_connection)
+
+# ============ Data loaders ============
+# Consultas das telas; cada uma é coberta por um índice composto (ver migrations.py)
+def load_buckets(db: Session, user_id: int):
+    return db.execute(select(Bucket).where(Bucket.user_id == user_id)).scalars().all()
+
+def load_giants(db: Session, user_id: int):
+    return db.execute(select(Giant).where(Giant.user_id == user_id)).scalars().all()
+
+def load_movements(db: Session, user_id: int):
+    return db.execute(
+        select(Movement).where(Movement.user_id == user_id).order_by(Movement.date.desc())
+    ).scalars().all()
+
+def load_bills(db: Session, user_id: int):
+    return db.execute(
+        select(Bill).where(Bill.user_id == user_id).order_by(Bill.due_date.asc())
+    ).scalars().all()
+
+def get_profile(db: Session, user_id: int) -> UserProfile:
+    prof = db.execute(select(UserProfile).where(UserProfile.user_id == user_id)).scalar_one_or_none()
+    if not prof:
+        prof = UserProfile(user_id=user_id, monthly_income=0.0, monthly_expense=0.0)
+        db.add(prof)
+        db.commit()
+        db.refresh(prof)
+    return prof
+
+# ============ Agregados (centavos inteiros, somados no SQL) ============
+def movement_totals(db: Session, user_id: int) -> dict:
+    """Totais em centavos por tipo de movimento ({"Receita": int, "Despesa": int}).
+
+    Lê o rollup movement_monthly (uma linha por mês/balde/tipo), não a tabela movements.
+    """
+    rows = db.execute(
+        select(MovementMonthly.kind, func.sum(type_coerce(MovementMonthly.total, BigInteger)))
+        .where(MovementMonthly.user_id == user_id)
+        .group_by(MovementMonthly.kind)
+    ).all()
+    totals = {"Receita": 0, "Despesa": 0}
+    totals.update({kind: int(cents or 0) for kind, cents in rows})
+    return totals
+
+def giant_paid_cents(db: Session, giant_id: int) -> int:
+    """Total já pago de um gigante, em centavos (lido da projeção giant_stats)."""
+    return int(db.execute(
+        select(type_coerce(GiantStats.total_paid, BigInteger)).where(GiantStats.giant_id == giant_id)
+    ).scalar() or 0)
 
 def delete_giant(db, user_id: int, giant_id: int):
     """Exclui um gigante e seus pagamentos de forma segura."""
@@ -49,31 +105,17 @@ def distribuir_por_baldes(db, user_id: int, valor: float, descricao: str, data_m
     
     try:
         with tx(db):
-            for b in buckets:
-                quota = valor * (b.percent / total)
-                mov = Movement(
-                    user_id=user_id,
-                    bucket_id=b.id,
-                    kind="Receita" if tipo == "Entrada" else "Despesa",
-                    amount=quota,
-                    description=f"{descricao} (rateio {b.percent:.1f}%)",
-                    date=data_mov,
-                )
-                db.add(mov)
-                if tipo == "Entrada":
-                    b.balance += quota
-                else:
-                    b.balance -= quota
+            allocate(db, user_id, buckets, [(valor, tipo, data_mov, descricao)], label="rateio")
         return True
     except Exception as e:
         st.error(f"Erro ao distribuir valor: {e}")
         return False
 
-def giant_forecast(giant, db):
-    """Calcula previsões para um gigante."""
+def giant_forecast(giant, db, paid_cents: int | None = None):
+    """Calcula previsões para um gigante (paid_cents evita reconsultar o total pago)."""
     try:
-        pago = sum(p.amount for p in db.query(GiantPayment).where(GiantPayment.giant_id==giant.id))
-        restante = max(giant.total_to_pay - pago, 0.0)
+        pago = giant_paid_cents(db, giant.id) if paid_cents is None else paid_cents
+        restante = from_cents(max(to_cents(giant.total_to_pay) - pago, 0))
         diaria = (giant.weekly_goal or 0.0)/7.0
         dias = (restante/diaria) if diaria>0 else None
         return restante, diaria, dias
@@ -84,8 +126,9 @@ def giant_forecast(giant, db):
 def check_giant_victory(db, giant, valor_aporte):
     """Verifica se um gigante foi derrotado após um aporte."""
     try:
-        total_pago = sum(p.amount for p in db.query(GiantPayment).filter_by(giant_id=giant.id))
-        if giant.total_to_pay > 0 and (total_pago + valor_aporte) >= giant.total_to_pay:
+        total_pago = giant_paid_cents(db, giant.id)
+        total = to_cents(giant.total_to_pay)
+        if total > 0 and (total_pago + to_cents(valor_aporte)) >= total:
             giant.status = "defeated"
             giant.progress = 1.0
             st.balloons()
@@ -1,20 +1,8 @@
 from contextlib import contextmanager
-from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy import create_engine
-from sqlalchemy.pool import QueuePool
+from sqlalchemy.orm import Session
 
-# Configure engine with connection pooling
-engine = create_engine(
-    'sqlite:///sql_app.db', 
-    poolclass=QueuePool,
-    pool_size=10,
-    max_overflow=20,
-    pool_timeout=30,
-    pool_recycle=1800,  # Recycle connections every 30 minutes
-    pool_pre_ping=True  # Verify connection before use
-)
-
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Engine and session factory come from the shared registry in db.py
+from db import engine, SessionLocal
 
 @contextmanager
 def get_db_session():
@@ -0,0 +1,296 @@
+"""Exportação da conta: Livro Caixa em CSV, tabelas em Parquet/Excel e o arquivo .zip completo.
+
+Cada tabela é uma consulta só (com JOIN para os nomes de balde e gigante), na ordem do
+índice por data, lida em partições com yield_per: a memória não cresce com o tamanho do
+livro. No CSV (";") os valores saem em reais no padrão brasileiro, com sinal (despesa
+negativa), e o Livro Caixa volta pelo Importar Extrato sem ajustes. No Parquet os valores
+ficam em centavos (int64, exatos) e cada mês vira um row group, para quem lê filtrar por
+data sem abrir o arquivo todo. pyarrow (Parquet) e openpyxl (Excel) são opcionais.
+"""
+import csv
+import io
+import tempfile
+import time
+import zipfile
+from dataclasses import dataclass
+from itertools import chain, groupby
+from typing import Callable
+
+from sqlalchemy import BigInteger, case, select, type_coerce
+from sqlalchemy.orm import Session
+
+from db import read_connection
+from models import Bill, Bucket, Giant, GiantPayment, Movement
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # dependência opcional
+    pa = pq = None
+
+try:
+    import openpyxl
+    from openpyxl.cell import WriteOnlyCell
+except ImportError:  # dependência opcional
+    openpyxl = None
+
+HAS_PARQUET = pq is not None
+HAS_EXCEL = openpyxl is not None
+YIELD_ROWS = 5_000
+EXCEL_MAX_ROWS = 1_048_575  # linhas de dados por aba (o limite do Excel conta o cabeçalho)
+COPY_BYTES = 1 << 20
+EXCEL_FORMATS = {"date": "DD/MM/YYYY", "cents": "#,##0.00"}
+ARROW_TYPES = {"int": "int64", "str": "string", "date": "date32", "cents": "int64", "bool": "bool_",
+               "float": "float64"}
+
+
+@dataclass(frozen=True)
+class Column:
+    header: str  # CSV e Excel
+    field: str  # Parquet
+    kind: str  # int, str, date, cents, bool, float
+
+
+@dataclass(frozen=True)
+class ExportTable:
+    """Consulta de um usuário (colunas na ordem de columns) e como exportá-la."""
+    name: str
+    query: Callable
+    columns: tuple
+    month_column: int | None = None  # coluna de data que ordena a consulta: um row group por mês
+
+
+def brl(cents: int) -> str:
+    """Centavos -> "1.234,56" / "-10,00", em aritmética inteira."""
+    sign = "-" if cents < 0 else ""
+    reais, cents = divmod(abs(cents), 100)
+    if reais < 1000:
+        return f"{sign}{reais},{cents:02d}"
+    return f"{sign}{reais:,}".replace(",", ".") + f",{cents:02d}"
+
+
+def _cents(column):
+    return type_coerce(column, BigInteger)
+
+
+def ledger_query(user_id: int):
+    """Movimentos do usuário com o nome do balde e o valor com sinal em centavos, por data."""
+    cents = _cents(Movement.amount)
+    return (
+        select(Movement.id, Movement.date, Movement.kind, Bucket.name,
+               _cents(case((Movement.kind == "Despesa", -cents), else_=cents)), Movement.description)
+        .outerjoin(Bucket, Bucket.id == Movement.bucket_id)
+        .where(Movement.user_id == user_id)
+        .order_by(Movement.date, Movement.id)
+    )
+
+
+def _bills_query(user_id: int):
+    return (select(Bill.id, Bill.due_date, Bill.title, _cents(Bill.amount), Bill.is_critical, Bill.paid)
+            .where(Bill.user_id == user_id).order_by(Bill.due_date, Bill.id))
+
+
+def _giants_query(user_id: int):
+    return (select(Giant.id, Giant.name, _cents(Giant.total_to_pay), Giant.parcels, Giant.priority,
+                   Giant.status, Giant.interest_rate)
+            .where(Giant.user_id == user_id).order_by(Giant.priority, Giant.id))
+
+
+def _payments_query(user_id: int):
+    return (select(GiantPayment.id, GiantPayment.date, Giant.name, _cents(GiantPayment.amount), GiantPayment.note)
+            .join(Giant, Giant.id == GiantPayment.giant_id)
+            .where(GiantPayment.user_id == user_id).order_by(GiantPayment.date, GiantPayment.id))
+
+
+TABLES = {table.name: table for table in (
+    ExportTable("livro_caixa", ledger_query, (
+        Column("ID", "id", "int"), Column("Data", "data", "date"), Column("Tipo", "tipo", "str"),
+        Column("Balde", "balde", "str"), Column("Valor", "valor_centavos", "cents"),
+        Column("Descrição", "descricao", "str"),
+    ), month_column=1),
+    ExportTable("contas", _bills_query, (
+        Column("ID", "id", "int"), Column("Vencimento", "vencimento", "date"), Column("Conta", "conta", "str"),
+        Column("Valor", "valor_centavos", "cents"), Column("Crítica", "critica", "bool"),
+        Column("Paga", "paga", "bool"),
+    ), month_column=1),
+    ExportTable("gigantes", _giants_query, (
+        Column("ID", "id", "int"), Column("Gigante", "gigante", "str"), Column("Total", "total_centavos", "cents"),
+        Column("Parcelas", "parcelas", "int"), Column("Prioridade", "prioridade", "int"),
+        Column("Status", "status", "str"), Column("Juros", "juros", "float"),
+    )),
+    ExportTable("pagamentos", _payments_query, (
+        Column("ID", "id", "int"), Column("Data", "data", "date"), Column("Gigante", "gigante", "str"),
+        Column("Valor", "valor_centavos", "cents"), Column("Observação", "observacao", "str"),
+    ), month_column=1),
+)}
+
+
+def _partitions(db: Session, user_id: int, table: ExportTable, yield_rows: int):
+    """Linhas da consulta em listas de até yield_rows, pelo Core (sem a camada de carga do ORM).
+
+    Pela conexão de leitura: uma exportação longa não segura o escritor único.
+    """
+    conn = read_connection(db)
+    return conn.execute(table.query(user_id).execution_options(yield_per=yield_rows)).partitions()
+
+
+def _csv_formatters(columns) -> list:
+    """Conversão de cada coluna para o CSV (None: como vem do banco, com None virando vazio)."""
+    days = {}  # as datas se repetem muito: formatadas uma vez cada
+
+    def day(d):
+        text = days.get(d)
+        if text is None:
+            text = days[d] = d.strftime("%d/%m/%Y")
+        return text
+
+    by_kind = {
+        "date": day,
+        "cents": brl,
+        "bool": lambda v: "Sim" if v else "Não",
+        "float": lambda v: "" if v is None else f"{v:g}".replace(".", ","),
+    }
+    return [by_kind.get(c.kind) for c in columns]
+
+
+def table_csv(db: Session, user_id: int, table: ExportTable, yield_rows: int = YIELD_ROWS):
+    """CSV da tabela (UTF-8 com BOM, para o Excel) em pedaços de bytes, um por partição."""
+    formatters = _csv_formatters(table.columns)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=";", lineterminator="\n")
+    writer.writerow([c.header for c in table.columns])
+    yield ("\ufeff" + buffer.getvalue()).encode()
+    for rows in _partitions(db, user_id, table, yield_rows):
+        buffer.seek(0)
+        buffer.truncate()
+        columns = [values if fmt is None else map(fmt, values) for fmt, values in zip(formatters, zip(*rows))]
+        writer.writerows(zip(*columns))
+        yield buffer.getvalue().encode()
+
+
+def ledger_csv(db: Session, user_id: int, yield_rows: int = YIELD_ROWS):
+    """CSV do Livro Caixa (ver table_csv)."""
+    return table_csv(db, user_id, TABLES["livro_caixa"], yield_rows)
+
+
+def arrow_schema(table: ExportTable):
+    return pa.schema([pa.field(c.field, getattr(pa, ARROW_TYPES[c.kind])()) for c in table.columns])
+
+
+def record_batches(db: Session, user_id: int, table: ExportTable, yield_rows: int = YIELD_ROWS):
+    """pyarrow.RecordBatch da tabela, montados direto das partições da consulta.
+
+    Tabelas com data saem um lote por mês (a consulta já vem ordenada pela data); as
+    outras, um lote por partição.
+    """
+    schema = arrow_schema(table)
+    groups = _partitions(db, user_id, table, yield_rows)
+    if table.month_column is not None:
+        i = table.month_column
+        rows = chain.from_iterable(groups)
+        groups = (list(month) for _, month in groupby(rows, key=lambda row: (row[i].year, row[i].month)))
+    for group in groups:
+        yield pa.record_batch([pa.array(values, type=field.type) for values, field in zip(zip(*group), schema)],
+                              schema=schema)
+
+
+def write_parquet(db: Session, user_id: int, table: ExportTable, sink, yield_rows: int = YIELD_ROWS) -> int:
+    """Grava a tabela em Parquet (zstd) em sink (caminho ou arquivo), um row group por lote; devolve as linhas."""
+    if pq is None:
+        raise RuntimeError("Exportação em Parquet requer o pacote pyarrow (pip install pyarrow).")
+    rows = 0
+    with pq.ParquetWriter(sink, arrow_schema(table), compression="zstd") as writer:
+        for batch in record_batches(db, user_id, table, yield_rows):
+            writer.write_table(pa.Table.from_batches([batch]), row_group_size=max(batch.num_rows, 1))
+            rows += batch.num_rows
+    return rows
+
+
+def write_excel(db: Session, user_id: int, sink, tables=None, yield_rows: int = YIELD_ROWS) -> None:
+    """Uma aba por tabela, valores em reais; o openpyxl em modo write-only manda as linhas para o disco.
+
+    Tabelas com mais de EXCEL_MAX_ROWS linhas continuam nas abas nome_2, nome_3...
+    """
+    if openpyxl is None:
+        raise RuntimeError("Exportação em Excel requer o pacote openpyxl (pip install openpyxl).")
+    workbook = openpyxl.Workbook(write_only=True)
+
+    def cell(sheet, kind, value):
+        if kind not in EXCEL_FORMATS:
+            return value
+        cell = WriteOnlyCell(sheet, value / 100 if kind == "cents" else value)
+        cell.number_format = EXCEL_FORMATS[kind]
+        return cell
+
+    for table in tables or TABLES.values():
+        header = [c.header for c in table.columns]
+        kinds = [c.kind for c in table.columns]
+        sheet, written, part = None, EXCEL_MAX_ROWS, 0
+        for rows in _partitions(db, user_id, table, yield_rows):
+            for row in rows:
+                if written == EXCEL_MAX_ROWS:
+                    part += 1
+                    sheet = workbook.create_sheet(table.name if part == 1 else f"{table.name}_{part}")
+                    sheet.append(header)
+                    written = 0
+                sheet.append([cell(sheet, kind, v) for kind, v in zip(kinds, row)])
+                written += 1
+        if sheet is None:
+            workbook.create_sheet(table.name).append(header)
+    workbook.save(sink)
+
+
+def _zip_entry(name: str, compress_type: int) -> zipfile.ZipInfo:
+    info = zipfile.ZipInfo(name, time.localtime()[:6])
+    info.compress_type = compress_type
+    return info
+
+
+class _Drain(io.RawIOBase):
+    """Destino sem seek do ZipFile: guarda o que foi escrito até account_archive recolher."""
+
+    def __init__(self):
+        self.parts = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self.parts)
+        self.parts.clear()
+        return data
+
+
+def account_archive(db: Session, user_id: int, yield_rows: int = YIELD_ROWS):
+    """.zip com todas as tabelas da conta, em pedaços de bytes conforme é montado.
+
+    Cada tabela vai em CSV e, com pyarrow, também em Parquet. O ParquetWriter precisa
+    de um destino com seek, então o Parquet passa por um arquivo temporário e é copiado
+    em pedaços; nada fica inteiro na memória.
+    """
+    out = _Drain()
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as archive:
+        for table in TABLES.values():
+            with archive.open(_zip_entry(f"{table.name}.csv", zipfile.ZIP_DEFLATED), "w", force_zip64=True) as entry:
+                for part in table_csv(db, user_id, table, yield_rows):
+                    entry.write(part)
+                    if data := out.drain():
+                        yield data
+            if pq is None:
+                continue
+            with tempfile.TemporaryFile() as spool:
+                write_parquet(db, user_id, table, spool, yield_rows)
+                spool.seek(0)
+                # já comprimido (zstd): entra no .zip sem deflate
+                entry_info = _zip_entry(f"{table.name}.parquet", zipfile.ZIP_STORED)
+                with archive.open(entry_info, "w", force_zip64=True) as entry:
+                    while chunk := spool.read(COPY_BYTES):
+                        entry.write(chunk)
+                        if data := out.drain():
+                            yield data
+    if data := out.drain():
+        yield data
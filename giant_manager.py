@@ -1,23 +1,18 @@
 import streamlit as st
 from sqlalchemy.orm import Session
 from sqlalchemy import select, text, inspect
-from datetime import date, datetime, timedelta
+from datetime import date, datetime
 import pandas as pd
 import time
 from models import Giant, GiantPayment
 from utils import money_br, date_br
 from text_utils import clean_emoji_text, get_giant_status_text
-
-# Melhorias de Performance e Cache
-@st.cache_data(ttl=300)
-def get_giant_payments(giant_id):
-    with get_db() as db:
-        return db.query(GiantPayment).filter_by(giant_id=giant_id).all()
-
-@st.cache_data(ttl=300)
-def get_total_paid(giant_id):
-    payments = get_giant_payments(giant_id)
-    return sum(p.amount for p in payments)
+from read_models import read_buckets, read_payment_index, read_profile
+from cache import cache, invalidate
+from money import from_cents
+from payoff import (MIN_HISTORY_MONTHS, STRATEGIES, STRATEGY_LABELS, WEEKS_PER_MONTH, AllocationPlan,
+                    history_volatility, monte_carlo, portfolio_from_giants, simulate)
+from services.rollups import monthly_totals
 
 from contextlib import contextmanager
 
@@ -65,6 +60,7 @@ def delete_giant_with_confirm(giant_id: int, giant_name: str):
                     return True
                 
                 if safe_db_operation(delete_operation):
+                    invalidate(st.session_state.user.id, "giants", "payments")
                     st.success(f"Gigante {giant_name} excluído com sucesso!")
                     del st.session_state.confirmar_exclusao_giant[giant_id]
                     time.sleep(1)
@@ -162,14 +158,16 @@ def render_giant_card(giant_data, db):
                         return False
                     
                     if safe_db_operation(add_payment):
+                        invalidate(st.session_state.user.id, "giants", "payments")
                         st.success("Aporte registrado com sucesso!")
                         time.sleep(1)
                         st.rerun()
                 else:
                         st.error("Informe um valor maior que zero")
 
-def render_plano_ataque(db, giants):
-    """Renderizar seção completa do Plano de Ataque"""
+def render_plano_ataque(db, giants, payments=None, daily_budget=None):
+    """Renderizar seção completa do Plano de Ataque (payments: read_models.PaymentIndex do usuário;
+    daily_budget: app_utils.daily_budget_for_giants, base do orçamento da projeção)"""
     st.header("🎯 Plano de Ataque")
     
     # Estilos otimizados para mobile
@@ -242,16 +240,19 @@ def render_plano_ataque(db, giants):
         if 'confirmar_exclusao_giant' not in st.session_state:
             st.session_state.confirmar_exclusao_giant = {}
             
+        # Pago/depósitos da semana de todos os gigantes a partir do índice de aportes do usuário
+        if payments is None:
+            payments = read_payment_index(db, giants[0].user_id)
+        overview = payments.overview([g.id for g in giants])
+
         giant_data = []
         for giant in giants:
-            # Usar funções cacheadas para melhor performance
-            total_pago = get_total_paid(giant.id)
+            stats = overview.get(giant.id, {"paid": 0, "week": 0})
+            total_pago = from_cents(stats["paid"])
             restante = giant.total_to_pay - total_pago
             progresso = (total_pago / giant.total_to_pay) if giant.total_to_pay > 0 else 0
             
-            ultima_semana = date.today() - timedelta(days=7)
-            aportes = get_giant_payments(giant.id)
-            depositos_semana = sum(p.amount for p in aportes if p.date >= ultima_semana)
+            depositos_semana = from_cents(stats["week"])
             meta_atingida = depositos_semana >= giant.weekly_goal if giant.weekly_goal else False
             
             giant_data.append({
@@ -277,3 +278,96 @@ def render_plano_ataque(db, giants):
             # Verificar exclusão
             if st.session_state.confirmar_exclusao_giant.get(giant['ID'], False):
                 delete_giant_with_confirm(giant['ID'], giant['Nome'])
+
+        render_payoff_projection(giants, payments, daily_budget)
+        render_victory_forecast(db, giants, payments)
+
+
+def render_payoff_projection(giants, payments, daily_budget=None):
+    """Projeção de quitação (payoff.simulate) e divisão semanal do orçamento (AllocationPlan)."""
+    portfolio = portfolio_from_giants(giants, {g.id: payments.paid_cents(g.id) for g in giants})
+    if not len(portfolio.ids):
+        return
+
+    st.subheader("📈 Projeção de Quitação")
+    if daily_budget:
+        default_budget = daily_budget * 365 / 12
+    else:
+        default_budget = sum(g.weekly_goal or 0.0 for g in giants if g.status != "defeated") * WEEKS_PER_MONTH
+    col1, col2 = st.columns(2)
+    with col1:
+        budget = st.number_input("Orçamento mensal para os gigantes", min_value=0.0,
+                                 value=round(default_budget, 2), step=50.0, format="%.2f",
+                                 key="payoff_budget")
+    with col2:
+        strategy = st.selectbox("Estratégia", STRATEGIES, format_func=STRATEGY_LABELS.get, key="payoff_strategy")
+
+    result = simulate(portfolio, budget)
+    cols = st.columns(len(STRATEGIES))
+    for col, s in zip(cols, STRATEGIES):
+        meses = result.months_to_freedom(s)
+        col.metric(STRATEGY_LABELS[s], f"{meses} meses" if meses >= 0 else "+30 anos",
+                   f"Juros {money_br(result.total_interest(s))}", delta_color="off")
+
+    row = result.strategies.index(strategy)
+    dates = result.payoff_dates(strategy)
+    st.dataframe(pd.DataFrame({
+        "Gigante": portfolio.names,
+        "Restante": [money_br(v) for v in portfolio.balances],
+        "Juros/mês": [f"{r * 100:.1f}%" for r in portfolio.rates],
+        "Parcela mínima": [money_br(v) for v in portfolio.minimums],
+        "Quitação": [date_br(d) if d else "Não quita em 30 anos" for d in dates],
+        "Juros totais": [money_br(v) for v in result.interest[row]],
+    }), use_container_width=True, hide_index=True)
+    if budget < portfolio.minimums.sum():
+        st.warning("O orçamento não cobre as parcelas mínimas; elas foram pagas proporcionalmente.")
+
+    # divisão da semana que minimiza os juros; o plano fica na sessão e só re-resolve o que mudou
+    plan = st.session_state.get("allocation_plan")
+    if plan is None:
+        plan = st.session_state.allocation_plan = AllocationPlan(portfolio, budget / WEEKS_PER_MONTH)
+    else:
+        plan.sync(portfolio, budget / WEEKS_PER_MONTH)
+    allocation = plan.allocation()
+    names = dict(zip(portfolio.ids.tolist(), portfolio.names))
+    st.caption(f"🧮 Divisão semanal que minimiza os juros ({money_br(plan.weekly_budget)} por semana)")
+    for gid in plan.order():
+        st.markdown(f"• **{names[gid]}** — {money_br(allocation[gid])}")
+
+
+def render_victory_forecast(db, giants, payments):
+    """Datas de vitória P50/P90 por gigante (payoff.monte_carlo, até 10 mil caminhos)."""
+    user_id = giants[0].user_id
+    portfolio = portfolio_from_giants(giants, {g.id: payments.paid_cents(g.id) for g in giants})
+    profile = read_profile(db, user_id)
+    if not len(portfolio.ids) or profile is None or not profile.monthly_income:
+        return
+
+    share = sum(b.percent or 0.0 for b in read_buckets(db, user_id) if (b.type or "").lower() == "giant") / 100.0
+    income_cv, expense_cv, history = history_volatility(monthly_totals(db, user_id))
+    params = (profile.monthly_income, profile.monthly_expense or 0.0, income_cv, expense_cv, share)
+    # a chave leva todas as entradas: qualquer aporte, edição de gigante ou mudança de perfil gera outra
+    key = ("monte_carlo", portfolio.ids.tobytes(), portfolio.balances.tobytes(), portfolio.rates.tobytes(),
+           portfolio.minimums.tobytes(), portfolio.priorities.tobytes(), params)
+    result = cache.get_or_load(user_id, "payments", key, lambda: monte_carlo(
+        portfolio, params[0], params[1], income_cv=income_cv, expense_cv=expense_cv, giant_share=share,
+        seed=user_id))
+
+    st.subheader("🎲 Previsão de Vitória")
+    p50_dates, p90_dates = result.dates(result.p50), result.dates(result.p90)
+    st.dataframe(pd.DataFrame({
+        "Gigante": result.names,
+        "Provável (P50)": [date_br(d) if d else "Após 30 anos" for d in p50_dates],
+        "Conservadora (P90)": [date_br(d) if d else "Após 30 anos" for d in p90_dates],
+        "Chance em 30 anos": [f"{w * 100:.0f}%" for w in result.win_rate],
+    }), use_container_width=True, hide_index=True)
+    all_p50, all_p90 = result.dates([result.all_p50, result.all_p90])
+    if history >= MIN_HISTORY_MONTHS:
+        source = f"variação de receita (±{income_cv * 100:.0f}%) e despesa (±{expense_cv * 100:.0f}%) de {history} meses do seu histórico"
+    else:
+        source = f"variação padrão de ±{income_cv * 100:.0f}% (histórico com menos de {MIN_HISTORY_MONTHS} meses)"
+    paths = f"{result.paths:,}".replace(",", ".")
+    st.caption(
+        f"Todos derrotados: {date_br(all_p50) if all_p50 else 'após 30 anos'} (P50) · "
+        f"{date_br(all_p90) if all_p90 else 'após 30 anos'} (P90). {paths} simulações com a {source}."
+    )
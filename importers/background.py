@@ -0,0 +1,216 @@
+"""Fila de importações de extrato, gravada na tabela import_jobs.
+
+A tela só copia o arquivo para IMPORT_DIR e enfileira o job; um worker (thread no
+servidor do Streamlit ou python manage.py import-worker) processa os jobs em blocos, e
+cada bloco grava o checkpoint (linhas do arquivo já gravadas) na mesma transação dos
+lançamentos. Um job que parou no meio (navegador fechado não importa; processo morto,
+servidor reiniciado) volta para a fila quando o pulso dele fica velho e continua do
+checkpoint. A página acompanha pelo banco, sem segurar o rerun.
+
+Vários arquivos enviados juntos (ex.: um ano de extratos mensais) são lidos em paralelo
+por importers/parallel.py e gravados por este mesmo worker, um job por vez.
+"""
+import json
+import os
+import shutil
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.orm import Session
+
+from db import SessionLocal
+from importers.csv_import import import_csv
+from importers.ofx_import import import_ofx
+from importers.pdf_import import import_pdf
+from importers.categorize import read_bucket_rules
+from importers.parallel import parse_files, row_fraction
+from importers.pipeline import ImportProgress, bucket_lookup, write_chunks
+from importers.qif_import import import_qif
+from models import ImportJob
+from read_models import read_buckets
+
+IMPORT_DIR = Path(os.getenv("IMPORT_DIR", Path(__file__).resolve().parent.parent / "uploads"))
+IMPORTERS = {"csv": import_csv, "ofx": import_ofx, "qif": import_qif, "pdf": import_pdf}
+STALE_SECONDS = 120  # job "running" sem pulso há mais que isso foi abandonado
+POLL_SECONDS = 2.0
+BATCH_JOBS = 24  # jobs do mesmo usuário lidos em paralelo de uma vez
+PARSE_WORKERS = int(os.getenv("IMPORT_PARSE_WORKERS", "0")) or None  # None = um processo por CPU
+
+_wake = threading.Event()
+_worker_lock = threading.Lock()
+_worker = None
+
+
+def enqueue_imports(db: Session, user_id: int, files) -> list[ImportJob]:
+    """Copia os arquivos (nome, formato, binário, opções) para IMPORT_DIR e põe os jobs na fila.
+
+    Um commit só: o worker vê os arquivos enviados juntos de uma vez e os lê em paralelo.
+    """
+    IMPORT_DIR.mkdir(parents=True, exist_ok=True)
+    jobs = []
+    for name, fmt, file, options in files:
+        if fmt not in IMPORTERS:
+            raise ValueError(f"Formato de extrato não suportado: {fmt}")
+        now = datetime.now()
+        job = ImportJob(user_id=user_id, name=name, format=fmt, path="", options=json.dumps(options),
+                        created_at=now, updated_at=now)
+        db.add(job)
+        db.flush()
+        path = IMPORT_DIR / f"{job.id}.{fmt}"
+        with open(path, "wb") as out:
+            shutil.copyfileobj(file, out, 1 << 20)
+        job.path = str(path)
+        jobs.append(job)
+    db.commit()
+    _wake.set()
+    return jobs
+
+
+def enqueue_import(db: Session, user_id: int, name: str, fmt: str, file, **options) -> ImportJob:
+    """Um arquivo na fila (ver enqueue_imports)."""
+    return enqueue_imports(db, user_id, [(name, fmt, file, options)])[0]
+
+
+def job_progress(job: ImportJob) -> ImportProgress:
+    """ImportProgress do último bloco gravado do job (ponto de retomada)."""
+    return ImportProgress(
+        chunks=job.chunks, read=job.checkpoint, imported=job.imported, rejected=job.rejected,
+        duplicates=job.duplicates, categorized=job.categorized, fraction=job.fraction,
+        errors=[tuple(e) for e in json.loads(job.errors or "[]")], seconds=job.seconds,
+    )
+
+
+def _save_checkpoint(job_id: int, waiting=()):
+    """checkpoint de import_chunks; renova também o pulso dos jobs do lote que esperam a vez."""
+    def checkpoint(db: Session, progress: ImportProgress) -> None:
+        now = datetime.now()
+        db.execute(update(ImportJob).where(ImportJob.id == job_id).values(
+            checkpoint=progress.read, chunks=progress.chunks, imported=progress.imported,
+            duplicates=progress.duplicates, categorized=progress.categorized, rejected=progress.rejected,
+            errors=json.dumps(progress.errors), fraction=progress.fraction, seconds=progress.seconds,
+            updated_at=now,
+        ))
+        if waiting:
+            db.execute(update(ImportJob).where(ImportJob.id.in_(waiting)).values(updated_at=now))
+    return checkpoint
+
+
+def claim_next(db: Session) -> int | None:
+    """Reserva o job mais antigo na fila (ou abandonado); seguro com vários workers."""
+    stale = datetime.now() - timedelta(seconds=STALE_SECONDS)
+    claimable = or_(ImportJob.status == "queued", (ImportJob.status == "running") & (ImportJob.updated_at < stale))
+    for job_id in db.scalars(select(ImportJob.id).where(claimable).order_by(ImportJob.id).limit(5)):
+        claimed = db.execute(update(ImportJob).where(ImportJob.id == job_id, claimable)
+                             .values(status="running", updated_at=datetime.now()))
+        db.commit()
+        if claimed.rowcount == 1:
+            return job_id
+    return None
+
+
+def claim_batch(db: Session, limit: int = BATCH_JOBS) -> list[int]:
+    """Reserva o próximo job e os outros que o mesmo usuário enfileirou junto com ele."""
+    first = claim_next(db)
+    if first is None:
+        return []
+    batch = [first]
+    user_id = db.get(ImportJob, first).user_id
+    for job_id in db.scalars(select(ImportJob.id).where(ImportJob.user_id == user_id, ImportJob.status == "queued")
+                             .order_by(ImportJob.id).limit(limit - 1)):
+        claimed = db.execute(update(ImportJob).where(ImportJob.id == job_id, ImportJob.status == "queued")
+                             .values(status="running", updated_at=datetime.now()))
+        db.commit()
+        if claimed.rowcount == 1:
+            batch.append(job_id)
+    return batch
+
+
+def _finish(db: Session, job: ImportJob, error: str | None) -> str:
+    status = "failed" if error else "done"
+    db.execute(update(ImportJob).where(ImportJob.id == job.id)
+               .values(status=status, error=error, updated_at=datetime.now()))
+    db.commit()
+    Path(job.path).unlink(missing_ok=True)
+    return status
+
+
+def run_batch(db: Session, job_ids: list[int], workers: int | None = PARSE_WORKERS) -> list[str]:
+    """Jobs de um usuário lidos em paralelo (ProcessPoolExecutor) e gravados aqui, em ordem.
+
+    Cada job mantém seu checkpoint e seu status: um arquivo com erro não para os outros.
+    """
+    jobs = [db.get(ImportJob, job_id) for job_id in job_ids]
+    user_id = jobs[0].user_id
+    lookup = bucket_lookup(read_buckets(db, user_id))
+    rules = read_bucket_rules(db, user_id)
+    specs = [(job.format, job.path, json.loads(job.options or "{}"), job.checkpoint) for job in jobs]
+    statuses = []
+    for index, (job, future) in enumerate(zip(jobs, parse_files(specs, lookup, workers))):
+        try:
+            parsed = future.result()
+            progress = job_progress(job)
+            checkpoint = _save_checkpoint(job.id, waiting=job_ids[index + 1:])
+            for _ in write_chunks(db, user_id, parsed, rules, row_fraction(parsed, progress), progress, checkpoint):
+                pass
+            error = None
+        except Exception as e:
+            db.rollback()
+            error = str(e)
+        statuses.append(_finish(db, job, error))
+    return statuses
+
+
+def run_job(db: Session, job_id: int) -> str:
+    """Processa um job reservado a partir do checkpoint; devolve o status final."""
+    job = db.get(ImportJob, job_id)
+    try:
+        with open(job.path, "rb") as file:
+            for _ in IMPORTERS[job.format](db, job.user_id, file, progress=job_progress(job),
+                                           checkpoint=_save_checkpoint(job_id), **json.loads(job.options or "{}")):
+                pass
+        error = None
+    except Exception as e:
+        db.rollback()
+        error = str(e)
+    return _finish(db, job, error)
+
+
+def work(session_factory=SessionLocal, once: bool = False) -> int:
+    """Laço do worker: processa a fila e espera por jobs novos. once=True para quando esvaziar."""
+    processed = 0
+    while True:
+        with session_factory() as db:
+            batch = claim_batch(db)
+            if len(batch) == 1:
+                run_job(db, batch[0])  # um arquivo: lido em streaming, progresso por bloco
+            elif batch:
+                run_batch(db, batch)
+            if batch:
+                processed += len(batch)
+                continue
+        if once:
+            return processed
+        _wake.wait(POLL_SECONDS)
+        _wake.clear()
+
+
+def ensure_worker(session_factory=SessionLocal) -> None:
+    """Sobe (uma vez por processo) a thread do worker dentro do servidor do Streamlit."""
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=work, args=(session_factory,), name="import-worker", daemon=True)
+            _worker.start()
+
+
+def user_jobs(db: Session, user_id: int, limit: int = BATCH_JOBS) -> list[ImportJob]:
+    """Importações do usuário, mais recentes primeiro."""
+    return db.scalars(select(ImportJob).where(ImportJob.user_id == user_id)
+                      .order_by(ImportJob.created_at.desc(), ImportJob.id.desc()).limit(limit)).all()
+
+
+def forget_finished(db: Session, user_id: int) -> None:
+    db.execute(delete(ImportJob).where(ImportJob.user_id == user_id, ImportJob.status.in_(("done", "failed"))))
+    db.commit()
@@ -0,0 +1,102 @@
+"""Classificação automática de lançamentos importados nos baldes.
+
+As regras saem do histórico do usuário: cada palavra (e par de palavras vizinhas) das
+descrições já classificadas conta para o balde do movimento; vira regra o termo que
+aparece ao menos MIN_SUPPORT vezes com MIN_SHARE das ocorrências num mesmo balde
+("netflix" -> Lazer, "posto shell" -> Transporte). Termos genéricos ("compra", "pix")
+se espalham pelos baldes e ficam de fora sozinhos.
+
+O casamento é um dicionário termo -> regra consultado com os termos de cada descrição
+distinta do bloco (um extrato repete muito as descrições), o que equivale a um
+autômato multipadrão para padrões que são palavras inteiras.
+"""
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from cache import cache
+from models import Movement
+
+MIN_SUPPORT = 2
+MIN_SHARE = 0.8
+STOPWORDS = frozenset({
+    "compra", "pagamento", "pagto", "pix", "transferencia", "ted", "doc", "debito", "credito",
+    "cartao", "parcela", "auto", "para", "com", "dos", "das", "ltda", "eireli", "epp",
+})
+_WORD = re.compile(r"[a-z]{3,}")  # números (datas, parcelas, códigos) não identificam o balde
+
+
+def terms(description: str) -> list[str]:
+    """Palavras sem acento e caixa (3+ letras, sem STOPWORDS) e os pares de palavras vizinhas."""
+    text = unicodedata.normalize("NFKD", description.casefold()).encode("ascii", "ignore").decode()
+    words = [w for w in _WORD.findall(text) if w not in STOPWORDS]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+@dataclass(frozen=True)
+class BucketRules:
+    """Termo -> (bucket_id, força); a força ordena as regras quando vários termos casam."""
+    rules: dict
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def classify(self, description: str) -> int | None:
+        best = None
+        for term in terms(description):
+            rule = self.rules.get(term)
+            if rule is not None and (best is None or rule[1] > best[1]):
+                best = rule
+        return best[0] if best else None
+
+    def classify_many(self, descriptions: pd.Series) -> np.ndarray:
+        """bucket_id (ou None) de cada descrição, classificando cada descrição distinta uma vez."""
+        codes, uniques = pd.factorize(descriptions)
+        return np.array([self.classify(d) for d in uniques], dtype=object)[codes]
+
+
+def learn_rules(history) -> BucketRules:
+    """Regras a partir de (descrição, bucket_id, quantidade) dos movimentos já classificados."""
+    counts = defaultdict(Counter)
+    for description, bucket_id, count in history:
+        for term in set(terms(description or "")):
+            counts[term][bucket_id] += count
+    rules = {}
+    for term, by_bucket in counts.items():
+        bucket_id, hits = by_bucket.most_common(1)[0]
+        share = hits / sum(by_bucket.values())
+        if hits >= MIN_SUPPORT and share >= MIN_SHARE:
+            # mais exclusivo primeiro; entre iguais, o par de palavras (mais específico) e o mais visto
+            rules[term] = (bucket_id, (share, term.count(" "), hits))
+    return BucketRules(rules)
+
+
+def read_bucket_rules(db: Session, user_id: int) -> BucketRules:
+    """Regras do usuário, em cache até a próxima escrita em movements."""
+    def load():
+        history = db.execute(
+            select(Movement.description, Movement.bucket_id, func.count())
+            .where(Movement.user_id == user_id, Movement.bucket_id.is_not(None))
+            .group_by(Movement.description, Movement.bucket_id)
+        ).all()
+        return learn_rules(history)
+
+    return cache.get_or_load(user_id, "movements", ("bucket_rules",), load)
+
+
+def categorize(ok: pd.DataFrame, rules: BucketRules) -> int:
+    """Preenche bucket_id dos lançamentos sem balde no bloco; devolve quantos foram classificados."""
+    missing = ok["bucket_id"].isna().to_numpy()
+    if not missing.any() or not len(rules):
+        return 0
+    guessed = rules.classify_many(ok["description"][missing])
+    bucket = ok["bucket_id"].to_numpy(dtype=object).copy()
+    bucket[missing] = guessed
+    ok["bucket_id"] = bucket
+    return int(sum(g is not None for g in guessed))
@@ -0,0 +1,35 @@
+"""Importação de extrato CSV (separador ";") em blocos, com memória limitada."""
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from importers.pipeline import ImportFormatError, file_fraction, import_chunks, open_text
+
+CHUNK_ROWS = 50_000
+
+
+def read_csv_chunks(file, chunk_rows: int = CHUNK_ROWS, sep: str = ";"):
+    """DataFrames de até chunk_rows linhas, todas as colunas como texto.
+
+    file é um caminho ou arquivo binário (ex.: UploadedFile do Streamlit); a codificação
+    é detectada por pipeline.open_text.
+    """
+    with open_text(file) as text:
+        try:
+            reader = pd.read_csv(text, sep=sep, dtype=str, keep_default_na=False, chunksize=chunk_rows,
+                                 skipinitialspace=True)
+            for chunk in reader:
+                chunk.columns = [c.strip() for c in chunk.columns]
+                yield chunk
+        except pd.errors.EmptyDataError:
+            raise ImportFormatError("Arquivo CSV vazio.")
+        except pd.errors.ParserError as e:
+            raise ImportFormatError(f"CSV inválido: {e}")
+
+
+def import_csv(db: Session, user_id: int, file, chunk_rows: int = CHUNK_ROWS, buckets=None, **resume):
+    """Importa um extrato CSV; gera um ImportProgress por bloco gravado.
+
+    resume (progress, checkpoint) vai para import_chunks: é como o worker retoma um job.
+    """
+    fraction = file_fraction(file)
+    return import_chunks(db, user_id, read_csv_chunks(file, chunk_rows), buckets, fraction, **resume)
@@ -0,0 +1,52 @@
+"""Deduplicação de lançamentos importados.
+
+Cada lançamento importado ganha um fingerprint de 64 bits sobre (data, valor com sinal
+em centavos, descrição normalizada, balde informado no arquivo) e o número da ocorrência no arquivo: dois
+cafés iguais no mesmo dia continuam dois lançamentos, e reimportar o arquivo (ou outro
+extrato que cubra o mesmo período) gera os mesmos fingerprints. Cada bloco é conferido
+contra movements numa consulta só (services.allocation.existing_fingerprints), pelo
+índice único (user_id, fingerprint).
+"""
+import numpy as np
+import pandas as pd
+
+
+def _descriptions(values: pd.Series) -> np.ndarray:
+    """Descrições sem diferença de caixa nem de espaços, normalizadas uma vez por valor distinto."""
+    codes, uniques = pd.factorize(values)
+    return np.array([" ".join(d.casefold().split()) for d in uniques], dtype=object)[codes]
+
+
+def _hash64(columns: dict) -> np.ndarray:
+    """Hash estável (não muda entre processos, ao contrário de hash()) de cada linha, como int64 do BIGINT."""
+    return pd.util.hash_pandas_object(pd.DataFrame(columns), index=False).to_numpy().view(np.int64)
+
+
+def fingerprints(ok: pd.DataFrame, occurrences: dict) -> np.ndarray:
+    """Fingerprints (int64) de um bloco normalizado (pipeline.normalize_chunk).
+
+    occurrences guarda quantas vezes cada lançamento já apareceu no arquivo e passa de um
+    bloco para o outro; a n-ésima repetição idêntica recebe o fingerprint da chave + n.
+    """
+    cents = ok["cents"].to_numpy(dtype=np.int64)
+    base = _hash64({
+        "date": pd.to_datetime(ok["date"]).to_numpy(dtype="datetime64[D]").astype(np.int64),
+        "cents": np.where(ok["kind"].to_numpy() == "Despesa", -cents, cents),
+        "description": _descriptions(ok["description"]),
+        "bucket": ok["bucket_id"].astype("Int64").fillna(0).to_numpy(dtype=np.int64),
+    })
+
+    # ocorrência de cada linha: repetições dentro do bloco + as dos blocos anteriores
+    seen = pd.Series(base).groupby(base, sort=False).cumcount().to_numpy()
+    keys, counts = np.unique(base, return_counts=True)
+    if occurrences:
+        before = np.fromiter((occurrences.get(k, 0) for k in keys.tolist()), dtype=np.int64, count=len(keys))
+        seen += before[np.searchsorted(keys, base)]
+        counts += before
+    occurrences.update(zip(keys.tolist(), counts.tolist()))
+
+    result = base.copy()
+    repeated = seen > 0
+    if repeated.any():
+        result[repeated] = _hash64({"base": base[repeated], "seen": seen[repeated]})
+    return result
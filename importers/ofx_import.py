@@ -0,0 +1,90 @@
+"""Importação de extrato OFX (SGML 1.x e XML 2.x), lido em blocos sem montar a árvore.
+
+Um tokenizador por regex percorre o texto bloco a bloco e devolve as marcações
+(<TAG>valor), o que atende às duas variantes: no SGML as folhas não fecham, no XML
+fecham e o fechamento é ignorado. Cada <STMTTRN>...</STMTTRN> vira uma tupla (Data,
+Descrição, Valor, Origem) que segue para pipeline.import_chunks como no CSV.
+"""
+import html
+import re
+
+from sqlalchemy.orm import Session
+
+from importers.pipeline import ImportFormatError, chunk_records, file_fraction, import_chunks, open_text
+
+CHUNK_ROWS = 50_000
+READ_CHARS = 1 << 20  # texto lido por vez
+_TAG = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+
+
+def iter_ofx_tokens(text, read_chars: int = READ_CHARS):
+    """(fechamento, TAG, valor) de cada marcação do arquivo, em ordem.
+
+    O trecho depois do último "<" de cada bloco fica para o próximo, para não cortar uma
+    marcação ou um valor ao meio. Cabeçalhos (OFXHEADER:..., <?xml ...?>) não casam.
+    """
+    tail = ""
+    while True:
+        block = text.read(read_chars)
+        if not block:
+            break
+        buffer = tail + block
+        cut = buffer.rfind("<")
+        if cut <= 0:
+            tail = buffer
+            continue
+        for m in _TAG.finditer(buffer, 0, cut):
+            yield m[1] == "/", m[2].upper(), m[3]
+        tail = buffer[cut:]
+    for m in _TAG.finditer(tail):
+        yield m[1] == "/", m[2].upper(), m[3]
+
+
+def _ofx_date(value: str) -> str:
+    """AAAAMMDD[HHMMSS[.XXX]][fuso] -> AAAA-MM-DD (inválida continua inválida para parse_dates)."""
+    return f"{value[:4]}-{value[4:6]}-{value[6:8]}" if len(value) >= 8 else value
+
+
+def iter_ofx_transactions(tokens):
+    """Tuplas (Data, Descrição, Valor, Origem) de cada STMTTRN (conta corrente ou cartão).
+
+    O sinal de TRNAMT decide entre Receita e Despesa (TRNTYPE só repete a informação);
+    a descrição junta NAME e MEMO quando os dois existem.
+    """
+    transaction = None
+    count = 0
+    for closing, tag, value in tokens:
+        if tag == "STMTTRN":
+            if closing and transaction is not None:
+                count += 1
+                name, memo = transaction.get("NAME", ""), transaction.get("MEMO", "")
+                description = f"{name} - {memo}" if name and memo and name != memo else (memo or name)
+                fitid = transaction.get("FITID")
+                yield (_ofx_date(transaction.get("DTPOSTED", "")), description,
+                       transaction.get("TRNAMT", ""), f"FITID {fitid}" if fitid else f"transação {count}")
+            transaction = None if closing else {}
+        elif transaction is not None and not closing:
+            value = value.strip()
+            transaction[tag] = html.unescape(value) if "&" in value else value
+
+
+def read_ofx_transactions(file):
+    """Lançamentos de um arquivo OFX (caminho ou binário), um de cada vez."""
+    seen = False
+    with open_text(file) as text:
+        for transaction in iter_ofx_transactions(iter_ofx_tokens(text)):
+            seen = True
+            yield transaction
+    if not seen:
+        raise ImportFormatError("Nenhuma transação (<STMTTRN>) encontrada no arquivo OFX.")
+
+
+def read_ofx_chunks(file, chunk_rows: int = CHUNK_ROWS):
+    """DataFrames (Data, Descrição, Valor, Origem) de até chunk_rows lançamentos."""
+    return chunk_records(read_ofx_transactions(file), chunk_rows)
+
+
+def import_ofx(db: Session, user_id: int, file, chunk_rows: int = CHUNK_ROWS, buckets=None, **resume):
+    """Importa um extrato OFX; gera um ImportProgress por bloco gravado (resume: ver import_csv)."""
+    fraction = file_fraction(file)
+    return import_chunks(db, user_id, read_ofx_chunks(file, chunk_rows), buckets, fraction, **resume)
@@ -0,0 +1,98 @@
+"""Importação de vários extratos de uma vez: leitura em paralelo, um único gravador.
+
+Ler e validar extratos (CSV, OFX, QIF, PDF) é CPU pura. Cada arquivo é lido e
+normalizado num processo do ProcessPoolExecutor (parse_file) e os blocos voltam para
+o processo que chamou, que grava arquivo por arquivo, na ordem de envio, com
+pipeline.write_chunks: o SQLite continua com um só escritor, e a deduplicação de cada
+arquivo já vê os lançamentos dos anteriores.
+
+Os processos do pool não nascem por fork do processo que chama: parse_files roda na
+thread do worker dentro do servidor do Streamlit (ver processes.MP_CONTEXT).
+Um processo devolve o arquivo inteiro de uma vez, então só vão para o pool arquivos de
+até MAX_TASK_BYTES; os maiores são lidos em streaming pelo próprio gravador, bloco a bloco.
+"""
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+
+from sqlalchemy.orm import Session
+
+from importers.categorize import read_bucket_rules
+from importers.csv_import import read_csv_chunks
+from importers.ofx_import import read_ofx_chunks
+from importers.pdf_import import read_pdf_chunks
+from importers.pipeline import ImportProgress, bucket_lookup, parse_chunks, write_chunks
+from importers.qif_import import read_qif_chunks
+from processes import MP_CONTEXT
+from read_models import read_buckets
+
+READERS = {"csv": read_csv_chunks, "ofx": read_ofx_chunks, "qif": read_qif_chunks, "pdf": read_pdf_chunks}
+MAX_TASK_BYTES = int(os.getenv("IMPORT_TASK_MAX_MB", "16")) * 1024 * 1024
+
+
+def parse_file(fmt: str, path: str, options: dict, skip: int, lookup: dict) -> list:
+    """Blocos normalizados (pipeline.ParsedChunk) de um arquivo inteiro; roda num processo do pool."""
+    return list(parse_chunks(READERS[fmt](path, **options), lookup, skip))
+
+
+def _streamed(fmt: str, path: str, options: dict, skip: int, lookup: dict) -> Future:
+    """Future já resolvido com o gerador de blocos do arquivo: a leitura acontece quando o gravador consome."""
+    future = Future()
+    future.set_result(parse_chunks(READERS[fmt](path, **options), lookup, skip))
+    return future
+
+
+def parse_files(files, lookup: dict, workers: int | None = None, max_task_bytes: int = MAX_TASK_BYTES):
+    """Futures com os blocos de cada (formato, caminho, opções, skip), na ordem dos arquivos.
+
+    No máximo 2 x workers arquivos ficam lidos à frente do gravador, cada um com até
+    max_task_bytes, o que limita a memória quando a gravação é o gargalo. O resultado é
+    uma lista (arquivo lido no pool) ou um gerador (arquivo maior, lido em streaming).
+    """
+    workers = workers or os.cpu_count() or 1
+    files = iter(files)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=MP_CONTEXT) as pool:
+        def submit(spec):
+            try:
+                large = Path(spec[1]).stat().st_size > max_task_bytes
+            except OSError:
+                large = False  # o erro sai no result(), como o de qualquer arquivo do pool
+            if large:
+                return _streamed(*spec, lookup)
+            return pool.submit(parse_file, *spec, lookup)
+
+        pending = deque(submit(f) for _, f in zip(range(2 * workers), files))
+        while pending:
+            future = pending.popleft()
+            following = next(files, None)
+            if following is not None:
+                pending.append(submit(following))
+            yield future
+
+
+def row_fraction(parsed, progress: ImportProgress):
+    """Barra de progresso de um arquivo já lido: linhas gravadas / linhas do arquivo.
+
+    None para arquivo lido em streaming (parsed é um gerador), que não sabe o total.
+    """
+    if not isinstance(parsed, list):
+        return None
+    total = sum(chunk.rows for chunk in parsed) or 1
+    return lambda: min(progress.read / total, 1.0)
+
+
+def import_files(db: Session, user_id: int, files, workers: int | None = None, buckets=None):
+    """Importa vários arquivos (formato, caminho, opções); gera (índice, ImportProgress) por bloco.
+
+    Um arquivo com erro interrompe a importação; os anteriores ficam gravados. A fila
+    (importers/background) usa parse_files direto para isolar o erro de cada job.
+    """
+    lookup = bucket_lookup(buckets if buckets is not None else read_buckets(db, user_id))
+    rules = read_bucket_rules(db, user_id)
+    specs = [(fmt, str(path), options, 0) for fmt, path, options in files]
+    for index, future in enumerate(parse_files(specs, lookup, workers)):
+        parsed = future.result()
+        progress = ImportProgress()
+        for progress in write_chunks(db, user_id, parsed, rules, row_fraction(parsed, progress), progress):
+            yield index, progress
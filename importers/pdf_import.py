@@ -0,0 +1,147 @@
+"""Importação de extrato em PDF, página a página, com layouts de banco plugáveis.
+
+O texto de cada página sai de um gerador (pypdf só interpreta a página quando ela é
+pedida), cada linha passa pelo layout do banco e os lançamentos seguem em blocos para o
+mesmo caminho do CSV (pipeline.import_chunks). pypdf é opcional: sem ele só o PDF fica
+indisponível.
+"""
+import re
+from dataclasses import dataclass
+from datetime import date
+
+from sqlalchemy.orm import Session
+
+from importers.pipeline import ImportFormatError, chunk_records, import_chunks
+
+try:
+    import pypdf
+except ImportError:  # dependência opcional
+    pypdf = None
+
+CHUNK_ROWS = 2_000  # blocos menores que no CSV: o progresso anda a cada poucas páginas
+MONTHS = {"JAN": 1, "FEV": 2, "MAR": 3, "ABR": 4, "MAI": 5, "JUN": 6,
+          "JUL": 7, "AGO": 8, "SET": 9, "OUT": 10, "NOV": 11, "DEZ": 12}
+_FULL_DATE = re.compile(r"\b\d{2}/(\d{2})/(\d{4})\b")
+
+
+@dataclass(frozen=True)
+class BankLayout:
+    """Layout de linha de um extrato.
+
+    line tem os grupos day, month, description e value, e opcionalmente year e sign
+    (D/C ou -/+). detect é procurado na primeira página para escolher o layout. Quando a
+    linha não traz sinal, default_sign vale para todas (ex.: fatura de cartão = "-").
+    """
+    name: str
+    label: str
+    line: re.Pattern
+    detect: re.Pattern | None = None
+    default_sign: str = ""
+
+
+LAYOUTS: dict[str, BankLayout] = {}
+
+
+def register_layout(layout: BankLayout) -> BankLayout:
+    """Adiciona um layout; o último registrado com detect que casar tem preferência."""
+    LAYOUTS[layout.name] = layout
+    return layout
+
+
+register_layout(BankLayout(
+    name="generico",
+    label="Genérico (DD/MM[/AA] descrição valor [D/C])",
+    line=re.compile(r"^(?P<day>\d{2})/(?P<month>\d{2})(?:/(?P<year>\d{2}|\d{4}))?\s+(?P<description>.+?)\s+"
+                    r"(?P<value>[-+]?\s?(?:R\$\s?)?[-+]?[\d.]*\d,\d{2})(?:\s*(?P<sign>[DC+-]))?$"),
+))
+register_layout(BankLayout(
+    name="nubank",
+    label="Nubank (fatura do cartão)",
+    line=re.compile(r"^(?P<day>\d{2}) (?P<month>" + "|".join(MONTHS) + r")\s+(?P<description>.+?)\s+"
+                    r"(?P<value>[-−]?\s?(?:R\$\s?)?[\d.]*\d,\d{2})$", re.IGNORECASE),
+    detect=re.compile(r"nu pagamentos|nubank", re.IGNORECASE),
+    default_sign="-",
+))
+
+
+def detect_layout(first_page: str) -> BankLayout:
+    for layout in reversed(LAYOUTS.values()):
+        if layout.detect is not None and layout.detect.search(first_page):
+            return layout
+    return LAYOUTS["generico"]
+
+
+def iter_pdf_pages(file):
+    """(número da página, total de páginas, texto) de cada página, uma de cada vez."""
+    if pypdf is None:
+        raise ImportFormatError("Leitura de PDF requer o pacote pypdf (pip install pypdf).")
+    try:
+        reader = pypdf.PdfReader(file)
+        total = len(reader.pages)
+    except Exception as e:
+        raise ImportFormatError(f"PDF inválido: {e}")
+    for index, page in enumerate(reader.pages):
+        yield index + 1, total, page.extract_text() or ""
+
+
+def _signed_value(layout: BankLayout, match) -> str:
+    """Valor do lançamento com "-" na frente quando é débito."""
+    value = match["value"].replace("−", "-").replace(" ", "")
+    sign = (match.groupdict().get("sign") or "").upper()
+    negative = "-" in value or sign in ("D", "-")
+    if layout.default_sign == "-" and not sign:
+        negative = not negative  # fatura: compra sem sinal é despesa; valor negativo é pagamento/estorno
+    value = value.replace("-", "").replace("+", "")
+    return f"-{value}" if negative else value
+
+
+def iter_pdf_transactions(pages, layout: BankLayout | None = None):
+    """Lançamentos (tuplas Data, Descrição, Valor, Origem) das páginas, em ordem.
+
+    Linhas sem ano ficam no ano que as põe até a data completa (DD/MM/AAAA) mais recente
+    vista no documento, o fim do período do extrato: com período até 31/01/2024, "05/12"
+    é 2023. Sem data completa, a referência é hoje. Linhas que não casam com o layout
+    (cabeçalhos, saldos) são ignoradas.
+    """
+    today = date.today()
+    end = (today.year, today.month)
+    seen_full_date = False
+    for number, _total, text in pages:
+        if layout is None:
+            layout = detect_layout(text)
+        full_dates = [(int(y), int(m)) for m, y in _FULL_DATE.findall(text) if 1 <= int(m) <= 12]
+        if full_dates:
+            end = max(end, *full_dates) if seen_full_date else max(full_dates)
+            seen_full_date = True
+        for raw in text.splitlines():
+            match = layout.line.match(raw.strip())
+            if match is None:
+                continue
+            month = match["month"]
+            month = int(month) if month.isdigit() else MONTHS[month.upper()]
+            year = match.groupdict().get("year") or str(end[0] if month <= end[1] else end[0] - 1)
+            yield (f"{match['day']}/{month:02d}/{year}", match["description"].strip(),
+                   _signed_value(layout, match), f"p. {number}")
+
+
+def read_pdf_chunks(file, chunk_rows: int = CHUNK_ROWS, layout: str | None = None):
+    """DataFrames (Data, Descrição, Valor, Origem) de até chunk_rows lançamentos."""
+    return chunk_records(iter_pdf_transactions(iter_pdf_pages(file), LAYOUTS[layout] if layout else None), chunk_rows)
+
+
+def import_pdf(db: Session, user_id: int, file, layout: str | None = None,
+               chunk_rows: int = CHUNK_ROWS, buckets=None, **resume):
+    """Importa um extrato PDF; gera um ImportProgress por bloco gravado (fração = páginas lidas).
+
+    resume (progress, checkpoint) vai para import_chunks, como em import_csv.
+    """
+    state = {"page": 0, "total": 0}
+
+    def pages():
+        for number, total, text in iter_pdf_pages(file):
+            state["page"], state["total"] = number, total
+            yield number, total, text
+
+    rows = iter_pdf_transactions(pages(), LAYOUTS[layout] if layout else None)
+    fraction = lambda: state["page"] / state["total"] if state["total"] else 0.0  # noqa: E731
+    return import_chunks(db, user_id, chunk_records(rows, chunk_rows), buckets, fraction, **resume)
@@ -0,0 +1,373 @@
+"""Caminho comum de importação de extratos: normalização vetorizada e gravação em lote.
+
+Os leitores (CSV, PDF, OFX...) entregam DataFrames em blocos com as colunas do extrato
+(Data, Descrição, Valor e, opcionalmente, Tipo e Balde) como texto. Cada bloco é validado
+com operações de coluna do pandas, tem os já importados descartados (importers/dedupe),
+vira linhas de post_movements e é gravado numa transação própria; import_chunks devolve
+um ImportProgress por bloco.
+"""
+import io
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from cache import invalidate
+from importers.categorize import categorize, read_bucket_rules
+from importers.dedupe import fingerprints
+from read_models import read_buckets
+from services.allocation import KIND_BY_TIPO, existing_fingerprints, post_movements
+
+REQUIRED_COLUMNS = ("Data", "Descrição", "Valor")
+OPTIONAL_COLUMNS = ("Tipo", "Balde")
+TRANSACTION_COLUMNS = ("Data", "Descrição", "Valor", "Origem")  # tuplas dos leitores sem cabeçalho próprio
+DESCRIPTION_MAX = 200  # Movement.description
+MAX_ERRORS = 20  # erros guardados para exibição; o total fica em rejected
+
+
+class ImportFormatError(ValueError):
+    """Arquivo sem as colunas mínimas ou num formato que o leitor não entende."""
+
+
+@dataclass
+class ImportProgress:
+    """Situação da importação depois de cada bloco gravado."""
+    chunks: int = 0
+    read: int = 0
+    imported: int = 0
+    rejected: int = 0
+    duplicates: int = 0  # já gravados por uma importação anterior
+    categorized: int = 0  # sem balde no arquivo, classificados pelo histórico
+    fraction: float | None = None  # parte do arquivo já lida, quando o leitor sabe
+    errors: list = field(default_factory=list)  # (linha, motivo), até MAX_ERRORS
+    seconds: float = 0.0
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.read / self.seconds if self.seconds else 0.0
+
+
+@contextmanager
+def open_text(file):
+    """Arquivo (caminho ou binário, ex.: UploadedFile) como texto, sem ler tudo para a memória.
+
+    Aceita UTF-8 (com ou sem BOM) e cai para latin-1, comum nos extratos dos bancos. O
+    arquivo recebido aberto continua aberto (e no fim do que foi lido).
+    """
+    owned = isinstance(file, (str, bytes)) or hasattr(file, "__fspath__")
+    if owned:
+        file = open(file, "rb")
+    start = file.tell()
+    head = file.read(64 * 1024)
+    file.seek(start)
+    try:
+        head.decode("utf-8")
+        encoding = "utf-8-sig"
+    except UnicodeDecodeError as e:
+        # bloco cortado no meio de um caractere multibyte ainda é UTF-8
+        encoding = "utf-8-sig" if e.start >= len(head) - 3 else "latin-1"
+    text = io.TextIOWrapper(file, encoding=encoding, errors="replace", newline="")
+    try:
+        yield text
+    finally:
+        text.detach()
+        if owned:
+            file.close()
+
+
+def file_fraction(file):
+    """Função com a parte já lida de um arquivo binário (para a barra de progresso), ou None."""
+    size = getattr(file, "size", None)  # UploadedFile do Streamlit
+    if size is None and hasattr(file, "seek"):
+        start = file.tell()
+        size = file.seek(0, io.SEEK_END) - start
+        file.seek(start)
+    return (lambda: min(file.tell() / size, 1.0)) if size else None
+
+
+def chunk_records(records, chunk_rows: int):
+    """Agrupa tuplas (Data, Descrição, Valor, Origem) em DataFrames de até chunk_rows linhas."""
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= chunk_rows:
+            yield pd.DataFrame.from_records(batch, columns=TRANSACTION_COLUMNS)
+            batch = []
+    if batch:
+        yield pd.DataFrame.from_records(batch, columns=TRANSACTION_COLUMNS)
+
+
+def bucket_lookup(buckets) -> dict:
+    """Nome do balde (sem caixa/espaços) -> id; aceita também o id e o nome antes de " - "."""
+    lookup, prefixes = {}, {}
+    for b in buckets:
+        lookup[str(b.id)] = b.id
+        lookup[b.name.strip().casefold()] = b.id
+        prefix = b.name.split(" - ")[0].strip().casefold()
+        prefixes.setdefault(prefix, set()).add(b.id)
+    for prefix, ids in prefixes.items():
+        if len(ids) == 1:  # "Moradia" só vale se um único balde começa assim
+            lookup.setdefault(prefix, next(iter(ids)))
+    return lookup
+
+
+VALUE_MAX_CHARS = 32
+
+
+def _code_points(values: pd.Series, width: int) -> tuple[np.ndarray, np.ndarray]:
+    """Matriz linhas x width com os code points de cada texto (0 = vazio) e as linhas longas demais."""
+    text = values.fillna("").astype(str).to_numpy(dtype=object)
+    lengths = np.fromiter(map(len, text), dtype=np.int64, count=len(text))
+    too_long = lengths > width
+    if too_long.any():
+        text = np.where(too_long, "", text)
+    width = int(min(max(lengths.max(initial=1), 1), width))
+    return np.array(text, dtype=f"<U{width}").view(np.uint32).reshape(len(text), width), too_long
+
+
+def parse_brl(values: pd.Series) -> pd.Series:
+    """Valores em reais ("1.234,56", "R$ -10,00", "(5,90)", "12.5") -> centavos (Int64, NA se inválido).
+
+    Sem float: os dígitos viram um inteiro pela matriz de code points e a posição da
+    vírgula (ou de um ponto único seguido de 1-2 dígitos no fim) dá a escala. Fora isso o
+    ponto só vale como separador de milhar: "1.234" é mil duzentos e trinta e quatro
+    reais, como no padrão brasileiro, mas "1.5.0" ou "12.3456" ficam NA, como data inválida.
+    """
+    cp, too_long = _code_points(values, VALUE_MAX_CHARS)
+    n, width = cp.shape
+    digit = (cp >= 48) & (cp <= 57)
+    allowed = digit | np.isin(cp, [0, 32, 160, 36, 40, 41, 43, 44, 45, 46, 82])  # espaços R$ ( ) + , - .
+    negative = ((cp == 45) | (cp == 40)).any(axis=1)
+
+    cols = np.arange(width)
+    comma = np.where(cp == 44, cols, -1).max(axis=1)
+    dot = np.where(cp == 46, cols, -1).max(axis=1)
+    after_comma = (digit & (cols > comma[:, None])).sum(axis=1)
+    after_dot = (digit & (cols > dot[:, None])).sum(axis=1)
+    has_comma = comma >= 0
+    n_dots = (cp == 46).sum(axis=1)
+    dot_decimal = ~has_comma & (n_dots == 1) & (after_dot >= 1) & (after_dot <= 2)
+
+    # dígitos por grupo entre separadores (grupo 0 antes do primeiro . ou ,); como milhar,
+    # o primeiro grupo tem 1-3 dígitos e cada grupo depois de um ponto exatamente 3
+    group = ((cp == 44) | (cp == 46)).cumsum(axis=1, dtype=np.int8)
+    first = (digit & (group == 0)).sum(axis=1)
+    thousands = (first >= 1) & (first <= 3)
+    for k in range(1, int(n_dots.max(initial=0)) + 1):
+        thousands &= (n_dots < k) | ((digit & (group == k)).sum(axis=1) == 3)
+    decimals = np.where(has_comma, after_comma, np.where(dot_decimal, after_dot, 0))
+
+    n_digits = digit.sum(axis=1)
+    right = digit[:, ::-1].cumsum(axis=1)[:, ::-1] - digit  # dígitos à direita de cada posição
+    weights = np.where(digit, 10 ** np.minimum(right, 18), 0)
+    number = (weights * np.where(digit, cp - 48, 0)).sum(axis=1)
+    cents = number * 10 ** np.clip(2 - decimals, 0, 2)
+
+    valid = (allowed.all(axis=1) & (n_digits > 0) & (n_digits <= 15) & (decimals <= 2) & ~too_long
+             & ~(has_comma & (dot > comma)) & ((cp == 44).sum(axis=1) <= 1)
+             & ((n_dots == 0) | dot_decimal | thousands))
+    result = pd.array(np.where(negative, -cents, cents), dtype="Int64")
+    result[~valid] = pd.NA
+    return pd.Series(result, index=values.index)
+
+
+def _per_unique(values: pd.Series, parse) -> pd.Series:
+    """Aplica parse só aos valores distintos (datas, tipos e baldes se repetem muito num extrato)."""
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    parsed = parse(pd.Series(uniques, dtype=object))
+    return pd.Series(parsed.to_numpy()[codes], index=values.index, dtype=parsed.dtype)
+
+
+def _parse_dates_unique(s: pd.Series) -> pd.Series:
+    s = s.astype("string").str.strip()
+    parsed = pd.to_datetime(s, format="%d/%m/%y", errors="coerce")
+    for fmt in ("%d/%m/%Y", "%Y-%m-%d"):
+        missing = parsed.isna()
+        if not missing.any():
+            break
+        parsed[missing] = pd.to_datetime(s[missing], format=fmt, errors="coerce")
+    return parsed
+
+
+def parse_dates(values: pd.Series) -> pd.Series:
+    """DD/MM/AA, DD/MM/AAAA ou AAAA-MM-DD -> datetime64 (NaT se inválida)."""
+    return _per_unique(values, _parse_dates_unique)
+
+
+def _kind_of(tipo: str):
+    """Tipo do extrato -> kind; "" = vazio (decide pelo sinal), None = inválido."""
+    tipo = tipo.strip().capitalize()
+    return KIND_BY_TIPO.get(tipo) if tipo else ""
+
+
+def _bucket_of(name: str, lookup: dict) -> int:
+    """Nome/id do balde -> id; 0 = sem balde, -1 = desconhecido."""
+    name = name.strip().casefold()
+    return lookup.get(name, -1) if name else 0
+
+
+def normalize_chunk(df: pd.DataFrame, lookup: dict, first_line: int = 2):
+    """Valida e converte um bloco do extrato.
+
+    Devolve (ok, erros): ok tem date, description, kind, cents (positivo), bucket_id (ou
+    None = sem balde) e line; erros é uma lista (linha, motivo). Sem coluna Tipo, o sinal
+    do valor decide entre Receita e Despesa.
+    """
+    missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+    if missing:
+        raise ImportFormatError("O extrato deve conter as colunas: " + ", ".join(REQUIRED_COLUMNS)
+                                + (" (opcionais: " + ", ".join(OPTIONAL_COLUMNS) + ")"))
+    n = len(df)
+    line = np.arange(first_line, first_line + n)
+    # leitores sem linhas de arquivo (PDF) informam a origem de cada lançamento (ex.: "p. 3")
+    where = df["Origem"].to_numpy(dtype=object) if "Origem" in df.columns else line
+    dates = parse_dates(df["Data"])
+    cents = parse_brl(df["Valor"])
+
+    sign_kind = pd.Series(np.where(cents.fillna(0).to_numpy() < 0, "Despesa", "Receita"), index=df.index)
+    if "Tipo" in df.columns:
+        kind = _per_unique(df["Tipo"], lambda u: u.fillna("").map(_kind_of))
+        bad_kind = kind.isna()
+        kind = kind.where(kind.fillna("") != "", sign_kind)
+    else:
+        bad_kind = pd.Series(False, index=df.index)
+        kind = sign_kind
+
+    if "Balde" in df.columns:
+        bucket = _per_unique(df["Balde"], lambda u: u.fillna("").map(lambda name: _bucket_of(name, lookup)))
+        bad_bucket = bucket == -1
+        bucket = bucket.where(bucket > 0)
+    else:
+        bucket = pd.Series(np.nan, index=df.index)
+        bad_bucket = pd.Series(False, index=df.index)
+
+    description = _per_unique(df["Descrição"], lambda u: u.fillna("").str.strip().str.slice(0, DESCRIPTION_MAX))
+
+    reasons = [
+        (dates.isna().to_numpy(), "data inválida (use DD/MM/AA)"),
+        ((cents.isna() | (cents == 0)).to_numpy(dtype=bool), "valor inválido"),
+        (bad_kind.to_numpy(dtype=bool), "tipo inválido (Receita/Despesa)"),
+        (bad_bucket.to_numpy(dtype=bool), "balde desconhecido"),
+    ]
+    invalid = np.zeros(n, dtype=bool)
+    found = []  # (posição no bloco, motivo)
+    for mask, reason in reasons:
+        new = mask & ~invalid  # um motivo por linha, o primeiro que falhar
+        found.extend((int(i), reason) for i in np.flatnonzero(new))
+        invalid |= mask
+    found.sort()
+    errors = [(where[i] if isinstance(where[i], str) else int(where[i]), reason) for i, reason in found]
+
+    valid = ~invalid
+    ok = pd.DataFrame({
+        "date": dates[valid].dt.date.to_numpy(),
+        "description": description[valid].to_numpy(dtype=object),
+        "kind": kind[valid].to_numpy(dtype=object),
+        "cents": cents[valid].abs().to_numpy(dtype=np.int64),
+        "bucket_id": bucket[valid].astype(object).where(bucket[valid].notna(), None).to_numpy(),
+        "line": line[valid],
+    })
+    return ok, errors
+
+
+def movement_rows(ok: pd.DataFrame):
+    """Linhas de post_movements (bucket_id, kind, centavos, descrição, data, fingerprint) de um bloco."""
+    bucket_ids = [None if b is None else int(b) for b in ok["bucket_id"].tolist()]
+    return zip(bucket_ids, ok["kind"].tolist(), ok["cents"].tolist(),
+               ok["description"].tolist(), ok["date"].tolist(), ok["fingerprint"].tolist())
+
+
+@dataclass
+class ParsedChunk:
+    """Bloco normalizado (normalize_chunk) e quantas linhas do arquivo ele cobre."""
+    ok: pd.DataFrame
+    errors: list
+    rows: int
+    replay: bool = False  # gravado antes do checkpoint: só refaz a contagem de repetições
+
+
+def parse_chunks(chunks, lookup: dict, skip: int = 0):
+    """Normaliza os blocos de um leitor, em ordem; as skip primeiras linhas saem com replay=True.
+
+    É a parte de CPU da importação, sem banco: roda também em outro processo
+    (importers/parallel.py).
+    """
+    position = 0  # linhas do arquivo já vistas
+    for df in chunks:
+        head = min(max(skip - position, 0), len(df))
+        if head:
+            done, _ = normalize_chunk(df.iloc[:head], lookup, first_line=position + 2)
+            yield ParsedChunk(done, [], head, replay=True)
+            position += head
+            df = df.iloc[head:]
+            if not len(df):
+                continue
+        ok, errors = normalize_chunk(df, lookup, first_line=position + 2)  # linha 1 é o cabeçalho
+        position += len(df)
+        yield ParsedChunk(ok, errors, len(df))
+
+
+def write_chunks(db: Session, user_id: int, parsed, rules, fraction=None, progress=None, checkpoint=None):
+    """Grava os blocos normalizados de um arquivo, um commit por bloco; gera um ImportProgress por bloco.
+
+    Lançamentos já importados antes (mesmo fingerprint) são pulados e contados em
+    duplicates; os sem balde são classificados por rules (importers/categorize).
+    checkpoint(db, progress) roda dentro da transação de cada bloco, antes do commit.
+    """
+    progress = progress or ImportProgress()
+    elapsed = progress.seconds
+    occurrences = {}  # repetições de cada lançamento no arquivo (dedupe.fingerprints)
+    t0 = time.perf_counter()
+    for chunk in parsed:
+        if chunk.replay:
+            fingerprints(chunk.ok, occurrences)
+            continue
+        ok, errors = chunk.ok, chunk.errors
+        valid = len(ok)
+        ok["fingerprint"] = fingerprints(ok, occurrences)
+        try:
+            known = existing_fingerprints(db, user_id, ok["fingerprint"])
+            if known:
+                ok = ok[~ok["fingerprint"].isin(known)].copy()
+            # depois do fingerprint, que usa só o balde do arquivo: regras novas não desfazem a deduplicação
+            categorized = categorize(ok, rules)
+            if len(ok):
+                post_movements(db, user_id, movement_rows(ok))
+
+            progress.chunks += 1
+            progress.read += chunk.rows
+            progress.imported += len(ok)
+            progress.duplicates += valid - len(ok)
+            progress.categorized += categorized
+            progress.rejected += len(errors)
+            progress.errors.extend(errors[:MAX_ERRORS - len(progress.errors)])
+            progress.fraction = fraction() if fraction else None
+            progress.seconds = elapsed + time.perf_counter() - t0
+            if checkpoint is not None:
+                checkpoint(db, progress)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        if len(ok):
+            invalidate(user_id, "movements", "buckets")
+        yield progress
+
+
+def import_chunks(db: Session, user_id: int, chunks, buckets=None, fraction=None, progress=None, checkpoint=None):
+    """Normaliza e grava os blocos de um leitor; gera um ImportProgress por bloco gravado.
+
+    chunks: iterável de DataFrames (linhas do arquivo em ordem). fraction (opcional) é uma
+    função sem argumentos com a parte do arquivo já lida, para a barra de progresso. Um
+    bloco com erro de banco é desfeito e interrompe a importação; os anteriores ficam.
+
+    Retomada (importers/background): progress é o ImportProgress do último bloco gravado;
+    as progress.read primeiras linhas só refazem a contagem de repetições do fingerprint.
+    """
+    lookup = bucket_lookup(buckets if buckets is not None else read_buckets(db, user_id))
+    skip = progress.read if progress is not None else 0
+    return write_chunks(db, user_id, parse_chunks(chunks, lookup, skip), read_bucket_rules(db, user_id),
+                        fraction, progress, checkpoint)
@@ -0,0 +1,89 @@
+"""Importação de extrato QIF (Quicken), lido linha a linha.
+
+Cada registro é uma sequência de linhas "código + valor" terminada por "^": D data,
+T (ou U) valor, P favorecido, M memorando. Registros sem data e valor (blocos !Account,
+!Option) são ignorados. As tuplas (Data, Descrição, Valor, Origem) seguem para
+pipeline.import_chunks como no CSV.
+"""
+import re
+
+from sqlalchemy.orm import Session
+
+from importers.pipeline import ImportFormatError, chunk_records, file_fraction, import_chunks, open_text
+
+CHUNK_ROWS = 50_000
+_US_THOUSANDS = re.compile(r"[-+]?\d{1,3}(,\d{3})+")
+
+
+def _qif_date(value: str, day_first: bool) -> str:
+    """"05/01/2024", "5/1'24", "2024-01-05" -> DD/MM/AA(AA) ou AAAA-MM-DD para parse_dates."""
+    parts = value.replace("'", "/").replace(" ", "").replace("-", "/").split("/")
+    if len(parts) != 3:
+        return value
+    if len(parts[0]) == 4:
+        return "-".join(parts)
+    day, month, year = parts if day_first else (parts[1], parts[0], parts[2])
+    return f"{day:0>2}/{month:0>2}/{year:0>2}"
+
+
+def _qif_amount(value: str, day_first: bool = True) -> str:
+    """"-1,234.56" (padrão do Quicken) -> "-1234.56"; "1.234,56" passa como está.
+
+    Na exportação americana (day_first=False) vírgula seguida de 3 dígitos sem centavos
+    também é milhar: "1,234" -> "1234".
+    """
+    if "," in value and "." in value and value.rfind(".") > value.rfind(","):
+        return value.replace(",", "")
+    if not day_first and _US_THOUSANDS.fullmatch(value.strip()):
+        return value.replace(",", "")
+    return value
+
+
+def iter_qif_transactions(lines, day_first: bool = True):
+    """Tuplas (Data, Descrição, Valor, linha do registro) de cada registro com data e valor.
+
+    day_first=False lê datas e valores no padrão americano do Quicken (MM/DD, "1,234").
+    """
+    record, start = {}, 1
+    for number, raw in enumerate(lines, 1):
+        line = raw.strip()
+        if not line:
+            continue
+        code, value = line[0], line[1:].strip()
+        if not record:
+            start = number
+        if code == "^":
+            if "D" in record and "T" in record:
+                payee, memo = record.get("P", ""), record.get("M", "")
+                description = f"{payee} - {memo}" if payee and memo and payee != memo else (memo or payee)
+                yield _qif_date(record["D"], day_first), description, _qif_amount(record["T"], day_first), start
+            record = {}
+        elif code == "!":
+            record = {}  # !Type:Bank, !Account, !Option:...
+        elif code in "DPM":
+            record.setdefault(code, value)
+        elif code in "TU":
+            record.setdefault("T", value)
+
+
+def read_qif_transactions(file, day_first: bool = True):
+    """Lançamentos de um arquivo QIF (caminho ou binário), um de cada vez."""
+    seen = False
+    with open_text(file) as text:
+        for transaction in iter_qif_transactions(text, day_first):
+            seen = True
+            yield transaction
+    if not seen:
+        raise ImportFormatError("Nenhum lançamento (registros D/T terminados por ^) encontrado no arquivo QIF.")
+
+
+def read_qif_chunks(file, chunk_rows: int = CHUNK_ROWS, day_first: bool = True):
+    """DataFrames (Data, Descrição, Valor, Origem) de até chunk_rows lançamentos."""
+    return chunk_records(read_qif_transactions(file, day_first), chunk_rows)
+
+
+def import_qif(db: Session, user_id: int, file, day_first: bool = True, chunk_rows: int = CHUNK_ROWS,
+               buckets=None, **resume):
+    """Importa um extrato QIF; gera um ImportProgress por bloco gravado (resume: ver import_csv)."""
+    fraction = file_fraction(file)
+    return import_chunks(db, user_id, read_qif_chunks(file, chunk_rows, day_first), buckets, fraction, **resume)
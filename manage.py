@@ -0,0 +1,137 @@
+"""Comandos de manutenção do APP DAVI.
+
+    python manage.py migrate
+    python manage.py rebuild-rollups [--user ID]
+    python manage.py allocate-daily [--workers N] [--batch-size N] [--aggregate] [--loop]
+    python manage.py import-worker [--once]
+    python manage.py export-csv --user ID [--output livro_caixa.csv]
+    python manage.py export-archive --user ID --output conta.zip
+    python manage.py export-excel --user ID --output conta.xlsx
+"""
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+
+from db import SessionLocal, get_session
+from migrations import run_migrations
+
+
+def cmd_migrate(args):
+    """Aplica as migrações pendentes."""
+    print(f"schema na versão {run_migrations()}")
+
+
+def cmd_rebuild_rollups(args):
+    """Recalcula o rollup mensal de movements (todos os usuários ou um só)."""
+    from services.rollups import rebuild_movement_monthly
+
+    run_migrations()
+    with get_session() as db:
+        rows = rebuild_movement_monthly(db, args.user)
+    alvo = f"usuário {args.user}" if args.user is not None else "todos os usuários"
+    print(f"movement_monthly recalculado para {alvo}: {rows} linhas")
+
+
+def cmd_allocate_daily(args):
+    """Receita diária de todos os usuários (uma vez, ou todo dia com --loop)."""
+    from services.allocation import run_daily_allocation
+
+    run_migrations()
+    while True:
+        stats = run_daily_allocation(SessionLocal, workers=args.workers,
+                                     batch_size=args.batch_size, aggregate=args.aggregate)
+        print(f"{datetime.now():%d/%m/%Y %H:%M:%S} {stats['users']} usuários, {stats['movements']} movimentos, "
+              f"{stats['failed']} falhas em {stats['seconds']:.2f}s ({stats['users_per_sec']:.0f} usuários/s)",
+              flush=True)
+        if not args.loop:
+            break
+        # dorme até logo depois da próxima meia-noite
+        now = datetime.now()
+        next_run = datetime.combine(now.date() + timedelta(days=1), datetime.min.time()) + timedelta(minutes=1)
+        time.sleep((next_run - now).total_seconds())
+
+
+def cmd_import_worker(args):
+    """Processa a fila de importações de extrato (e retoma as interrompidas)."""
+    from importers.background import work
+
+    run_migrations()
+    processed = work(SessionLocal, once=args.once)
+    print(f"{processed} importações processadas")
+
+
+def cmd_export_csv(args):
+    """Livro Caixa de um usuário em CSV, gravado em streaming (memória constante)."""
+    from exports import ledger_csv
+
+    with get_session(readonly=True) as db:
+        out = open(args.output, "wb") if args.output else sys.stdout.buffer
+        try:
+            for part in ledger_csv(db, args.user):
+                out.write(part)
+        finally:
+            if args.output:
+                out.close()
+
+
+def cmd_export_archive(args):
+    """Arquivo .zip com todas as tabelas da conta (CSV e, com pyarrow, Parquet), em streaming."""
+    from exports import account_archive
+
+    with get_session(readonly=True) as db, open(args.output, "wb") as out:
+        for part in account_archive(db, args.user):
+            out.write(part)
+
+
+def cmd_export_excel(args):
+    """Planilha .xlsx com uma aba por tabela (requer openpyxl)."""
+    from exports import write_excel
+
+    with get_session(readonly=True) as db:
+        write_excel(db, args.user, args.output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("migrate", help="aplica as migrações pendentes")
+    p.set_defaults(func=cmd_migrate)
+
+    p = sub.add_parser("rebuild-rollups", help="recalcula movement_monthly a partir de movements")
+    p.add_argument("--user", type=int, default=None, help="só este usuário")
+    p.set_defaults(func=cmd_rebuild_rollups)
+
+    p = sub.add_parser("allocate-daily", help="lança a receita diária de todos os usuários")
+    p.add_argument("--workers", type=int, default=4, help="threads processando lotes (limitado ao pool do escritor: 1 no SQLite)")
+    p.add_argument("--batch-size", type=int, default=500, help="usuários por lote/transação")
+    p.add_argument("--aggregate", action="store_true", help="uma linha por balde para o período atrasado")
+    p.add_argument("--loop", action="store_true", help="fica rodando e repete todo dia após a meia-noite")
+    p.set_defaults(func=cmd_allocate_daily)
+
+    p = sub.add_parser("import-worker", help="worker da fila de importações de extrato")
+    p.add_argument("--once", action="store_true", help="para quando a fila esvaziar")
+    p.set_defaults(func=cmd_import_worker)
+
+    p = sub.add_parser("export-csv", help="exporta o Livro Caixa de um usuário em CSV")
+    p.add_argument("--user", type=int, required=True)
+    p.add_argument("--output", default=None, help="arquivo de saída (padrão: stdout)")
+    p.set_defaults(func=cmd_export_csv)
+
+    p = sub.add_parser("export-archive", help="exporta a conta inteira de um usuário em .zip")
+    p.add_argument("--user", type=int, required=True)
+    p.add_argument("--output", required=True)
+    p.set_defaults(func=cmd_export_archive)
+
+    p = sub.add_parser("export-excel", help="exporta a conta de um usuário em planilha .xlsx")
+    p.add_argument("--user", type=int, required=True)
+    p.add_argument("--output", required=True)
+    p.set_defaults(func=cmd_export_excel)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
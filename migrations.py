@@ -0,0 +1,286 @@
+"""Migrações versionadas do banco.
+
+Substitui o antigo init_db() do app.py, que rodava inspect()/ALTER TABLE a cada rerun
+do Streamlit. Aqui as migrações rodam uma única vez por processo e a versão aplicada
+fica registrada na tabela schema_version.
+"""
+import threading
+from datetime import datetime
+
+from sqlalchemy import Integer, MetaData, inspect, text
+from sqlalchemy.schema import CreateTable
+
+from db import engine, Base
+from money import Money
+import models  # noqa: F401  (registra as tabelas no metadata)
+
+_lock = threading.Lock()
+_done = False
+
+
+def _m001_legacy_columns(conn):
+    """Colunas adicionadas depois da criação dos primeiros bancos."""
+    inspector = inspect(conn)
+    giants_cols = {c["name"] for c in inspector.get_columns("giants")}
+    for col in ("weekly_goal", "interest_rate", "payoff_efficiency"):
+        if col not in giants_cols:
+            conn.execute(text(f"ALTER TABLE giants ADD COLUMN {col} FLOAT DEFAULT 0.0"))
+
+    profile_cols = {c["name"] for c in inspector.get_columns("user_profiles")}
+    if "last_allocation_date" not in profile_cols:
+        conn.execute(text("ALTER TABLE user_profiles ADD COLUMN last_allocation_date DATE"))
+
+
+def _m002_hot_indexes(conn):
+    """Índices compostos nas colunas usadas pelos filtros/ordenações das telas."""
+    hot = {"ix_movements_user_date", "ix_giant_payments_giant_date", "ix_bills_user_due", "ix_buckets_user"}
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            if index.name in hot:
+                index.create(conn, checkfirst=True)
+
+
+def _rebuild_sqlite_table(conn, table, select_exprs):
+    """Recria uma tabela do SQLite a partir do modelo (SQLite não tem ALTER COLUMN TYPE).
+
+    select_exprs mapeia coluna -> expressão SQL usada para copiar os dados antigos.
+    Exige foreign_keys=OFF (ver run_migrations), senão o DROP dispararia as cascatas.
+    """
+    scratch = MetaData()
+    for t in Base.metadata.sorted_tables:
+        t.to_metadata(scratch)
+    tmp_name = f"{table.name}__new"
+    tmp = table.to_metadata(scratch, name=tmp_name)
+    conn.execute(CreateTable(tmp))
+    cols = ", ".join(select_exprs)
+    conn.execute(text(
+        f"INSERT INTO {tmp_name} ({cols}) SELECT {', '.join(select_exprs.values())} FROM {table.name}"
+    ))
+    conn.execute(text(f"DROP TABLE {table.name}"))
+    conn.execute(text(f"ALTER TABLE {tmp_name} RENAME TO {table.name}"))
+    for index in table.indexes:
+        index.create(conn, checkfirst=True)
+
+
+def _m003_money_cents(conn):
+    """Colunas Money (Float em reais -> BIGINT em centavos) com conversão dos dados."""
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        money_cols = [c.name for c in table.columns if isinstance(c.type, Money)]
+        if not money_cols:
+            continue
+        existing = {c["name"]: c["type"] for c in inspector.get_columns(table.name)}
+        pending = [c for c in money_cols if c in existing and not isinstance(existing[c], Integer)]
+        if not pending:
+            continue  # banco novo, criado já com centavos
+        if conn.dialect.name == "sqlite":
+            exprs = {
+                c.name: (f"CAST(ROUND({c.name} * 100) AS INTEGER)" if c.name in pending else c.name)
+                for c in table.columns if c.name in existing
+            }
+            _rebuild_sqlite_table(conn, table, exprs)
+        else:
+            for col in pending:
+                conn.execute(text(
+                    f"ALTER TABLE {table.name} ALTER COLUMN {col} TYPE BIGINT USING ROUND({col} * 100)"
+                ))
+    if conn.dialect.name == "sqlite":
+        broken = conn.execute(text("PRAGMA foreign_key_check")).fetchall()
+        if broken:
+            raise RuntimeError(f"Chaves estrangeiras inválidas após migrar centavos: {broken[:5]}")
+
+
+def _require_sqlite(conn, what: str) -> None:
+    """Migrações com DDL só do SQLite (CREATE TRIGGER ... BEGIN/END, upsert, substr em datas).
+
+    Em outro backend param com um erro claro em vez de um erro de sintaxe no meio da
+    transação; portar exige reescrever os triggers no dialeto do banco.
+    """
+    if conn.dialect.name != "sqlite":
+        raise RuntimeError(
+            f"{what} usa triggers do SQLite e não tem equivalente para {conn.dialect.name}; "
+            "rode o app com SQLite (DATABASE_URL=sqlite:///...) ou porte os triggers para o backend."
+        )
+
+
+# Triggers (SQLite) que mantêm giant_stats na mesma transação de cada insert/update/delete em
+# giant_payments, inclusive deletes em massa via Query.delete() e SQL cru.
+GIANT_STATS_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_giant_payments_ai AFTER INSERT ON giant_payments BEGIN
+        INSERT INTO giant_stats (giant_id, user_id, total_paid, payment_count, last_payment_date)
+        VALUES (NEW.giant_id, NEW.user_id, NEW.amount, 1, NEW.date)
+        ON CONFLICT(giant_id) DO UPDATE SET
+            total_paid = total_paid + excluded.total_paid,
+            payment_count = payment_count + 1,
+            last_payment_date = MAX(COALESCE(last_payment_date, excluded.last_payment_date),
+                                    excluded.last_payment_date);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_giant_payments_ad AFTER DELETE ON giant_payments BEGIN
+        UPDATE giant_stats SET
+            total_paid = total_paid - OLD.amount,
+            payment_count = payment_count - 1,
+            last_payment_date = (SELECT MAX(date) FROM giant_payments WHERE giant_id = OLD.giant_id)
+        WHERE giant_id = OLD.giant_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_giant_payments_au
+    AFTER UPDATE OF amount, date, giant_id ON giant_payments BEGIN
+        UPDATE giant_stats SET
+            total_paid = total_paid - OLD.amount,
+            payment_count = payment_count - 1,
+            last_payment_date = (SELECT MAX(date) FROM giant_payments WHERE giant_id = OLD.giant_id)
+        WHERE giant_id = OLD.giant_id;
+        INSERT INTO giant_stats (giant_id, user_id, total_paid, payment_count, last_payment_date)
+        VALUES (NEW.giant_id, NEW.user_id, NEW.amount, 1, NEW.date)
+        ON CONFLICT(giant_id) DO UPDATE SET
+            total_paid = total_paid + excluded.total_paid,
+            payment_count = payment_count + 1,
+            last_payment_date = (SELECT MAX(date) FROM giant_payments WHERE giant_id = NEW.giant_id);
+    END
+    """,
+]
+
+
+def _m004_giant_stats(conn):
+    """Projeção giant_stats: triggers de manutenção + carga inicial a partir dos aportes."""
+    _require_sqlite(conn, "A projeção giant_stats (migração 4)")
+    for ddl in GIANT_STATS_TRIGGERS:
+        conn.execute(text(ddl))
+    conn.execute(text("DELETE FROM giant_stats"))
+    conn.execute(text(
+        "INSERT INTO giant_stats (giant_id, user_id, total_paid, payment_count, last_payment_date) "
+        "SELECT giant_id, MIN(user_id), SUM(amount), COUNT(*), MAX(date) "
+        "FROM giant_payments GROUP BY giant_id"
+    ))
+
+
+# Triggers (SQLite) que mantêm movement_monthly em todo insert/update/delete em movements
+MOVEMENT_MONTHLY_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_movements_monthly_ai AFTER INSERT ON movements BEGIN
+        INSERT INTO movement_monthly (user_id, month, bucket_id, kind, total, count)
+        VALUES (NEW.user_id, substr(NEW.date, 1, 7), COALESCE(NEW.bucket_id, 0), NEW.kind, NEW.amount, 1)
+        ON CONFLICT(user_id, month, bucket_id, kind) DO UPDATE SET
+            total = total + excluded.total,
+            count = count + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_movements_monthly_ad AFTER DELETE ON movements BEGIN
+        UPDATE movement_monthly SET total = total - OLD.amount, count = count - 1
+        WHERE user_id = OLD.user_id AND month = substr(OLD.date, 1, 7)
+          AND bucket_id = COALESCE(OLD.bucket_id, 0) AND kind = OLD.kind;
+        DELETE FROM movement_monthly
+        WHERE user_id = OLD.user_id AND month = substr(OLD.date, 1, 7)
+          AND bucket_id = COALESCE(OLD.bucket_id, 0) AND kind = OLD.kind AND count <= 0;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_movements_monthly_au
+    AFTER UPDATE OF user_id, bucket_id, kind, amount, date ON movements BEGIN
+        UPDATE movement_monthly SET total = total - OLD.amount, count = count - 1
+        WHERE user_id = OLD.user_id AND month = substr(OLD.date, 1, 7)
+          AND bucket_id = COALESCE(OLD.bucket_id, 0) AND kind = OLD.kind;
+        DELETE FROM movement_monthly
+        WHERE user_id = OLD.user_id AND month = substr(OLD.date, 1, 7)
+          AND bucket_id = COALESCE(OLD.bucket_id, 0) AND kind = OLD.kind AND count <= 0;
+        INSERT INTO movement_monthly (user_id, month, bucket_id, kind, total, count)
+        VALUES (NEW.user_id, substr(NEW.date, 1, 7), COALESCE(NEW.bucket_id, 0), NEW.kind, NEW.amount, 1)
+        ON CONFLICT(user_id, month, bucket_id, kind) DO UPDATE SET
+            total = total + excluded.total,
+            count = count + 1;
+    END
+    """,
+]
+
+
+def _m005_movement_monthly(conn):
+    """Rollup mensal de movements: triggers de manutenção + carga inicial."""
+    from services.rollups import rebuild_movement_monthly
+
+    _require_sqlite(conn, "O rollup movement_monthly (migração 5)")
+    for ddl in MOVEMENT_MONTHLY_TRIGGERS:
+        conn.execute(text(ddl))
+    rebuild_movement_monthly(conn)
+
+
+def _m006_payments_user_index(conn):
+    """Índice para carregar todos os aportes de um usuário numa consulta (read_payment_index)."""
+    for index in models.GiantPayment.__table__.indexes:
+        if index.name == "ix_giant_payments_user_giant_date":
+            index.create(conn, checkfirst=True)
+
+
+def _m007_movement_fingerprint(conn):
+    """Coluna fingerprint em movements e índice único (user_id, fingerprint) da deduplicação."""
+    if "fingerprint" not in {c["name"] for c in inspect(conn).get_columns("movements")}:
+        conn.execute(text("ALTER TABLE movements ADD COLUMN fingerprint BIGINT"))
+    for index in models.Movement.__table__.indexes:
+        if index.name == "ux_movements_user_fingerprint":
+            index.create(conn, checkfirst=True)
+
+
+def _m008_import_jobs(conn):
+    """Fila de importações (import_jobs) com checkpoint por bloco."""
+    models.ImportJob.__table__.create(conn, checkfirst=True)
+
+
+# (versão, descrição, função) — nunca reordenar nem editar migrações já publicadas
+MIGRATIONS = [
+    (1, "colunas weekly_goal/interest_rate/payoff_efficiency e last_allocation_date", _m001_legacy_columns),
+    (2, "índices compostos movements/giant_payments/bills/buckets", _m002_hot_indexes),
+    (3, "valores monetários em centavos inteiros (Money)", _m003_money_cents),
+    (4, "projeção giant_stats mantida por triggers", _m004_giant_stats),
+    (5, "rollup mensal movement_monthly mantido por triggers", _m005_movement_monthly),
+    (6, "índice giant_payments (user_id, giant_id, date)", _m006_payments_user_index),
+    (7, "fingerprint de lançamentos importados com índice único por usuário", _m007_movement_fingerprint),
+    (8, "fila de importações import_jobs", _m008_import_jobs),
+]
+
+
+def current_version(conn) -> int:
+    """Versão de schema registrada no banco (0 se nunca migrado)."""
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_version ("
+        " version INTEGER PRIMARY KEY, description VARCHAR(200), applied_at TIMESTAMP)"
+    ))
+    return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_version")).scalar()
+
+
+def run_migrations(bind=None, force: bool = False) -> int:
+    """Aplica as migrações pendentes (uma vez por processo) e devolve a versão final."""
+    global _done
+    bind = bind or engine
+    with _lock:
+        if _done and not force:
+            return MIGRATIONS[-1][0]
+        Base.metadata.create_all(bind=bind)  # só cria tabelas que ainda não existem
+        sqlite = bind.dialect.name == "sqlite"
+        with bind.connect() as conn:
+            if sqlite:
+                # recriar tabelas exige FKs desligadas (e o pragma não vale dentro de transação)
+                conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+                conn.commit()
+            try:
+                with conn.begin():
+                    version = current_version(conn)
+                    for number, description, migrate in MIGRATIONS:
+                        if number <= version:
+                            continue
+                        migrate(conn)
+                        conn.execute(
+                            text("INSERT INTO schema_version (version, description, applied_at) VALUES (:v, :d, :t)"),
+                            {"v": number, "d": description, "t": datetime.now()},
+                        )
+                        version = number
+            finally:
+                if sqlite:
+                    conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+                    conn.commit()
+        if bind is engine:
+            _done = True
+        return version
@@ -1,6 +1,7 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Float, Date, Text
+from sqlalchemy import BigInteger, Boolean, Column, ForeignKey, Index, Integer, String, Float, Date, DateTime, Text
 from sqlalchemy.orm import relationship
 from db import Base
+from money import Money
 
 class User(Base):
     __tablename__ = "users"
@@ -29,13 +30,16 @@ class UserProfile(Base):
 
 class Bucket(Base):
     __tablename__ = "buckets"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        Index("ix_buckets_user", "user_id"),
+        {'extend_existing': True},
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     name = Column(String(50), nullable=False)
     description = Column(String(200), default="")
     percent = Column(Float, nullable=False)
-    balance = Column(Float, default=0.0)
+    balance = Column(Money, default=0.0)
     type = Column(String(20), default="generic")
 
     user = relationship("User", back_populates="buckets")
@@ -47,7 +51,7 @@ class Giant(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     name = Column(String(50), nullable=False)
-    total_to_pay = Column(Float, nullable=False)
+    total_to_pay = Column(Money, nullable=False)
     parcels = Column(Integer, default=0)
     priority = Column(Integer, default=1)
     status = Column(String(20), default="active")  # active, defeated
@@ -57,43 +61,110 @@ class Giant(Base):
 
     user = relationship("User", back_populates="giants")
     payments = relationship("GiantPayment", back_populates="giant")
+    stats = relationship("GiantStats", back_populates="giant", uselist=False, passive_deletes=True)
 
 class GiantPayment(Base):
     __tablename__ = "giant_payments"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        Index("ix_giant_payments_giant_date", "giant_id", "date"),
+        Index("ix_giant_payments_user_giant_date", "user_id", "giant_id", "date"),
+        {'extend_existing': True},
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id  = Column(Integer, ForeignKey("users.id",   ondelete="CASCADE"), nullable=False)
     giant_id = Column(Integer, ForeignKey("giants.id",  ondelete="CASCADE"), nullable=False)
-    amount   = Column(Float, nullable=False)
+    amount   = Column(Money, nullable=False)
     date     = Column(Date,  nullable=False)
     note     = Column(Text, default="")
 
     user = relationship("User", back_populates="giant_payments")
     giant = relationship("Giant", back_populates="payments")
 
+class GiantStats(Base):
+    """Projeção de giant_payments por gigante, mantida por triggers (ver migrations.py)."""
+    __tablename__ = "giant_stats"
+    __table_args__ = (
+        Index("ix_giant_stats_user", "user_id"),
+        {'extend_existing': True},
+    )
+    giant_id = Column(Integer, ForeignKey("giants.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    total_paid = Column(Money, nullable=False, default=0.0)
+    payment_count = Column(Integer, nullable=False, default=0)
+    last_payment_date = Column(Date, nullable=True)
+
+    giant = relationship("Giant", back_populates="stats")
+
 class Movement(Base):
     __tablename__ = "movements"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        Index("ix_movements_user_date", "user_id", "date"),
+        Index("ux_movements_user_fingerprint", "user_id", "fingerprint", unique=True),
+        {'extend_existing': True},
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     bucket_id = Column(Integer, ForeignKey("buckets.id", ondelete="SET NULL"), nullable=True)
     kind = Column(String(20), nullable=False)  # Receita, Despesa
-    amount = Column(Float, nullable=False)
+    amount = Column(Money, nullable=False)
     description = Column(String(200), default="")
     date = Column(Date, nullable=False)
+    fingerprint = Column(BigInteger, nullable=True)  # lançamentos importados (ver importers/dedupe.py)
 
     user = relationship("User", back_populates="movements")
     bucket = relationship("Bucket", back_populates="movements")
 
+class MovementMonthly(Base):
+    """Totais de movements por usuário/balde/tipo/mês, mantidos por triggers (ver migrations.py)."""
+    __tablename__ = "movement_monthly"
+    __table_args__ = {'extend_existing': True}
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    month = Column(String(7), primary_key=True)  # "AAAA-MM"
+    bucket_id = Column(Integer, primary_key=True, default=0)  # 0 = sem balde
+    kind = Column(String(20), primary_key=True)
+    total = Column(Money, nullable=False, default=0.0)
+    count = Column(Integer, nullable=False, default=0)
+
 class Bill(Base):
     __tablename__ = "bills"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        Index("ix_bills_user_due", "user_id", "due_date"),
+        {'extend_existing': True},
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     title = Column(String(100), nullable=False)
-    amount = Column(Float, nullable=False)
+    amount = Column(Money, nullable=False)
     due_date = Column(Date, nullable=False)
     is_critical = Column(Boolean, default=False)
     paid = Column(Boolean, default=False)
 
     user = relationship("User", back_populates="bills")
+
+class ImportJob(Base):
+    """Importação de extrato na fila do worker (ver importers/background.py)."""
+    __tablename__ = "import_jobs"
+    __table_args__ = (
+        Index("ix_import_jobs_status", "status", "id"),
+        Index("ix_import_jobs_user", "user_id", "created_at"),
+        {'extend_existing': True},
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    name = Column(String(200), nullable=False)  # nome do arquivo enviado
+    format = Column(String(10), nullable=False)  # csv, ofx, qif, pdf
+    path = Column(String(500), nullable=False)  # cópia do arquivo até o fim da importação
+    options = Column(Text, default="{}")  # JSON com as opções do leitor (layout, day_first)
+    status = Column(String(20), nullable=False, default="queued")  # queued, running, done, failed
+    checkpoint = Column(Integer, nullable=False, default=0)  # linhas do arquivo já gravadas
+    chunks = Column(Integer, nullable=False, default=0)
+    imported = Column(Integer, nullable=False, default=0)
+    duplicates = Column(Integer, nullable=False, default=0)
+    categorized = Column(Integer, nullable=False, default=0)
+    rejected = Column(Integer, nullable=False, default=0)
+    errors = Column(Text, default="[]")  # JSON [(linha, motivo)], até pipeline.MAX_ERRORS
+    fraction = Column(Float, nullable=True)
+    seconds = Column(Float, nullable=False, default=0.0)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, nullable=False)  # pulso do worker: parado há muito = job abandonado
@@ -0,0 +1,61 @@
+"""Valores monetários guardados como centavos inteiros.
+
+O banco guarda BIGINT (centavos) e o ORM continua expondo float em reais, então o
+código das telas não muda; somas feitas em SQL ou NumPy sobre centavos são exatas.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+from sqlalchemy import BigInteger
+from sqlalchemy.types import TypeDecorator
+
+
+def to_cents(value) -> int:
+    """Converte reais (float/Decimal/str) em centavos, arredondando meio para cima."""
+    return int((Decimal(str(value)) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def from_cents(cents) -> float:
+    """Converte centavos em reais."""
+    return int(cents) / 100.0
+
+
+def to_cents_array(values) -> np.ndarray:
+    """Versão vetorizada de to_cents para colunas inteiras (pandas/NumPy)."""
+    return np.rint(np.asarray(values, dtype=np.float64) * 100.0).astype(np.int64)
+
+
+def split_cents(total_cents: int, weights) -> np.ndarray:
+    """Divide um valor em centavos proporcionalmente aos pesos, sem perder centavos.
+
+    Cada parte recebe o piso da sua cota e os centavos que sobram vão para as maiores
+    frações (maior resto), então a soma das partes é sempre exatamente total_cents.
+    """
+    w = np.clip(np.asarray(weights, dtype=np.float64), 0.0, None)
+    total_w = w.sum()
+    if total_w <= 0:
+        return np.zeros(len(w), dtype=np.int64)
+    sign = -1 if total_cents < 0 else 1
+    exact = abs(int(total_cents)) * (w / total_w)
+    parts = np.floor(exact).astype(np.int64)
+    leftover = abs(int(total_cents)) - int(parts.sum())
+    if leftover:
+        parts[np.argsort(-(exact - parts), kind="stable")[:leftover]] += 1
+    return sign * parts
+
+
+class Money(TypeDecorator):
+    """Coluna monetária: float em reais no Python, centavos inteiros no banco."""
+
+    impl = BigInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return to_cents(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return from_cents(value)
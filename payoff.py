@@ -0,0 +1,445 @@
+"""Simulador de quitação dos gigantes, mês a mês, vetorizado com NumPy.
+
+Todas as estratégias e todos os gigantes de um usuário andam juntos numa matriz
+(estratégias x gigantes): a cada mês os juros compostos (Giant.interest_rate, % ao mês)
+entram no saldo, as parcelas mínimas são pagas e a sobra do orçamento desce em cascata
+pela ordem da estratégia. Quando um gigante é quitado o que ele consumia volta para a
+cascata no mês seguinte (rollover), porque o orçamento mensal é fixo.
+"""
+import os
+from bisect import bisect_left, insort
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import date
+
+import numpy as np
+
+from processes import MP_CONTEXT
+
+STRATEGIES = ("avalanche", "snowball", "priority")
+STRATEGY_LABELS = {"avalanche": "Avalanche (maiores juros)", "snowball": "Bola de neve (menores saldos)",
+                   "priority": "Prioridade"}
+_EPS = 0.005  # meio centavo: abaixo disso o gigante está quitado
+WEEKS_PER_MONTH = 52 / 12
+DEFAULT_CV = 0.10  # variação mensal assumida quando o histórico tem menos de MIN_HISTORY_MONTHS
+MIN_HISTORY_MONTHS = 3
+# caminhos x gigantes x meses do horizonte a partir dos quais o Monte Carlo se divide num
+# pool de processos (~1 s num processo quando nenhum caminho termina cedo)
+PROCESS_POOL_MIN_CELLS = 20_000_000
+BLOCK_CELLS = 100_000
+# células (caminhos x gigantes x meses) simuladas por processo antes de parar de abrir
+# blocos, desde que já haja MIN_PATHS caminhos: limita o tempo de carteiras que quitam devagar
+MAX_SIMULATED_CELLS = 20_000_000
+MIN_PATHS = 1_000
+MAX_SIGMAS = 6.0  # teto da receita sorteada, em desvios acima da média
+COMPACT_MONTHS = 6  # a cada quantos meses caminhos e gigantes encerrados saem da matriz
+
+
+@dataclass(frozen=True, slots=True)
+class Portfolio:
+    """Gigantes de um usuário como arrays paralelos (saldos em reais, juros ao mês em fração)."""
+    ids: np.ndarray
+    names: tuple
+    balances: np.ndarray
+    rates: np.ndarray
+    minimums: np.ndarray
+    priorities: np.ndarray
+
+
+@dataclass(frozen=True, slots=True)
+class PayoffResult:
+    """Resultado por estratégia (linhas) e gigante (colunas)."""
+    strategies: tuple
+    months: np.ndarray     # meses até quitar (-1 = não quita dentro do horizonte)
+    interest: np.ndarray   # juros pagos em reais
+    paid: np.ndarray       # total desembolsado em reais
+
+    def total_interest(self, strategy: str) -> float:
+        return float(self.interest[self.strategies.index(strategy)].sum())
+
+    def months_to_freedom(self, strategy: str) -> int:
+        """Meses até o último gigante cair (-1 se algum não cai no horizonte)."""
+        months = self.months[self.strategies.index(strategy)]
+        return -1 if (months < 0).any() else int(months.max(initial=0))
+
+    def payoff_dates(self, strategy: str, start: date | None = None) -> list:
+        return [add_months(start or date.today(), int(m)) if m >= 0 else None
+                for m in self.months[self.strategies.index(strategy)]]
+
+
+def add_months(d: date, months: int) -> date:
+    """d + n meses, limitando o dia ao fim do mês (31/01 + 1 = 28 ou 29/02)."""
+    month0 = d.month - 1 + months
+    year, month = d.year + month0 // 12, month0 % 12 + 1
+    last_day = (np.datetime64(f"{year:04d}-{month:02d}", "M") + 1).astype("datetime64[D]") - np.timedelta64(1, "D")
+    return date(year, month, min(d.day, last_day.astype(object).day))
+
+
+def portfolio_from_giants(giants, paid_cents: dict | None = None) -> Portfolio:
+    """Monta o Portfolio a partir de Giant/GiantDTO; paid_cents: {giant_id: centavos pagos}.
+
+    Parcela mínima = total_to_pay / parcels quando parcels > 0 (senão, sem mínimo).
+    Gigantes já derrotados ou sem saldo ficam de fora.
+    """
+    paid_cents = paid_cents or {}
+    active = [g for g in giants
+              if g.status != "defeated" and (g.total_to_pay or 0) - paid_cents.get(g.id, 0) / 100.0 > _EPS]
+    total = np.array([g.total_to_pay or 0.0 for g in active], dtype=np.float64)
+    parcels = np.array([g.parcels or 0 for g in active], dtype=np.float64)
+    return Portfolio(
+        ids=np.array([g.id for g in active], dtype=np.int64),
+        names=tuple(g.name for g in active),
+        balances=total - np.array([paid_cents.get(g.id, 0) for g in active], dtype=np.float64) / 100.0,
+        rates=np.array([g.interest_rate or 0.0 for g in active], dtype=np.float64) / 100.0,
+        minimums=np.divide(total, parcels, out=np.zeros_like(total), where=parcels > 0),
+        priorities=np.array([g.priority or 1 for g in active], dtype=np.float64),
+    )
+
+
+def strategy_order(portfolio: Portfolio, strategy: str) -> np.ndarray:
+    """Ordem (índices) em que a sobra do orçamento ataca os gigantes."""
+    p = portfolio
+    if strategy == "avalanche":    # maior juro primeiro, empate: menor saldo
+        return np.lexsort((p.balances, -p.rates))
+    if strategy == "snowball":     # menor saldo primeiro, empate: maior juro
+        return np.lexsort((-p.rates, p.balances))
+    if strategy == "priority":     # Giant.priority (1 = mais urgente), empate: maior juro
+        return np.lexsort((-p.rates, p.priorities))
+    raise ValueError(f"Estratégia desconhecida: {strategy}")
+
+
+def _month(bal, rates, minimums, budget):
+    """Um mês, in-place em bal (colunas já na ordem de ataque de cada linha).
+
+    budget é escalar ou coluna (uma linha por caminho). Devolve (juros, pagamentos).
+    """
+    charge = bal * rates  # saldo quitado é 0, então não gera juros
+    bal += charge
+
+    pay = np.minimum(minimums, bal)
+    due_total = pay.sum(axis=1, keepdims=True)
+    if (due_total > budget).any():
+        pay *= np.minimum(budget / np.maximum(due_total, _EPS), 1.0)
+    extra = budget - pay.sum(axis=1, keepdims=True)
+
+    # sobra em cascata: cada gigante leva até o que falta, na ordem da linha
+    remaining = bal - pay
+    before = np.cumsum(remaining, axis=1)
+    before -= remaining
+    pay += np.minimum(np.maximum(extra - before, 0.0), remaining)
+
+    bal -= pay
+    bal *= bal > _EPS  # resto abaixo de meio centavo conta como quitado
+    return charge, pay
+
+
+def simulate(portfolio: Portfolio, monthly_budget: float, strategies=STRATEGIES,
+             horizon: int = 360, orders: np.ndarray | None = None) -> PayoffResult:
+    """Simula todas as estratégias de uma vez, mês a mês, por até horizon meses.
+
+    orders (opcional) substitui as ordens das estratégias por linhas de índices já prontas.
+    Se o orçamento não cobre as mínimas, elas são pagas proporcionalmente.
+    """
+    strategies = tuple(strategies)
+    n_giants = len(portfolio.balances)
+    if orders is None:
+        orders = np.stack([strategy_order(portfolio, s) for s in strategies]) if n_giants else \
+            np.zeros((len(strategies), 0), dtype=np.int64)
+
+    # cada linha fica na ordem da própria estratégia: a cascata vira um cumsum direto
+    bal = portfolio.balances[orders]
+    rates = portfolio.rates[orders]
+    minimums = portfolio.minimums[orders]
+    interest = np.zeros_like(bal)
+    paid = np.zeros_like(bal)
+    months = np.zeros(bal.shape, dtype=np.int64)  # meses com saldo em aberto
+    bal[bal <= _EPS] = 0.0
+    budget = float(monthly_budget)
+
+    for _ in range(horizon):
+        active = bal > 0.0
+        if not active.any():
+            break
+        months += active
+        charge, pay = _month(bal, rates, minimums, budget)
+        interest += charge
+        paid += pay
+    months[bal > 0.0] = -1
+
+    # volta para a ordem original dos gigantes
+    inverse = np.argsort(orders, axis=1)
+    months, interest, paid = (np.take_along_axis(a, inverse, axis=1) for a in (months, interest, paid))
+    return PayoffResult(strategies=strategies, months=months, interest=interest, paid=paid)
+
+
+def optimal_order(portfolio: Portfolio) -> np.ndarray:
+    """Ordem que minimiza os juros: maior taxa primeiro; empate por prioridade e menor saldo.
+
+    Com orçamento fixo e mínimas obrigatórias, cada real extra rende mais abatendo o
+    gigante de maior taxa (troca de um real entre dois gigantes nunca reduz os juros).
+    bench.py optimizer confere contra a força bruta sobre divisões fixas da sobra entre
+    os gigantes (frações discretizadas), não contra toda política mês a mês.
+    """
+    p = portfolio
+    return np.lexsort((p.ids, p.balances, p.priorities, -p.rates))
+
+
+class AllocationPlan:
+    """Divisão semanal do orçamento dos gigantes que minimiza os juros totais.
+
+    Cada gigante recebe a parcela mínima semanal (mensal / 52 * 12, limitada ao saldo) e a
+    sobra vai inteira em cascata pela optimal_order. Guarda a ordem como lista ordenada de
+    chaves: update() de um gigante só remove/reinsere a chave dele (bisect) e ajusta o total
+    de mínimas, sem reordenar a carteira. Valores em reais por semana.
+    """
+
+    __slots__ = ("weekly_budget", "_giants", "_keys", "_min_total")
+
+    def __init__(self, portfolio: Portfolio, weekly_budget: float):
+        self.weekly_budget = float(weekly_budget)
+        self._giants = {}
+        self._keys = []
+        self._min_total = 0.0
+        for gid, bal, rate, minimum, prio in zip(portfolio.ids.tolist(), portfolio.balances.tolist(),
+                                                 portfolio.rates.tolist(), portfolio.minimums.tolist(),
+                                                 portfolio.priorities.tolist()):
+            self._add(gid, bal, rate, minimum / WEEKS_PER_MONTH, prio)
+        self._keys.sort()
+
+    @staticmethod
+    def _key(gid, giant):
+        balance, rate, _, priority = giant
+        return (-rate, priority, balance, gid)
+
+    def _add(self, gid, balance, rate, weekly_min, priority, sort=False):
+        if balance <= _EPS:
+            return
+        giant = (balance, rate, weekly_min, priority)
+        self._giants[gid] = giant
+        self._min_total += min(weekly_min, balance)
+        if sort:
+            insort(self._keys, self._key(gid, giant))
+        else:
+            self._keys.append(self._key(gid, giant))
+
+    def _remove(self, gid):
+        giant = self._giants.pop(gid)
+        del self._keys[bisect_left(self._keys, self._key(gid, giant))]
+        self._min_total -= min(giant[2], giant[0])
+        return giant
+
+    def update(self, giant_id: int, balance=None, rate=None, minimum=None, priority=None) -> None:
+        """Re-solve incremental: altera um gigante (minimum é mensal, como no Portfolio).
+
+        Gigante novo entra com os valores informados; saldo zerado tira o gigante do plano.
+        """
+        old = self._remove(giant_id) if giant_id in self._giants else (0.0, 0.0, 0.0, 1.0)
+        self._add(giant_id,
+                  old[0] if balance is None else float(balance),
+                  old[1] if rate is None else float(rate),
+                  old[2] if minimum is None else float(minimum) / WEEKS_PER_MONTH,
+                  old[3] if priority is None else float(priority),
+                  sort=True)
+
+    def discard(self, giant_id: int) -> None:
+        if giant_id in self._giants:
+            self._remove(giant_id)
+
+    def sync(self, portfolio: Portfolio, weekly_budget: float | None = None) -> int:
+        """Aplica só as diferenças em relação à carteira atual; devolve quantos gigantes mudaram."""
+        if weekly_budget is not None:
+            self.weekly_budget = float(weekly_budget)
+        current = {gid: (bal, rate, minimum / WEEKS_PER_MONTH, prio)
+                   for gid, bal, rate, minimum, prio in zip(portfolio.ids.tolist(), portfolio.balances.tolist(),
+                                                            portfolio.rates.tolist(), portfolio.minimums.tolist(),
+                                                            portfolio.priorities.tolist())}
+        changed = 0
+        for gid in [g for g in self._giants if g not in current]:
+            self._remove(gid)
+            changed += 1
+        for gid, giant in current.items():
+            if self._giants.get(gid) != giant:
+                if gid in self._giants:
+                    self._remove(gid)
+                self._add(gid, *giant, sort=True)
+                changed += 1
+        return changed
+
+    def order(self) -> list[int]:
+        """giant_ids na ordem de ataque."""
+        return [key[-1] for key in self._keys]
+
+    def allocation(self) -> dict:
+        """{giant_id: valor da semana}; sem cobertura das mínimas, elas são pagas proporcionalmente."""
+        budget = self.weekly_budget
+        scale = min(budget / self._min_total, 1.0) if self._min_total > _EPS else 1.0
+        extra = max(budget - self._min_total * scale, 0.0)
+        result = {}
+        for key in self._keys:
+            gid = key[-1]
+            balance, _, weekly_min, _ = self._giants[gid]
+            pay = min(weekly_min, balance) * scale
+            take = min(extra, balance - pay)
+            extra -= take
+            result[gid] = pay + take
+        return result
+
+
+def history_volatility(monthly_rows, current_month: str | None = None) -> tuple[float, float, int]:
+    """Coeficientes de variação mensal (receita, despesa) a partir do rollup de movements.
+
+    monthly_rows: (mês "AAAA-MM", tipo, centavos) como em services.rollups.monthly_totals.
+    O mês corrente (incompleto) fica de fora. Com menos de MIN_HISTORY_MONTHS meses usa
+    DEFAULT_CV. Devolve (cv_receita, cv_despesa, meses usados).
+    """
+    current_month = current_month or date.today().strftime("%Y-%m")
+    series = {"Receita": {}, "Despesa": {}}
+    for month, kind, cents in monthly_rows:
+        if month != current_month and kind in series:
+            series[kind][month] = series[kind].get(month, 0) + (cents or 0)
+    months = sorted(set(series["Receita"]) | set(series["Despesa"]))
+    if len(months) < MIN_HISTORY_MONTHS:
+        return DEFAULT_CV, DEFAULT_CV, len(months)
+
+    def cv(kind):
+        values = np.array([series[kind].get(m, 0) for m in months], dtype=np.float64)
+        mean = values.mean()
+        return float(values.std(ddof=1) / mean) if mean > 0 else DEFAULT_CV
+
+    return cv("Receita"), cv("Despesa"), len(months)
+
+
+@dataclass(frozen=True, slots=True)
+class MonteCarloResult:
+    """Percentis de meses até a vitória por gigante (None = não quita no horizonte)."""
+    ids: np.ndarray
+    names: tuple
+    p50: list
+    p90: list
+    win_rate: np.ndarray  # fração dos caminhos em que o gigante cai dentro do horizonte
+    all_p50: int | None   # vitória sobre todos os gigantes
+    all_p90: int | None
+    paths: int
+
+    def dates(self, months_list, start: date | None = None) -> list:
+        return [add_months(start or date.today(), m) if m is not None else None for m in months_list]
+
+
+def _simulate_block(rng, portfolio, order, income, income_sd, expense, expense_sd, share, paths, horizon):
+    """Meses até quitar de um bloco de caminhos (caminho x gigante, -1 = não quita) e células simuladas.
+
+    A receita sorteada é limitada a MAX_SIGMAS desvios acima da média, o que dá um teto
+    para o orçamento do mês. Gigante cujos juros do mês já passam desse teto nunca mais
+    diminui, e quem vem depois dele na ordem de ataque só recebe a mínima: se os juros
+    já cobrem a mínima, também não cai. A cada COMPACT_MONTHS meses os caminhos em que
+    só restam gigantes travados (ou nenhum) saem da matriz, e também os gigantes
+    quitados em todos os caminhos restantes.
+    """
+    bal = np.tile(portfolio.balances[order], (paths, 1))
+    rates = portfolio.rates[order]
+    minimums = portfolio.minimums[order]
+    months = np.zeros(bal.shape, dtype=np.int32)
+    result = np.full(bal.shape, -1, dtype=np.int32)
+    rows, cols = np.arange(paths), np.arange(len(order))
+    income_max = income + MAX_SIGMAS * income_sd
+    budget_max = income_max * share if share else income_max
+    bal[bal <= _EPS] = 0.0
+    cells = 0
+    for month in range(horizon):
+        if month % COMPACT_MONTHS == 0 and month:
+            open_ = bal > 0.0
+            result[np.ix_(rows, cols)] = np.where(open_, -1, months)
+            charge = bal * rates
+            stuck = charge >= budget_max
+            # atrás (na ordem de ataque) de um gigante travado a sobra não chega: só a mínima
+            behind = np.logical_or.accumulate(stuck, axis=1)
+            behind[:, 1:], behind[:, 0] = behind[:, :-1], False
+            stuck |= behind & (charge >= minimums)
+            running = (open_ & ~stuck).any(axis=1)
+            keep_cols = open_[running].any(axis=0)
+            bal, months = bal[np.ix_(running, keep_cols)], months[np.ix_(running, keep_cols)]
+            rows, cols = rows[running], cols[keep_cols]
+            rates, minimums = rates[keep_cols], minimums[keep_cols]
+        active = bal > 0.0
+        if not active.any():
+            break
+        months += active
+        cells += active.size
+        # sorteio de todos os caminhos do bloco: os que já saíram não mudam a sequência dos outros
+        income_t = np.clip(rng.normal(income, income_sd, (paths, 1))[rows], 0.0, income_max)
+        if share:
+            budget = income_t * share
+        else:
+            budget = np.maximum(income_t - np.maximum(rng.normal(expense, expense_sd, (paths, 1))[rows], 0.0), 0.0)
+        _month(bal, rates, minimums, budget)
+    result[np.ix_(rows, cols)] = np.where(bal > 0.0, -1, months)
+    return result, cells
+
+
+def _simulate_paths(portfolio, order, income, income_sd, expense, expense_sd, share, paths, horizon, seed,
+                    min_paths=None, max_cells=None):
+    """Caminhos do Monte Carlo: meses até quitar por caminho x gigante (-1 = não quita).
+
+    Roda em blocos de ~BLOCK_CELLS células para as matrizes caberem no cache da CPU (a
+    conta mês a mês é limitada por memória). Já com min_paths caminhos, não abre um bloco
+    que (pelo custo do anterior) passaria de max_cells células simuladas (caminhos x
+    gigantes x meses): carteira que quita devagar devolve menos caminhos, não demora mais.
+    Função de módulo para rodar num processo.
+    """
+    rng = np.random.default_rng(seed)
+    block = max(1, BLOCK_CELLS // max(len(order), 1))
+    blocks, done, cells, spent = [], 0, 0, 0
+    while done < paths:
+        if max_cells is not None and done >= (min_paths or 0) and cells + spent > max_cells:
+            break
+        months, spent = _simulate_block(rng, portfolio, order, income, income_sd, expense, expense_sd, share,
+                                        min(block, paths - done), horizon)
+        blocks.append(months)
+        done += len(months)
+        cells += spent
+    return np.concatenate(blocks)[:, np.argsort(order)]
+
+
+def monte_carlo(portfolio: Portfolio, monthly_income: float, monthly_expense: float,
+                income_cv: float = DEFAULT_CV, expense_cv: float = DEFAULT_CV, giant_share: float = 0.0,
+                paths: int = 10_000, horizon: int = 360, seed=None, workers: int | None = None) -> MonteCarloResult:
+    """Distribuição das datas de vitória com receita/despesa mensais sorteadas.
+
+    Cada mês de cada caminho sorteia receita e despesa (normal, truncada em zero, com os
+    cv de history_volatility). O orçamento dos gigantes segue daily_budget_for_giants:
+    giant_share (fração da receita dos baldes "giant") quando houver, senão o que sobra
+    da receita após a despesa. A sobra ataca na optimal_order. Acima de
+    PROCESS_POOL_MIN_CELLS caminhos x gigantes x meses os caminhos se dividem entre
+    processos (MP_CONTEXT: roda a partir do servidor do Streamlit, sem fork). Carteira que
+    quita devagar usa menos que paths caminhos (MAX_SIMULATED_CELLS); result.paths diz quantos.
+    """
+    order = optimal_order(portfolio)
+    params = (monthly_income, monthly_income * income_cv, monthly_expense, monthly_expense * expense_cv, giant_share)
+    workers = workers or os.cpu_count() or 1
+    chunks = 1 if paths * len(order) * horizon < PROCESS_POOL_MIN_CELLS else min(workers, paths)
+    seeds = np.random.SeedSequence(seed).spawn(chunks)
+    sizes = [paths // chunks + (i < paths % chunks) for i in range(chunks)]
+    if chunks == 1:
+        months = _simulate_paths(portfolio, order, *params, paths, horizon, seeds[0], MIN_PATHS, MAX_SIMULATED_CELLS)
+    else:
+        with ProcessPoolExecutor(max_workers=chunks, mp_context=MP_CONTEXT) as pool:
+            months = np.concatenate(list(pool.map(
+                _simulate_paths, *zip(*[(portfolio, order, *params, n, horizon, sq, -(-MIN_PATHS // chunks),
+                                         MAX_SIMULATED_CELLS) for n, sq in zip(sizes, seeds)])
+            )))
+
+    never = months < 0
+    finished = np.where(never, horizon + 1, months)  # "não quita" ordena depois de qualquer mês
+
+    def percentile(values, q):
+        result = np.quantile(values, q, axis=0, method="inverted_cdf")
+        return [int(m) if m <= horizon else None for m in np.atleast_1d(result)]
+
+    overall = finished.max(axis=1, initial=0)
+    return MonteCarloResult(
+        ids=portfolio.ids, names=portfolio.names,
+        p50=percentile(finished, 0.5), p90=percentile(finished, 0.9),
+        win_rate=1.0 - never.mean(axis=0),
+        all_p50=percentile(overall, 0.5)[0], all_p90=percentile(overall, 0.9)[0],
+        paths=len(months),
+    )
@@ -0,0 +1,16 @@
+"""Contexto de multiprocessing dos pools de processos do app (extratos, Monte Carlo).
+
+Os pools nascem de threads do servidor do Streamlit (worker de importação, script da
+página), e um fork de processo com várias threads herda locks presos. Os processos saem
+de um forkserver que já importou os módulos de PRELOAD (pandas incluso), ou por spawn
+onde não há forkserver.
+"""
+import multiprocessing
+
+PRELOAD = ["payoff", "importers.parallel"]
+
+if "forkserver" in multiprocessing.get_all_start_methods():
+    MP_CONTEXT = multiprocessing.get_context("forkserver")
+    MP_CONTEXT.set_forkserver_preload(PRELOAD)
+else:
+    MP_CONTEXT = multiprocessing.get_context("spawn")
@@ -0,0 +1,200 @@
+"""Read models: DTOs imutáveis para as telas e o cache.
+
+Os loaders cacheados devolviam instâncias ORM destacadas da sessão, com todo o estado
+de instância do SQLAlchemy, compartilhadas entre reruns e fáceis de alterar sem querer
+(a alteração nunca chegava ao banco). Aqui cada entidade vira uma dataclass congelada
+com __slots__ montada a partir de um SELECT só das colunas, sem passar pelo identity map.
+Para escrever, recarregue a linha com db.get(Modelo, dto.id).
+"""
+from bisect import bisect_left
+from collections import defaultdict
+from dataclasses import dataclass, fields
+from datetime import date, timedelta
+from operator import attrgetter
+
+from sqlalchemy import BigInteger, select, tuple_, type_coerce
+from sqlalchemy.orm import Session
+
+from models import Bill, Bucket, Giant, GiantPayment, GiantStats, Movement, UserProfile
+from money import to_cents
+from services.rollups import movement_count
+
+
+@dataclass(frozen=True, slots=True)
+class ProfileDTO:
+    id: int
+    user_id: int
+    monthly_income: float
+    monthly_expense: float
+    last_allocation_date: date | None
+
+
+@dataclass(frozen=True, slots=True)
+class BucketDTO:
+    id: int
+    user_id: int
+    name: str
+    description: str
+    percent: float
+    balance: float
+    type: str
+
+
+@dataclass(frozen=True, slots=True)
+class GiantDTO:
+    id: int
+    user_id: int
+    name: str
+    total_to_pay: float
+    parcels: int
+    priority: int
+    status: str
+    weekly_goal: float
+    interest_rate: float
+    payoff_efficiency: float
+
+
+@dataclass(frozen=True, slots=True)
+class PaymentDTO:
+    id: int
+    user_id: int
+    giant_id: int
+    amount: float
+    date: date
+    note: str
+
+
+@dataclass(frozen=True, slots=True)
+class MovementDTO:
+    id: int
+    user_id: int
+    bucket_id: int | None
+    kind: str
+    amount: float
+    description: str
+    date: date
+
+
+@dataclass(frozen=True, slots=True)
+class BillDTO:
+    id: int
+    user_id: int
+    title: str
+    amount: float
+    due_date: date
+    is_critical: bool
+    paid: bool
+
+
+def _columns(dto, model):
+    return [getattr(model, f.name) for f in fields(dto)]
+
+
+def _read(db: Session, dto, model, *where, order_by=(), limit=None) -> list:
+    query = select(*_columns(dto, model)).where(*where).order_by(*order_by)
+    if limit is not None:
+        query = query.limit(limit)
+    return [dto(*row) for row in db.execute(query)]
+
+
+def read_profile(db: Session, user_id: int) -> ProfileDTO | None:
+    rows = _read(db, ProfileDTO, UserProfile, UserProfile.user_id == user_id)
+    return rows[0] if rows else None
+
+
+def read_buckets(db: Session, user_id: int) -> list[BucketDTO]:
+    return _read(db, BucketDTO, Bucket, Bucket.user_id == user_id, order_by=(Bucket.id,))
+
+
+def read_giants(db: Session, user_id: int) -> list[GiantDTO]:
+    return _read(db, GiantDTO, Giant, Giant.user_id == user_id, order_by=(Giant.id,))
+
+
+def read_bills(db: Session, user_id: int) -> list[BillDTO]:
+    return _read(db, BillDTO, Bill, Bill.user_id == user_id, order_by=(Bill.due_date.asc(),))
+
+
+def read_payments(db: Session, user_id: int, since: date | None = None, giant_ids=None) -> list[PaymentDTO]:
+    where = [GiantPayment.user_id == user_id]
+    if giant_ids is not None:
+        where.append(GiantPayment.giant_id.in_(giant_ids))
+    if since is not None:
+        where.append(GiantPayment.date >= since)
+    return _read(db, PaymentDTO, GiantPayment, *where, order_by=(GiantPayment.giant_id, GiantPayment.date))
+
+
+class PaymentIndex:
+    """Totais e aportes recentes de todos os gigantes de um usuário, por giant_id.
+
+    Pago, nº de aportes e último aporte vêm da projeção giant_stats (uma linha por
+    gigante, mantida por triggers); de giant_payments só se leem os aportes a partir de
+    since, o suficiente para a janela da meta semanal. Valores em centavos.
+    """
+
+    __slots__ = ("_stats", "_recent", "_since")
+
+    def __init__(self, stats, recent, since: date):
+        self._stats = {gid: (int(paid or 0), count, last) for gid, paid, count, last in stats}
+        grouped = defaultdict(list)
+        for p in recent:
+            grouped[p.giant_id].append(p)
+        self._recent = {gid: tuple(sorted(ps, key=attrgetter("date"))) for gid, ps in grouped.items()}
+        self._since = since
+
+    def paid_cents(self, giant_id: int) -> int:
+        return self._stats.get(giant_id, (0, 0, None))[0]
+
+    def count(self, giant_id: int) -> int:
+        return self._stats.get(giant_id, (0, 0, None))[1]
+
+    def last_date(self, giant_id: int) -> date | None:
+        return self._stats.get(giant_id, (0, 0, None))[2]
+
+    def week_cents(self, giant_id: int, today: date | None = None) -> int:
+        """Depósitos dos últimos 7 dias (mesma janela de check de meta semanal).
+
+        Só enxerga aportes a partir de since: today anterior à montagem do índice fica
+        com a janela cortada.
+        """
+        ps = self._recent.get(giant_id, ())
+        since = max((today or date.today()) - timedelta(days=7), self._since)
+        return sum(to_cents(p.amount) for p in ps[bisect_left(ps, since, key=attrgetter("date")):])
+
+    def overview(self, giant_ids, today: date | None = None) -> dict:
+        """Pago, nº de aportes, último aporte e depósitos da semana por giant_id."""
+        return {
+            gid: {"paid": self.paid_cents(gid), "count": self.count(gid),
+                  "last_date": self.last_date(gid), "week": self.week_cents(gid, today)}
+            for gid in giant_ids
+        }
+
+
+def read_payment_index(db: Session, user_id: int, today: date | None = None) -> PaymentIndex:
+    since = (today or date.today()) - timedelta(days=7)
+    stats = db.execute(
+        select(GiantStats.giant_id, type_coerce(GiantStats.total_paid, BigInteger),
+               GiantStats.payment_count, GiantStats.last_payment_date)
+        .where(GiantStats.user_id == user_id)
+    ).all()
+    # só gigantes com aporte têm linha em giant_stats; por giant_id a janela é um range
+    # em ix_giant_payments_user_giant_date (user_id, giant_id, date)
+    recent = read_payments(db, user_id, since, [gid for gid, *_ in stats]) if stats else []
+    return PaymentIndex(stats, recent, since)
+
+
+def read_movements_page(db: Session, user_id: int, cursor: tuple | None = None, per_page: int = 50):
+    """Página do livro caixa (mais recentes primeiro) por keyset em (date, id).
+
+    cursor é o (date, id) da última linha da página anterior (None = primeira página);
+    devolve (movimentos, cursor da próxima página ou None, total de movimentos). O custo
+    é o mesmo em qualquer página: o índice (user_id, date) já termina no rowid, sem OFFSET.
+    O total vem do rollup movement_monthly, sem count() na tabela movements.
+    """
+    where = [Movement.user_id == user_id]
+    if cursor is not None:
+        where.append(tuple_(Movement.date, Movement.id) < tuple_(*cursor))
+    rows = _read(db, MovementDTO, Movement, *where,
+                 order_by=(Movement.date.desc(), Movement.id.desc()), limit=per_page + 1)
+    movements = rows[:per_page]
+    next_cursor = (movements[-1].date, movements[-1].id) if len(rows) > per_page else None
+    return movements, next_cursor, movement_count(db, user_id)
@@ -0,0 +1,303 @@
+"""Lançamentos em lote nos baldes.
+
+Em vez de um Movement ORM por balde e um UPDATE por saldo, cada chamada grava todas as
+linhas com INSERTs multi-linha (fatiados pelo limite de parâmetros do banco) e ajusta
+todos os saldos com um único UPDATE ... CASE, dentro da transação do chamador.
+
+O INSERT multi-linha é montado direto no paramstyle do driver: insert().values(lista)
+do SQLAlchemy recompila um bind por valor e fica mais lento que o próprio flush do ORM.
+"""
+import itertools
+import sqlite3
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy import BigInteger, Date, case, insert, literal, select, type_coerce, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from models import Bucket, Movement, UserProfile
+from money import from_cents, split_cents, to_cents
+
+# Máximo de parâmetros por statement (SQLite < 3.32 aceita só 999)
+MAX_BIND_PARAMS = {
+    "sqlite": 32766 if sqlite3.sqlite_version_info >= (3, 32, 0) else 999,
+    "postgresql": 65535,
+}
+_DEFAULT_MAX_BIND_PARAMS = 999
+# Linhas por INSERT: acima disso o statement só fica maior, sem ganho de vazão
+MAX_ROWS_PER_INSERT = 500
+
+_PLACEHOLDERS = {"qmark": "?", "format": "%s"}
+_MOVEMENT_COLUMNS = ("user_id", "bucket_id", "kind", "amount", "description", "date", "fingerprint")
+
+KIND_BY_TIPO = {"Entrada": "Receita", "Saída": "Despesa", "Receita": "Receita", "Despesa": "Despesa"}
+
+
+def post_movements(db: Session, user_id: int, rows, buckets=None) -> int:
+    """Grava movimentos já divididos e aplica os deltas de saldo dos baldes.
+
+    rows: iterável de (bucket_id, kind, centavos, descrição, data[, fingerprint]); o
+    fingerprint só vem dos extratos importados (importers/dedupe.py). buckets (opcional)
+    são objetos Bucket (ORM) já carregados que recebem o saldo novo sem reconsulta.
+    Devolve o número de movimentos gravados; o commit fica com o chamador.
+    """
+    values, deltas = [], defaultdict(int)
+    for bucket_id, kind, cents, description, day, *fingerprint in rows:
+        values.append((user_id, bucket_id, kind, int(cents), description, day,
+                       fingerprint[0] if fingerprint else None))
+        if bucket_id is not None:
+            deltas[bucket_id] += cents if kind == "Receita" else -cents
+    if not values:
+        return 0
+
+    _insert_movements(db, values)
+
+    deltas = {bid: d for bid, d in deltas.items() if d}
+    if deltas:
+        balance = Bucket.__table__.c.balance
+        delta_expr = case(
+            {bid: literal(d, BigInteger) for bid, d in deltas.items()},
+            value=Bucket.__table__.c.id, else_=literal(0, BigInteger),
+        )
+        db.execute(
+            update(Bucket.__table__)
+            .where(Bucket.__table__.c.id.in_(list(deltas)), Bucket.__table__.c.user_id == user_id)
+            .values(balance=type_coerce(balance, BigInteger) + delta_expr)
+        )
+        for b in buckets or ():
+            # DTOs (read_models) são imutáveis e se renovam pela invalidação do cache
+            if b.id in deltas and hasattr(b, "_sa_instance_state"):
+                set_committed_value(b, "balance", from_cents(to_cents(b.balance or 0) + deltas[b.id]))
+    return len(values)
+
+
+def _insert_movements(db: Session, values: list) -> None:
+    """INSERT multi-linha em movements com amount já em centavos."""
+    dialect = db.get_bind().dialect
+    mark = _PLACEHOLDERS.get(dialect.paramstyle)
+    if mark is None:
+        # paramstyle sem suporte no atalho: executemany do Core (Money recebe reais)
+        db.execute(insert(Movement), [
+            dict(zip(_MOVEMENT_COLUMNS, v[:3] + (from_cents(v[3]),) + v[4:])) for v in values
+        ])
+        return
+    processor = Date().dialect_impl(dialect).bind_processor(dialect) or (lambda d: d)
+    formatted = {}  # poucas datas distintas por lote: formata cada uma uma vez
+
+    def to_db_date(d):
+        value = formatted.get(d)
+        if value is None:
+            value = formatted[d] = processor(d)
+        return value
+
+    per_row = len(_MOVEMENT_COLUMNS)
+    limit = MAX_BIND_PARAMS.get(dialect.name, _DEFAULT_MAX_BIND_PARAMS)
+    chunk = max(1, min(MAX_ROWS_PER_INSERT, limit // per_row))
+    row_marks = "(" + ", ".join([mark] * per_row) + ")"
+    head = f"INSERT INTO movements ({', '.join(_MOVEMENT_COLUMNS)}) VALUES "
+    conn = db.connection()
+    for start in range(0, len(values), chunk):
+        rows = values[start:start + chunk]
+        params = tuple(itertools.chain.from_iterable(r[:5] + (to_db_date(r[5]),) + r[6:] for r in rows))
+        conn.exec_driver_sql(head + ", ".join([row_marks] * len(rows)), params)
+
+
+def existing_fingerprints(db: Session, user_id: int, fingerprints) -> set:
+    """Quais dos fingerprints (importers/dedupe.py) o usuário já tem em movements.
+
+    Um SELECT ... IN por fatia do limite de parâmetros, direto no driver como o INSERT
+    acima: com dezenas de milhares de valores o ORM gasta mais que a consulta.
+    """
+    fingerprints = [int(f) for f in fingerprints]
+    dialect = db.get_bind().dialect
+    mark = _PLACEHOLDERS.get(dialect.paramstyle)
+    step = MAX_BIND_PARAMS.get(dialect.name, _DEFAULT_MAX_BIND_PARAMS) - 1
+    conn = db.connection()
+    found = set()
+    for start in range(0, len(fingerprints), step):
+        part = fingerprints[start:start + step]
+        if mark is None:
+            found.update(conn.execute(
+                select(Movement.fingerprint).where(Movement.user_id == user_id, Movement.fingerprint.in_(part))
+            ).scalars())
+            continue
+        found.update(f for (f,) in conn.exec_driver_sql(
+            f"SELECT fingerprint FROM movements WHERE user_id = {mark} AND fingerprint IN "
+            f"({', '.join([mark] * len(part))})", (user_id, *part)))
+    return found
+
+
+def allocate(db: Session, user_id: int, buckets, entries, label: str = "auto") -> int:
+    """Divide um ou vários valores entre os baldes pelos percentuais, num único lote.
+
+    entries: iterável de (valor em reais, tipo, data, descrição), com tipo
+    "Entrada"/"Receita" ou "Saída"/"Despesa". Cada valor é dividido pelo maior resto
+    (split_cents), então a soma das partes é sempre o valor informado.
+    """
+    weights = [max(b.percent or 0.0, 0.0) for b in buckets]
+    if sum(weights) <= 0:
+        raise ValueError("Configure percentuais dos baldes em 'Baldes'.")
+
+    def rows():
+        for valor, tipo, day, description in entries:
+            kind = KIND_BY_TIPO[tipo]
+            for b, cents in zip(buckets, split_cents(to_cents(valor), weights)):
+                yield b.id, kind, int(cents), f"{description} ({label} {b.percent:.1f}%)", day
+
+    return post_movements(db, user_id, rows(), buckets)
+
+
+def daily_income_matrix(monthly_income: float, weights, start: date, end: date) -> tuple[np.ndarray, np.ndarray]:
+    """Datas de start a end e a matriz dias x baldes da receita diária, em centavos.
+
+    A receita diária de cada dia usa a duração do próprio mês (fevereiro rende mais por
+    dia que março). Só existem até quatro durações de mês, então split_cents roda uma
+    vez por duração e o resto é indexação.
+    """
+    days = np.arange(np.datetime64(start, "D"), np.datetime64(end, "D") + 1)
+    months = days.astype("datetime64[M]")
+    month_len = ((months + 1).astype("datetime64[D]") - months.astype("datetime64[D]")).astype(np.int64)
+    lengths, which = np.unique(month_len, return_inverse=True)
+    per_length = np.stack([split_cents(to_cents(monthly_income / n), weights) for n in lengths])
+    return days, per_length[which]
+
+
+def catch_up_daily_allocation(db: Session, user_id: int, today: date | None = None,
+                              aggregate: bool = False) -> int:
+    """Lança de uma vez a receita diária de todos os dias desde last_allocation_date.
+
+    Sem laço por dia: a matriz dias x baldes sai de daily_income_matrix e vai para o
+    banco num único lote (post_movements). Com aggregate=True grava uma linha
+    "Auto diária (dd/mm–dd/mm)" por balde em vez de uma por dia. last_allocation_date
+    avança por compare-and-set na mesma transação, então duas execuções concorrentes
+    não lançam o mesmo período duas vezes. Devolve o nº de movimentos (o commit fica
+    com o chamador).
+    """
+    today = today or date.today()
+    profile = db.execute(
+        select(UserProfile.monthly_income, UserProfile.last_allocation_date)
+        .where(UserProfile.user_id == user_id)
+    ).first()
+    if profile is None or not profile.monthly_income:
+        return 0
+    last = profile.last_allocation_date
+    # primeira execução: não retroagir demais; começa de hoje
+    start = (last or today - timedelta(days=1)) + timedelta(days=1)
+    if start > today:
+        return 0
+
+    buckets = db.execute(select(Bucket).where(Bucket.user_id == user_id).order_by(Bucket.id)).scalars().all()
+    weights = [max(b.percent or 0.0, 0.0) for b in buckets]
+    if not buckets or sum(weights) <= 0:
+        return 0
+
+    claimed = db.execute(
+        update(UserProfile)
+        .where(UserProfile.user_id == user_id,
+               UserProfile.last_allocation_date.is_(None) if last is None
+               else UserProfile.last_allocation_date == last)
+        .values(last_allocation_date=today)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not claimed:
+        return 0  # outro processo já lançou este período
+
+    days, parts = daily_income_matrix(profile.monthly_income, weights, start, today)
+    if aggregate:
+        label = f"Auto diária ({start:%d/%m}–{today:%d/%m})"
+        rows = [(b.id, "Receita", int(c), label, today) for b, c in zip(buckets, parts.sum(axis=0))]
+    else:
+        ids = np.array([b.id for b in buckets])
+        day_list = days.astype(date).tolist()
+        rows = (
+            (int(bid), "Receita", int(c), "Auto diária", day_list[i])
+            for i, bid, c in zip(np.repeat(np.arange(len(days)), len(ids)),
+                                 np.tile(ids, len(days)), parts.ravel())
+        )
+    return post_movements(db, user_id, rows, buckets)
+
+
+def pending_allocation_users(db: Session, today: date, after_id: int = 0, limit: int = 500) -> list[int]:
+    """Próximo lote (keyset por user_id) de usuários com receita diária pendente."""
+    return db.execute(
+        select(UserProfile.user_id)
+        .where(UserProfile.user_id > after_id,
+               UserProfile.monthly_income > 0,
+               (UserProfile.last_allocation_date.is_(None)) | (UserProfile.last_allocation_date < today))
+        .order_by(UserProfile.user_id)
+        .limit(limit)
+    ).scalars().all()
+
+
+def allocate_batch(session_factory, user_ids, today: date, aggregate: bool = False) -> tuple[int, int, int]:
+    """Roda o catch-up de um lote numa transação; um savepoint por usuário isola falhas.
+
+    Devolve (usuários lançados, movimentos gravados, falhas).
+    """
+    done = rows = failed = 0
+    with session_factory() as db:
+        for uid in user_ids:
+            try:
+                with db.begin_nested():
+                    n = catch_up_daily_allocation(db, uid, today=today, aggregate=aggregate)
+            except Exception:
+                failed += 1
+                continue
+            done += bool(n)
+            rows += n
+        db.commit()
+    return done, rows, failed
+
+
+def writer_slots(session_factory, default: int = 1) -> int:
+    """Conexões do pool do escritor (1 no SQLite); default se o pool não tem tamanho fixo."""
+    with session_factory() as db:
+        size = getattr(db.get_bind().pool, "size", None)
+    return size() if callable(size) else default
+
+
+def run_daily_allocation(session_factory, today: date | None = None, workers: int = 4,
+                         batch_size: int = 500, aggregate: bool = False) -> dict:
+    """Receita diária de todos os usuários, em lotes.
+
+    Cada lote é uma transação de escrita, então workers é limitado ao pool do escritor:
+    no SQLite (um escritor) os lotes rodam um depois do outro nesta thread, em vez de
+    threads esperando a conexão até o pool_timeout. Idempotente: quem já está em dia
+    não entra nos lotes e o compare-and-set de catch_up_daily_allocation descarta
+    corridas com outra execução.
+
+    Rodando fora do servidor do Streamlit (manage.py allocate-daily), a escrita não
+    invalida o cache em processo do app (cache.VersionedCache): saldos e movimentos
+    já em cache só aparecem atualizados depois do TTL das entradas.
+    """
+    today = today or date.today()
+    workers = max(1, min(workers, writer_slots(session_factory, workers)))
+    stats = {"users": 0, "movements": 0, "failed": 0, "batches": 0}
+    t0 = time.perf_counter()
+
+    def batches():
+        after = 0
+        while True:
+            with session_factory() as db:
+                batch = pending_allocation_users(db, today, after, batch_size)
+            if not batch:
+                return
+            after = batch[-1]
+            yield batch
+
+    def run(batch):
+        return allocate_batch(session_factory, batch, today, aggregate)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for done, rows, failed in pool.map(run, batches()) if workers > 1 else map(run, batches()):
+            stats["users"] += done
+            stats["movements"] += rows
+            stats["failed"] += failed
+            stats["batches"] += 1
+    stats["seconds"] = time.perf_counter() - t0
+    stats["users_per_sec"] = stats["users"] / stats["seconds"] if stats["seconds"] else 0.0
+    return stats
@@ -0,0 +1,41 @@
+from sqlalchemy import BigInteger, func, select, text, type_coerce
+from sqlalchemy.orm import Session
+from models import MovementMonthly
+
+# Mesma agregação que os triggers de movements fazem linha a linha (ver migrations.py);
+# movimentos órfãos de bancos antigos (usuário apagado com FKs desligadas) ficam de fora.
+_REBUILD_SQL = """
+    INSERT INTO movement_monthly (user_id, month, bucket_id, kind, total, count)
+    SELECT user_id, substr(date, 1, 7), COALESCE(bucket_id, 0), kind, SUM(amount), COUNT(*)
+    FROM movements
+    WHERE user_id IN (SELECT id FROM users) {where}
+    GROUP BY user_id, substr(date, 1, 7), COALESCE(bucket_id, 0), kind
+"""
+
+def rebuild_movement_monthly(db, user_id: int | None = None) -> int:
+    """Recalcula movement_monthly a partir de movements (todos os usuários ou um só)."""
+    if user_id is None:
+        db.execute(text("DELETE FROM movement_monthly"))
+        db.execute(text(_REBUILD_SQL.format(where="")))
+    else:
+        db.execute(text("DELETE FROM movement_monthly WHERE user_id = :u"), {"u": user_id})
+        db.execute(text(_REBUILD_SQL.format(where="AND user_id = :u")), {"u": user_id})
+    if user_id is None:
+        return db.execute(text("SELECT COUNT(*) FROM movement_monthly")).scalar()
+    return db.execute(text("SELECT COUNT(*) FROM movement_monthly WHERE user_id = :u"), {"u": user_id}).scalar()
+
+def monthly_totals(db: Session, user_id: int) -> list[tuple[str, str, int]]:
+    """(mês, tipo, centavos) do usuário, somando os baldes — O(meses)."""
+    return db.execute(
+        select(MovementMonthly.month, MovementMonthly.kind,
+               func.sum(type_coerce(MovementMonthly.total, BigInteger)))
+        .where(MovementMonthly.user_id == user_id)
+        .group_by(MovementMonthly.month, MovementMonthly.kind)
+        .order_by(MovementMonthly.month)
+    ).all()
+
+def movement_count(db: Session, user_id: int) -> int:
+    """Quantidade de movimentos do usuário sem contar a tabela movements."""
+    return int(db.execute(
+        select(func.coalesce(func.sum(MovementMonthly.count), 0)).where(MovementMonthly.user_id == user_id)
+    ).scalar())
@@ -0,0 +1,44 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# antes de importar db: os testes nunca tocam o sql_app.db do projeto
+os.environ["DATABASE_URL"] = f"sqlite:///{Path(tempfile.mkdtemp(prefix='davi_tests_')) / 'default.db'}"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from db import RoutingSession, create_engines  # noqa: E402
+from models import Base  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+
+@pytest.fixture
+def engines(tmp_path):
+    """(escritor, leitor, fábrica de RoutingSession) num banco SQLite novo, com o schema criado."""
+    writer, reader = create_engines(f"sqlite:///{tmp_path / 'test.db'}", pragmas={
+        "journal_mode": "WAL", "foreign_keys": "ON", "busy_timeout": 2000,
+    })
+    Base.metadata.create_all(writer)
+
+    class TestSession(RoutingSession):
+        pass
+
+    TestSession.writer, TestSession.reader = writer, reader
+    yield writer, reader, sessionmaker(class_=TestSession, autoflush=False, expire_on_commit=False)
+    writer.dispose()
+    reader.dispose()
+
+
+@pytest.fixture(scope="session")
+def corpus(tmp_path_factory):
+    """Arquivos de CORPUS_ROWS transações sintéticas por formato e a soma esperada em centavos."""
+    from tests.corpus import CORPUS_ROWS, synthetic_transactions, write_statement_ofx, write_statement_qif
+
+    folder = tmp_path_factory.mktemp("corpus")
+    files = {"ofx": folder / "extrato.ofx", "ofx_xml": folder / "extrato.xml.ofx", "qif": folder / "extrato.qif"}
+    write_statement_ofx(files["ofx"], CORPUS_ROWS)
+    write_statement_ofx(files["ofx_xml"], CORPUS_ROWS, xml=True)
+    write_statement_qif(files["qif"], CORPUS_ROWS)
+    return files, sum(cents for _, _, cents, _ in synthetic_transactions(CORPUS_ROWS))
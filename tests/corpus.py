@@ -0,0 +1,65 @@
+"""Corpus sintético de extratos (CSV, OFX SGML/XML, QIF) para os testes e o bench.py.
+
+Os mesmos lançamentos (synthetic_transactions, determinísticos pela seed) saem em todos
+os formatos, então a soma importada de cada arquivo pode ser conferida contra a soma
+esperada. CORPUS_ROWS é o tamanho do corpus de 100 mil transações dos testes de formato
+(gerado uma vez por sessão de testes; ver conftest.corpus).
+"""
+import random
+from datetime import date, timedelta
+
+CORPUS_ROWS = 100_000
+
+
+def synthetic_transactions(rows, seed=1):
+    """(data, descrição, centavos com sinal, id) sintéticos, os mesmos para todos os formatos."""
+    rnd = random.Random(seed)
+    start = date.today() - timedelta(days=1000)
+    for i in range(rows):
+        cents = rnd.randrange(100, 500_000)
+        yield start + timedelta(days=rnd.randrange(1000)), f"Compra {rnd.randrange(5000)} & cia", \
+            cents if i % 3 == 0 else -cents, i
+
+
+def write_statement_csv(path, rows, seed=1):
+    """Extrato CSV sintético no formato do Importar Extrato."""
+    rnd = random.Random(seed)
+    start = date.today() - timedelta(days=1000)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("Data;Descrição;Tipo;Valor;Balde\n")
+        for i in range(rows):
+            cents = rnd.randrange(100, 500_000)
+            valor = f"{cents // 100:,}".replace(",", ".") + f",{cents % 100:02d}"
+            f.write(f"{start + timedelta(days=rnd.randrange(1000)):%d/%m/%y};Compra {rnd.randrange(5000)};"
+                    f"{'Despesa' if i % 3 else 'Receita'};{valor};{rnd.choice(['Moradia', 'Lazer', ''])}\n")
+
+
+def write_statement_ofx(path, rows, xml=False, seed=1):
+    """Extrato OFX sintético: SGML 1.02 (folhas sem fechamento) ou XML 2.x."""
+    close = (lambda tag: f"</{tag}>") if xml else (lambda tag: "")
+    with open(path, "w", encoding="utf-8" if xml else "latin-1", newline="\r\n" if not xml else None) as f:
+        if xml:
+            f.write('<?xml version="1.0" encoding="UTF-8"?>\n<?OFX OFXHEADER="200" VERSION="220"?>\n')
+        else:
+            f.write("OFXHEADER:100\nDATA:OFXSGML\nVERSION:102\nENCODING:USASCII\nCHARSET:1252\n\n")
+        f.write("<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><CURDEF>BRL" + close("CURDEF") + "<BANKTRANLIST>\n")
+        for day, memo, cents, i in synthetic_transactions(rows, seed):
+            memo = memo.replace("&", "&amp;")
+            sign = "-" if cents < 0 else ""
+            f.write(f"<STMTTRN>\n<TRNTYPE>{'DEBIT' if cents < 0 else 'CREDIT'}{close('TRNTYPE')}\n"
+                    f"<DTPOSTED>{day:%Y%m%d}120000[-3:BRT]{close('DTPOSTED')}\n"
+                    f"<TRNAMT>{sign}{abs(cents) // 100}.{abs(cents) % 100:02d}{close('TRNAMT')}\n"
+                    f"<FITID>{i:010d}{close('FITID')}\n<MEMO>{memo}{close('MEMO')}\n</STMTTRN>\n")
+        f.write("</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>\n")
+
+
+def write_statement_qif(path, rows, day_first=True):
+    """Extrato QIF sintético (!Type:Bank, valores no padrão do Quicken).
+
+    Datas DD/MM/AAAA, ou MM/DD/AAAA com day_first=False (exportação americana).
+    """
+    day_format = "%d/%m/%Y" if day_first else "%m/%d/%Y"
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("!Type:Bank\n")
+        for day, memo, cents, i in synthetic_transactions(rows):
+            f.write(f"D{day:{day_format}}\nT{cents / 100:,.2f}\nN{i}\nP{memo}\n^\n")
@@ -0,0 +1,26 @@
+from datetime import date, timedelta
+
+from sqlalchemy import func, insert, select
+
+from models import Bucket, Movement, User, UserProfile
+from services.allocation import run_daily_allocation, writer_slots
+
+
+def test_daily_allocation_runs_batches_on_the_single_writer(engines):
+    writer, _, factory = engines
+    today = date(2026, 3, 20)
+    with writer.begin() as conn:
+        conn.execute(insert(User), [{"id": u, "name": f"u{u}", "password_hash": "x"} for u in range(1, 7)])
+        conn.execute(insert(Bucket), [{"user_id": u, "name": "B", "percent": 100.0, "balance": 0.0}
+                                      for u in range(1, 7)])
+        conn.execute(insert(UserProfile), [
+            {"user_id": u, "monthly_income": 3000.0, "monthly_expense": 0.0,
+             "last_allocation_date": today - timedelta(days=3)} for u in range(1, 7)
+        ])
+
+    assert writer_slots(factory) == 1
+    stats = run_daily_allocation(factory, today=today, workers=4, batch_size=2)
+    assert (stats["users"], stats["batches"], stats["failed"]) == (6, 3, 0)
+    with factory() as s:
+        assert s.scalar(select(func.count()).select_from(Movement)) == 6 * 3
+    assert run_daily_allocation(factory, today=today, workers=4, batch_size=2)["users"] == 0
@@ -0,0 +1,60 @@
+from datetime import date
+
+import numpy as np
+from sqlalchemy import insert
+
+from cache import cache
+from charts import balance_series, lttb
+from models import Movement, User
+
+
+def test_lttb_keeps_endpoints_count_and_spike():
+    x = np.arange(10_000)
+    y = np.sin(x / 500.0)
+    y[6_543] = 50.0
+    keep = lttb(x, y, 300)
+    assert len(keep) == 300
+    assert keep[0] == 0 and keep[-1] == len(x) - 1
+    assert (np.diff(keep) > 0).all()
+    assert 6_543 in keep
+
+
+def test_lttb_below_threshold_keeps_everything():
+    assert lttb(np.arange(5), np.arange(5.0), 10).tolist() == [0, 1, 2, 3, 4]
+
+
+def _movements(writer, user_id, rows):
+    with writer.begin() as conn:
+        conn.execute(insert(User), [{"id": user_id, "name": f"u{user_id}", "password_hash": "x"}])
+        conn.execute(insert(Movement), [{"user_id": user_id, "kind": k, "amount": a, "date": d, "description": ""}
+                                        for d, k, a in rows])
+    cache.invalidate(user_id)
+
+
+def test_balance_series_is_daily_cumulative(engines):
+    writer, _, factory = engines
+    _movements(writer, 1, [
+        (date(2026, 1, 5), "Receita", 100.0), (date(2026, 1, 5), "Despesa", 30.0),
+        (date(2026, 1, 20), "Despesa", 20.0), (date(2026, 2, 1), "Receita", 10.5),
+    ])
+    with factory() as s:
+        days, balance = balance_series(s, 1)
+    assert days.tolist() == [date(2026, 1, 4), date(2026, 1, 5), date(2026, 1, 20), date(2026, 2, 1)]
+    assert balance.tolist() == [0.0, 70.0, 50.0, 60.5]
+
+
+def test_balance_series_single_day_still_has_an_area(engines):
+    writer, _, factory = engines
+    _movements(writer, 2, [(date(2026, 3, 10), "Receita", 40.0)])
+    with factory() as s:
+        days, balance = balance_series(s, 2)
+    assert len(days) == 2 and balance.tolist() == [0.0, 40.0]
+
+
+def test_balance_series_downsamples_above_max_points(engines):
+    writer, _, factory = engines
+    start = np.datetime64("2020-01-01")
+    _movements(writer, 3, [((start + np.timedelta64(i, "D")).astype(date), "Receita", 1.0) for i in range(500)])
+    with factory() as s:
+        days, balance = balance_series(s, 3, max_points=50)
+    assert len(days) == 50 and balance[-1] == 500.0
@@ -0,0 +1,43 @@
+from sqlalchemy import select, text
+
+from db import is_read, read_connection
+from models import User
+
+
+def test_text_reads_go_to_reader(engines):
+    writer, reader, Session = engines
+    with Session() as s:
+        assert s.get_bind(clause=text("SELECT 1")) is reader
+        assert s.get_bind(clause=text("  with t as (select 1) select * from t")) is reader
+        assert s.get_bind(clause=select(User.id)) is reader
+        assert not s.info.get("wrote")
+
+
+def test_text_writes_and_bare_connection_go_to_writer(engines):
+    writer, reader, Session = engines
+    for sql in ("UPDATE users SET name = name", "WITH t AS (SELECT 1) DELETE FROM users", "PRAGMA optimize"):
+        assert not is_read(text(sql))
+    with Session() as s:
+        assert s.connection().engine is writer  # connection() sem instrução prende ao escritor
+        assert s.info["wrote"]
+
+
+def test_read_connection_does_not_pin_writer(engines):
+    writer, reader, Session = engines
+    with Session() as s:
+        conn = read_connection(s)
+        assert conn.engine is reader
+        assert not s.info.get("wrote")
+        with Session() as w:  # o escritor continua livre para outra sessão
+            w.add(User(name="a", password_hash="x"))
+            w.commit()
+
+
+def test_read_connection_after_write_sees_own_writes(engines):
+    writer, reader, Session = engines
+    with Session() as s:
+        s.add(User(name="b", password_hash="x"))
+        s.flush()
+        conn = read_connection(s)
+        assert conn.engine is writer
+        assert conn.execute(text("SELECT count(*) FROM users")).scalar() == 1
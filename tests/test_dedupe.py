@@ -0,0 +1,66 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, insert, select
+
+from importers.csv_import import import_csv
+from importers.dedupe import fingerprints
+from models import Bucket, Movement, User
+from tests.corpus import write_statement_csv
+
+
+def _user(writer, user_id):
+    with writer.begin() as conn:
+        conn.execute(insert(User), [{"id": user_id, "name": f"u{user_id}", "password_hash": "x"}])
+        conn.execute(insert(Bucket), [{"user_id": user_id, "name": name, "percent": 50.0, "balance": 0.0}
+                                      for name in ("Moradia", "Lazer")])
+
+
+def _import(factory, user_id, path, chunk_rows):
+    with factory() as s:
+        for progress in import_csv(s, user_id, path, chunk_rows=chunk_rows):
+            pass
+        stored = s.scalar(select(func.count()).select_from(Movement).where(Movement.user_id == user_id))
+    return progress, stored
+
+
+def test_reimport_inserts_nothing(engines, tmp_path):
+    writer, _, factory = engines
+    _user(writer, 1)
+    path = tmp_path / "extrato.csv"
+    write_statement_csv(path, 2_000)
+    first, stored = _import(factory, 1, path, chunk_rows=300)
+    assert (first.imported, first.rejected, stored) == (2_000, 0, 2_000)
+    again, stored = _import(factory, 1, path, chunk_rows=700)  # outros blocos, mesmos fingerprints
+    assert (again.imported, again.duplicates, stored) == (0, 2_000, 2_000)
+
+
+def test_identical_same_day_rows_stay_two(engines, tmp_path):
+    writer, _, factory = engines
+    _user(writer, 2)
+    path = tmp_path / "cafes.csv"
+    path.write_text("Data;Descrição;Tipo;Valor;Balde\n"
+                    "05/01/2026;Café;Despesa;7,50;\n"
+                    "05/01/2026;Café;Despesa;7,50;\n"
+                    "05/01/2026;  CAFÉ ;Despesa;7,50;\n", encoding="utf-8")
+    first, stored = _import(factory, 2, path, chunk_rows=2)
+    assert (first.imported, stored) == (3, 3)
+    again, stored = _import(factory, 2, path, chunk_rows=10)
+    assert (again.imported, again.duplicates, stored) == (0, 3, 3)
+
+
+def test_fingerprints_are_stable_and_count_repeats_across_chunks():
+    ok = pd.DataFrame({
+        "date": [date(2026, 1, 5)] * 3 + [date(2026, 1, 6)],
+        "description": ["Café", "café", " Café  ", "Café"],
+        "kind": ["Despesa"] * 4,
+        "cents": [750] * 4,
+        "bucket_id": [None] * 4,
+    })
+    whole = fingerprints(ok, {})
+    occurrences = {}
+    split = np.concatenate([fingerprints(ok.iloc[:1], occurrences), fingerprints(ok.iloc[1:], occurrences)])
+    assert whole.tolist() == split.tolist()
+    assert len(set(whole.tolist())) == 4
+    assert whole.tolist() == fingerprints(ok.copy(), {}).tolist()
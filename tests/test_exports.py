@@ -0,0 +1,77 @@
+import csv
+import io
+from datetime import date, timedelta
+
+from sqlalchemy import func, insert, select
+
+from exports import brl, ledger_csv
+from models import Bucket, Movement, User
+
+
+def _seed(writer, movements):
+    with writer.begin() as conn:
+        conn.execute(insert(User), [{"id": 1, "name": "u", "password_hash": "x"}])
+        conn.execute(insert(Bucket), [{"id": 1, "user_id": 1, "name": "Casa", "percent": 100.0, "balance": 0.0}])
+        conn.execute(insert(Movement), [
+            {"user_id": 1, "bucket_id": 1 if i % 2 else None, "kind": "Despesa" if i % 3 else "Receita",
+             "amount": 10.5, "description": f"m{i}", "date": date(2024, 1, 1) + timedelta(days=i % 90)}
+            for i in range(movements)
+        ])
+
+
+def test_brl():
+    assert [brl(c) for c in (0, 5, -5, 99999, 100000, -123456789)] == [
+        "0,00", "0,05", "-0,05", "999,99", "1.000,00", "-1.234.567,89"]
+
+
+def test_ledger_csv_rows(engines):
+    writer, reader, Session = engines
+    _seed(writer, 30)
+    with Session() as s:
+        text = b"".join(ledger_csv(s, 1, yield_rows=7)).decode("utf-8-sig")
+    rows = list(csv.reader(io.StringIO(text), delimiter=";"))
+    assert rows[0] == ["ID", "Data", "Tipo", "Balde", "Valor", "Descrição"]
+    assert len(rows) == 31
+    assert {r[4] for r in rows[1:]} == {"10,50", "-10,50"}
+    assert {r[3] for r in rows[1:]} == {"Casa", ""}
+
+
+def test_write_while_export_is_running(engines):
+    """A exportação lê pelo pool de leitura: o escritor único continua livre durante ela."""
+    writer, reader, Session = engines
+    _seed(writer, 2_000)
+    with Session() as s:
+        parts = ledger_csv(s, 1, yield_rows=100)
+        first = next(parts) + next(parts)  # consulta aberta, no meio das partições
+        assert not s.info.get("wrote")
+        with Session() as w:  # falharia com TimeoutError do pool se a exportação prendesse o escritor
+            w.add(Movement(user_id=1, kind="Receita", amount=1.0, description="durante", date=date(2024, 6, 1)))
+            w.commit()
+        rest = b"".join(parts)
+    lines = (first + rest).decode("utf-8-sig").splitlines()
+    assert len(lines) - 1 >= 2_000
+    with Session() as s:
+        assert s.scalar(select(func.count()).select_from(Movement)) == 2_001
+
+
+def test_account_archive_while_writing(engines):
+    """O .zip completo também lê pelo pool de leitura."""
+    import zipfile
+
+    from exports import TABLES, account_archive
+
+    writer, reader, Session = engines
+    _seed(writer, 500)
+    with Session() as s:
+        parts = account_archive(s, 1, yield_rows=50)
+        data = b""
+        while reader.pool.checkedout() == 0:  # até a consulta estar aberta
+            data += next(parts)
+        assert not s.info.get("wrote")
+        with Session() as w:
+            w.add(Movement(user_id=1, kind="Receita", amount=1.0, description="durante", date=date(2024, 6, 1)))
+            w.commit()
+        data += b"".join(parts)
+    archive = zipfile.ZipFile(io.BytesIO(data))
+    assert archive.testzip() is None
+    assert {f"{name}.csv" for name in TABLES} <= set(archive.namelist())
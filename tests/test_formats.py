@@ -0,0 +1,120 @@
+import io
+
+import numpy as np
+import pytest
+
+from importers.ofx_import import iter_ofx_tokens, iter_ofx_transactions, read_ofx_chunks, read_ofx_transactions
+from importers.pipeline import ImportFormatError, parse_chunks
+from importers.qif_import import iter_qif_transactions, read_qif_chunks
+from tests.corpus import CORPUS_ROWS
+
+SGML = """OFXHEADER:100
+DATA:OFXSGML
+VERSION:102
+
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><CURDEF>BRL<BANKTRANLIST>
+<STMTTRN>
+<TRNTYPE>DEBIT
+<DTPOSTED>20260105120000[-3:BRT]
+<TRNAMT>-1234.56
+<FITID>0001
+<NAME>Mercado
+<MEMO>Compra &amp; cia
+</STMTTRN>
+<STMTTRN>
+<TRNTYPE>CREDIT
+<DTPOSTED>20260106
+<TRNAMT>2500.00
+<FITID>0002
+<MEMO>Salário
+</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+XML = """<?xml version="1.0" encoding="UTF-8"?>
+<?OFX OFXHEADER="200" VERSION="220"?>
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><CURDEF>BRL</CURDEF><BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT</TRNTYPE><DTPOSTED>20260105120000</DTPOSTED><TRNAMT>-1234.56</TRNAMT>
+<FITID>0001</FITID><NAME>Mercado</NAME><MEMO>Compra &amp; cia</MEMO></STMTTRN>
+<STMTTRN><TRNTYPE>CREDIT</TRNTYPE><DTPOSTED>20260106</DTPOSTED><TRNAMT>2500.00</TRNAMT>
+<FITID>0002</FITID><MEMO>Salário</MEMO></STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+EXPECTED_OFX = [
+    ("2026-01-05", "Mercado - Compra & cia", "-1234.56", "FITID 0001"),
+    ("2026-01-06", "Salário", "2500.00", "FITID 0002"),
+]
+
+
+@pytest.mark.parametrize("text", [SGML, XML], ids=["sgml", "xml"])
+def test_ofx_variants(text):
+    assert list(iter_ofx_transactions(iter_ofx_tokens(io.StringIO(text)))) == EXPECTED_OFX
+
+
+@pytest.mark.parametrize("text", [SGML, XML], ids=["sgml", "xml"])
+def test_ofx_tokens_split_across_blocks(text):
+    # blocos de 7 caracteres cortam marcações e valores ao meio
+    whole = list(iter_ofx_tokens(io.StringIO(text)))
+    assert list(iter_ofx_tokens(io.StringIO(text), read_chars=7)) == whole
+    assert list(iter_ofx_transactions(iter_ofx_tokens(io.StringIO(text), read_chars=7))) == EXPECTED_OFX
+
+
+def test_ofx_without_transactions_is_a_format_error():
+    with pytest.raises(ImportFormatError):
+        list(read_ofx_transactions(io.BytesIO(b"OFXHEADER:100\n\n<OFX></OFX>")))
+
+
+QIF = """!Type:Bank
+D05/01/2026
+T-1,234.56
+PMercado
+MCompra
+^
+!Account
+NConta corrente
+^
+D06/01'26
+T2.500,00
+PSalário
+^
+"""
+
+
+def test_qif_records():
+    assert [t[:3] for t in iter_qif_transactions(io.StringIO(QIF))] == [
+        ("05/01/2026", "Mercado - Compra", "-1234.56"),
+        ("06/01/26", "Salário", "2.500,00"),
+    ]
+
+
+@pytest.mark.parametrize("amount, expected", [
+    ("1,234", "1234"), ("-1,234", "-1234"), ("1,234,567", "1234567"), ("1,234.50", "1234.50"), ("12,5", "12,5"),
+])
+def test_qif_us_export_thousands(amount, expected):
+    text = f"!Type:Bank\nD01/31/2026\nT{amount}\nPLoja\n^\n"
+    [(day, _, value, _)] = iter_qif_transactions(io.StringIO(text), day_first=False)
+    assert (day, value) == ("31/01/2026", expected)
+
+
+def test_qif_us_whole_amount_is_valid_brl():
+    text = "!Type:Bank\nD01/31/2026\nT-1,234\nPLoja\n^\n"
+    [chunk] = parse_chunks(read_qif_chunks(io.BytesIO(text.encode()), day_first=False), {})
+    assert chunk.errors == [] and chunk.ok["cents"].tolist() == [123_400]
+
+
+def _signed_total(chunks) -> tuple[int, int, int]:
+    rows = rejected = total = 0
+    for chunk in chunks:
+        rows += chunk.rows
+        rejected += len(chunk.errors)
+        cents = chunk.ok["cents"].to_numpy()
+        total += int(np.where(chunk.ok["kind"].to_numpy() == "Receita", cents, -cents).sum())
+    return rows, rejected, total
+
+
+@pytest.mark.parametrize("kind", ["ofx", "ofx_xml", "qif"])
+def test_corpus_of_100k_transactions(corpus, kind):
+    files, expected = corpus
+    reader = read_qif_chunks if kind == "qif" else read_ofx_chunks
+    assert _signed_total(parse_chunks(reader(files[kind]), {})) == (CORPUS_ROWS, 0, expected)
@@ -0,0 +1,28 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql
+
+import migrations
+
+
+class _FakeConn:
+    """Conexão que só informa o dialeto: a migração tem que parar antes de executar SQL."""
+    dialect = postgresql.dialect()
+
+    def execute(self, *args, **kwargs):
+        raise AssertionError("executou SQL num backend não suportado")
+
+
+def test_sqlite_migrations_apply(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'm.db'}")
+    assert migrations.run_migrations(engine, force=True) == migrations.MIGRATIONS[-1][0]
+
+
+def test_giant_stats_migration_rejects_other_backends():
+    with pytest.raises(RuntimeError, match="giant_stats"):
+        migrations._m004_giant_stats(_FakeConn())
+
+
+def test_movement_monthly_migration_rejects_other_backends():
+    with pytest.raises(RuntimeError, match="movement_monthly"):
+        migrations._m005_movement_monthly(_FakeConn())
@@ -0,0 +1,33 @@
+import types
+
+import pytest
+
+from importers.parallel import parse_files, row_fraction
+from importers.pipeline import ImportProgress
+
+
+def _statement(path, rows):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("Data;Descrição;Tipo;Valor;Balde\n")
+        for i in range(rows):
+            f.write(f"{i % 28 + 1:02d}/01/26;Compra {i};Despesa;1.234,{i % 100:02d};\n")
+
+
+def test_parse_files_streams_large_files(tmp_path):
+    small, large = tmp_path / "small.csv", tmp_path / "large.csv"
+    _statement(small, 10)
+    _statement(large, 300)
+    specs = [("csv", str(small), {"chunk_rows": 100}, 0), ("csv", str(large), {"chunk_rows": 100}, 0)]
+
+    first, second = [f.result() for f in parse_files(specs, {}, workers=1,
+                                                      max_task_bytes=large.stat().st_size - 1)]
+    assert isinstance(first, list) and sum(c.rows for c in first) == 10
+    assert isinstance(second, types.GeneratorType)
+    assert row_fraction(second, ImportProgress()) is None
+    assert [c.rows for c in second] == [100, 100, 100]
+
+
+def test_parse_files_reports_missing_file_on_result(tmp_path):
+    futures = list(parse_files([("csv", str(tmp_path / "nope.csv"), {}, 0)], {}, workers=1))
+    with pytest.raises(FileNotFoundError):
+        futures[0].result()
@@ -0,0 +1,38 @@
+import numpy as np
+
+import payoff
+from payoff import Portfolio, monte_carlo, optimal_order
+
+
+def _portfolio(n, seed=1):
+    rng = np.random.default_rng(seed)
+    return Portfolio(ids=np.arange(n), names=tuple(f"G{i}" for i in range(n)),
+                     balances=rng.uniform(5_000, 50_000, n).round(2), rates=rng.choice([0.0, 0.02, 0.04, 0.08], n),
+                     minimums=rng.uniform(50, 300, n).round(2), priorities=np.ones(n))
+
+
+def test_early_stop_does_not_change_paths(monkeypatch):
+    p = _portfolio(8)
+    income = float(p.minimums.sum() + (p.balances * p.rates).sum() / 2)  # sobra abaixo dos juros
+    args = (p, optimal_order(p), income, income * 0.1, income * 0.1, income * 0.01, 0.0, 2_000, 360, 5)
+    cut = payoff._simulate_paths(*args)
+    monkeypatch.setattr(payoff, "COMPACT_MONTHS", 10**9)
+    assert np.array_equal(cut, payoff._simulate_paths(*args))
+    assert (cut < 0).any() and (cut > 0).any()
+
+
+def test_portfolio_that_never_pays_off():
+    p = _portfolio(5)
+    p = Portfolio(p.ids, p.names, p.balances, np.full(5, 0.05), p.minimums, p.priorities)
+    result = monte_carlo(p, float(p.minimums.sum()), 0.0, paths=2_000, seed=1)
+    assert result.all_p50 is None and result.p90 == [None] * 5
+    assert not result.win_rate.any()
+
+
+def test_slow_portfolio_stops_after_cell_budget(monkeypatch):
+    monkeypatch.setattr(payoff, "MAX_SIMULATED_CELLS", 1)
+    monkeypatch.setattr(payoff, "BLOCK_CELLS", 500 * 5)
+    p = _portfolio(5)
+    result = monte_carlo(p, float(p.minimums.sum() * 3), 0.0, paths=5_000, seed=1)
+    assert result.paths == payoff.MIN_PATHS
+    assert len(result.win_rate) == 5
@@ -0,0 +1,35 @@
+import pandas as pd
+import pytest
+
+from importers.pipeline import parse_brl
+
+
+@pytest.mark.parametrize("text, cents", [
+    ("1.234,56", 123456),
+    ("R$ -10,00", -1000),
+    ("(5,90)", -590),
+    ("12.5", 1250),
+    ("12.34", 1234),
+    ("1.234", 123400),
+    ("12.345", 1234500),
+    ("1.234.567,89", 123456789),
+    ("1234", 123400),
+    ("-1.000", -100000),
+])
+def test_parse_brl(text, cents):
+    assert parse_brl(pd.Series([text])).iloc[0] == cents
+
+
+@pytest.mark.parametrize("text", [
+    "1.5.0", "12.3456", "1.23.456", "1234.567", "1.234.56", ".123", "1.234.5,00", "1,2,3", "1,234.56", "abc", "",
+])
+def test_parse_brl_rejects_malformed(text):
+    assert parse_brl(pd.Series([text])).isna().iloc[0]
+
+
+def test_parse_brl_mixed_column_keeps_index():
+    values = pd.Series(["1.5.0", "2.000,10", None], index=[10, 11, 12])
+    parsed = parse_brl(values)
+    assert list(parsed.index) == [10, 11, 12]
+    assert parsed.isna().tolist() == [True, False, True]
+    assert parsed[11] == 200010
@@ -0,0 +1,28 @@
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+import migrations
+from models import Giant, GiantPayment, User
+from read_models import read_payment_index
+
+
+def test_payment_index_reads_totals_from_giant_stats(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'p.db'}")
+    migrations.run_migrations(engine, force=True)
+    today = date(2026, 3, 20)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"id": 1, "name": "u", "password_hash": "x"}])
+        conn.execute(insert(Giant), [{"id": g, "user_id": 1, "name": f"G{g}", "total_to_pay": 1000.0,
+                                      "weekly_goal": 50.0} for g in (1, 2)])
+        conn.execute(insert(GiantPayment), [
+            {"user_id": 1, "giant_id": 1, "amount": 10.0, "date": today - timedelta(days=30)},
+            {"user_id": 1, "giant_id": 1, "amount": 25.5, "date": today - timedelta(days=3)},
+            {"user_id": 1, "giant_id": 1, "amount": 4.5, "date": today},
+        ])
+
+    with Session(engine) as s:
+        overview = read_payment_index(s, 1, today).overview([1, 2], today)
+    assert overview[1] == {"paid": 4000, "count": 3, "last_date": today, "week": 3000}
+    assert overview[2] == {"paid": 0, "count": 0, "last_date": None, "week": 0}